@@ -0,0 +1,334 @@
+"""
+渲染性能基准测试
+
+生成固定内容的合成测试图片, 按水印模式、背景模糊、阴影、白边的所有组合以及 resource/style 中的每个样式渲染,
+统计吞吐量、延迟分位数与内存峰值, 并可以与保存的基准结果对比, 发现性能回退
+
+用法:
+    python -m app.benchmark [--sizes 12,24,45,100] [--repeat 3] [--cases 关键字] [--output 结果.json]
+                            [--baseline 基准.json] [--threshold 0.1]
+
+每组用例 (样式 x 像素) 在单独的子进程中运行, 内存峰值互不影响; 首张图片作为预热不计入统计
+退出码: 0 正常, 1 与基准相比有性能回退, 2 参数错误
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import itertools
+import tempfile
+import multiprocessing
+from pathlib import Path
+from dataclasses import dataclass, field, replace
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from PIL import Image, ImageChops
+from PIL.ExifTags import Base, IFD
+from PIL.TiffImagePlugin import IFDRational
+from app.core.paths import STYLE_PATH
+from app.core.render_config import RenderConfig
+from app.core.renderer import ImageRenderer, render_task
+from app.core.timing import BatchTimings, peak_rss, percentile
+from app.entity.enums import MARK_MODE
+from app.utils.image_handle import get_exif_batch
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+EXIT_USAGE = 2
+
+# 默认测试的像素数, 单位百万像素
+DEFAULT_SIZES = (12, 24, 45, 100)
+# 合成图片的长宽比
+ASPECT_RATIO = 3 / 2
+# 合成图片使用的随机种子, 保证每次生成的内容一致
+SEED = 20250606
+# 合成图片的默认缓存目录, 放在系统临时目录中, 不写入项目目录
+DEFAULT_IMAGE_DIR = Path(tempfile.gettempdir()) / "watermark-benchmark-images"
+# 默认的回退阈值, 延迟或吞吐量变差超过该比例时视为回退
+DEFAULT_THRESHOLD = 0.1
+
+
+@dataclass(frozen=True)
+class BenchImage:
+    """
+    一张合成测试图片
+    """
+    path: str
+    megapixels: int
+    portrait: bool
+    # 是否通过 EXIF 方向标记旋转
+    rotated: bool
+
+    @property
+    def name(self) -> str:
+        return f"{'portrait' if self.portrait else 'landscape'}{'-rotated' if self.rotated else ''}"
+
+
+@dataclass(frozen=True)
+class BenchCase:
+    """
+    一组渲染配置
+    """
+    name: str
+    config: RenderConfig
+
+
+@dataclass
+class GroupResult:
+    """
+    一组用例 (配置 x 像素) 的测试结果
+    """
+    name: str
+    case: str
+    megapixels: int
+    # 每次渲染的耗时, 单位秒
+    latencies: List[float] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    # 子进程导入模块后、开始渲染前的内存, 以及整组渲染的内存峰值, 单位字节
+    base_rss: int = 0
+    peak_rss: int = 0
+    stages: dict = field(default_factory=dict)
+
+    def summary(self) -> dict:
+        latencies = sorted(latency * 1000 for latency in self.latencies)
+        total = sum(self.latencies)
+        return {
+            "case": self.case,
+            "megapixels": self.megapixels,
+            "renders": len(latencies),
+            "errors": self.errors,
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+            "images_per_s": round(len(latencies) / total, 3) if total else 0.0,
+            "megapixels_per_s": round(len(latencies) * self.megapixels / total, 2) if total else 0.0,
+            "base_rss_mb": round(self.base_rss / 1024 / 1024, 1),
+            "peak_rss_mb": round(self.peak_rss / 1024 / 1024, 1),
+            "stages_p50_ms": {name: stage["wall_p50_ms"] for name, stage in self.stages.items()},
+        }
+
+
+def image_size(megapixels: int, portrait: bool):
+    width = round((megapixels * 1_000_000 * ASPECT_RATIO) ** 0.5)
+    height = round(width / ASPECT_RATIO)
+    return (height, width) if portrait else (width, height)
+
+
+def make_image(path: Path, megapixels: int, portrait: bool, rotated: bool):
+    """
+    生成一张带 EXIF 的合成图片, 内容为渐变叠加固定种子的噪点, 编码开销接近真实照片
+    旋转的图片保存为横竖相反的像素, 由 EXIF 方向标记还原
+    """
+    size = image_size(megapixels, portrait != rotated)
+    rng = random.Random(SEED)
+    tile = Image.frombytes("L", (256, 256), rng.randbytes(256 * 256))
+    noise = Image.new("L", size)
+    for x in range(0, size[0], tile.width):
+        for y in range(0, size[1], tile.height):
+            noise.paste(tile, (x, y))
+    horizontal = Image.linear_gradient("L").rotate(90).resize(size)
+    vertical = Image.linear_gradient("L").resize(size)
+    red = ImageChops.blend(horizontal, noise, 0.25)
+    green = ImageChops.blend(vertical, noise, 0.25)
+    blue = ImageChops.blend(ImageChops.invert(horizontal), noise, 0.25)
+    image = Image.merge("RGB", (red, green, blue))
+
+    exif = Image.Exif()
+    exif[Base.Make] = "NIKON CORPORATION"
+    exif[Base.Model] = "NIKON Z 7"
+    # 6: 顺时针旋转 90 度显示
+    exif[Base.Orientation] = 6 if rotated else 1
+    detail = exif.get_ifd(IFD.Exif)
+    detail[Base.DateTimeOriginal] = "2025:06:06 12:00:00"
+    detail[Base.FNumber] = IFDRational(18, 10)
+    detail[Base.ExposureTime] = IFDRational(1, 200)
+    detail[Base.ISOSpeedRatings] = 100
+    detail[Base.FocalLength] = IFDRational(50, 1)
+    detail[Base.FocalLengthIn35mmFilm] = 50
+    detail[Base.LensModel] = "NIKKOR Z 50mm f/1.8 S"
+    image.save(path, quality=90, exif=exif)
+
+
+def prepare_images(sizes, image_dir: Path) -> Dict[int, List[BenchImage]]:
+    """
+    生成各个像素的横竖、旋转与不旋转的测试图片, 已存在的图片直接复用
+    """
+    image_dir.mkdir(parents=True, exist_ok=True)
+    images = {}
+    for megapixels in sizes:
+        images[megapixels] = []
+        for portrait, rotated in itertools.product((False, True), repeat=2):
+            image = BenchImage(str(image_dir / f"{megapixels}mp_{int(portrait)}{int(rotated)}_{SEED}.jpg"),
+                               megapixels, portrait, rotated)
+            if not os.path.exists(image.path):
+                print(f"生成测试图片 {image.path}", file=sys.stderr)
+                make_image(Path(image.path), megapixels, portrait, rotated)
+            images[megapixels].append(image)
+    return images
+
+
+def build_cases() -> List[BenchCase]:
+    """
+    水印模式、背景模糊、阴影、白边的所有组合, 以及 resource/style 中的每个样式
+    """
+    cases = []
+    base = RenderConfig()
+    for mode in MARK_MODE:
+        for blur, shadow, margin in itertools.product((False, True), repeat=3):
+            effects = [name for name, enabled in (("blur", blur), ("shadow", shadow), ("margin", margin)) if enabled]
+            config = replace(base, markMode=mode.info(), backgroundBlur=blur, addShadow=shadow, whiteMargin=margin)
+            cases.append(BenchCase("+".join([mode.info()] + effects), config))
+    for style_path in sorted(Path(STYLE_PATH).glob("*.json")):
+        cases.append(BenchCase(f"style:{style_path.stem}", RenderConfig.from_file(style_path, base)))
+    return cases
+
+
+def run_group(name: str, case: BenchCase, images: List[BenchImage], repeat: int, output_dir: str) -> GroupResult:
+    """
+    在子进程中渲染一组用例
+    """
+    result = GroupResult(name, case.name, images[0].megapixels, base_rss=peak_rss())
+    exifs = get_exif_batch(image.path for image in images)
+    renderer = ImageRenderer()
+    timings = BatchTimings()
+
+    # 预热: 字体、logo 等在首次渲染时加载
+    first = images[0]
+    render_task(0, first.path, os.path.join(output_dir, "warmup.jpg"), case.config, exifs.get(first.path), 0, renderer)
+
+    for index, image in enumerate(image for _ in range(repeat) for image in images):
+        target_path = os.path.join(output_dir, f"{index}.jpg")
+        start = time.perf_counter()
+        render_result = render_task(index, image.path, target_path, case.config, exifs.get(image.path), 0, renderer)
+        result.latencies.append(time.perf_counter() - start)
+        timings.add(index, render_result.timing)
+        if not render_result.success:
+            result.errors.append(f"{image.name}: {render_result.errorInfo}")
+    result.stages = timings.summary()["stages"]
+    result.peak_rss = peak_rss()
+    return result
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """
+    与基准结果对比, 返回回退的用例说明
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key, higher_is_better in (("p50_ms", False), ("p95_ms", False), ("megapixels_per_s", True),
+                                      ("peak_rss_mb", False)):
+            old, new = base.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            change = (old - new) / old if higher_is_better else (new - old) / old
+            if change > threshold:
+                regressions.append(f"{name} {key}: {old} -> {new} (变差 {change:.0%})")
+    return regressions
+
+
+def format_table(results: Dict[str, dict], baseline: Optional[Dict[str, dict]]) -> str:
+    lines = [f"{'用例':<34}{'次数':>4}{'p50 ms':>10}{'p95 ms':>10}{'张/秒':>8}{'MP/秒':>9}{'峰值 MB':>9}"
+             + (f"{'p50 对比':>8}" if baseline else "")]
+    for name, result in results.items():
+        line = (f"{name:<36}{result['renders']:>6}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+                f"{result['images_per_s']:>10.2f}{result['megapixels_per_s']:>10.1f}{result['peak_rss_mb']:>11.1f}")
+        base = (baseline or {}).get(name)
+        if base and base.get("p50_ms"):
+            line += f"{(result['p50_ms'] - base['p50_ms']) / base['p50_ms']:>+12.1%}"
+        if result["errors"]:
+            line += f"  失败 {len(result['errors'])}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "pillow": Image.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.benchmark", description="渲染性能基准测试")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="测试图片的像素数, 单位百万像素, 逗号分隔")
+    parser.add_argument("--repeat", type=int, default=3, help="每张图片的渲染次数")
+    parser.add_argument("--cases", help="只运行名称包含该关键字的用例, 例如 blur 或 style:")
+    parser.add_argument("--image-dir", help="测试图片的目录, 默认在系统临时目录中")
+    parser.add_argument("--output", help="将结果写入 JSON 文件, 可作为之后对比的基准")
+    parser.add_argument("--baseline", help="与指定的基准结果对比")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="判定为回退的变化比例")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    except ValueError:
+        print(f"像素数格式错误: {args.sizes}", file=sys.stderr)
+        return EXIT_USAGE
+    if not sizes or min(sizes) <= 0 or args.repeat <= 0:
+        print("像素数与渲染次数需要大于 0", file=sys.stderr)
+        return EXIT_USAGE
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)["results"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"读取基准结果失败: {e}", file=sys.stderr)
+            return EXIT_USAGE
+
+    cases = [case for case in build_cases() if not args.cases or args.cases in case.name]
+    if not cases:
+        print(f"没有匹配的用例: {args.cases}", file=sys.stderr)
+        return EXIT_USAGE
+    images = prepare_images(sizes, Path(args.image_dir or DEFAULT_IMAGE_DIR))
+
+    results = {}
+    output_dir = tempfile.mkdtemp(prefix="watermark-benchmark-")
+    context = multiprocessing.get_context("spawn")
+    try:
+        for case in cases:
+            for megapixels in sizes:
+                name = f"{case.name}/{megapixels}MP"
+                print(f"运行 {name}", file=sys.stderr)
+                # 每组使用新的子进程, 内存峰值只反映本组的渲染
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    result = executor.submit(run_group, name, case, images[megapixels], args.repeat,
+                                             output_dir).result()
+                results[name] = result.summary()
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    print(format_table(results, baseline))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "sizes": sizes, "repeat": args.repeat, "results": results},
+                      f, ensure_ascii=False, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\n性能回退:\n" + "\n".join(regressions))
+            return EXIT_REGRESSION
+        print("\n与基准相比没有性能回退")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
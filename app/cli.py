@@ -0,0 +1,164 @@
+"""
+无界面的命令行批量渲染入口
+
+用法:
+    python -m app.cli render --in 输入目录 --out 输出目录 [--style 经典] [--jobs 16] [--max-size 2048] [--recursive]
+                             [--blur-quality fast|high]
+                             [--timings timings.json] [--trace trace.json]
+
+进度以 JSON Lines 的格式逐行写到标准输出, 日志等其他输出写到标准错误
+退出码: 0 全部成功, 1 部分图片渲染失败, 2 参数错误
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import multiprocessing
+from pathlib import Path
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+class JsonLinesReporter:
+    """
+    将进度事件以 JSON Lines 的格式写出, 每个事件一行
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def emit(self, event: str, **fields):
+        fields = {"event": event, **fields}
+        self.stream.write(json.dumps(fields, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+def redirect_stdout_to_stderr():
+    """
+    复制一份标准输出专门用于写进度, 再将文件描述符 1 指向标准错误,
+    依赖库在导入时的打印输出以及子进程的输出都不会混入 JSON 进度
+    :return: 写进度用的文件对象
+    """
+    sys.stdout.flush()
+    stream = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return stream
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="相机水印批量渲染")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    render = subparsers.add_parser("render", help="批量渲染目录中的图片")
+    render.add_argument("--in", dest="input", required=True, help="输入目录或单张图片")
+    render.add_argument("--out", dest="output", required=True, help="输出目录, 不存在时自动创建")
+    render.add_argument("--style", help="resource/style 中的样式名称或样式文件路径, 默认使用当前设置")
+    render.add_argument("--jobs", type=int, default=None, help="渲染进程数, 默认读取设置, 0 表示使用全部核心")
+    render.add_argument("--max-size", type=int, default=None, help="输出图片的最长边, 默认读取设置, 0 表示不限制")
+    render.add_argument("--blur-quality", choices=["fast", "high"],
+                        help="背景模糊的质量, fast 缩小后模糊再放大, high 在原图上模糊, 默认读取设置")
+    render.add_argument("--recursive", "-r", action="store_true", help="同时渲染子目录中的图片, 按原目录结构输出")
+    render.add_argument("--timings", help="将分阶段耗时的 p50/p95 统计写入指定的 JSON 文件")
+    render.add_argument("--trace", help="将每张图片的分阶段耗时写入 Chrome Trace 格式的 JSON 文件")
+    return parser
+
+
+def produce_tasks(input_path: Path, output_path: Path, recursive: bool, task_queue):
+    """
+    边遍历输入目录边放入渲染任务, 子目录中的图片输出到对应的子目录
+    在单独的线程中运行, 队列满时等待渲染
+    """
+    from app.core.batch import ImageHandleTask
+    from app.core.scan import scan_images
+
+    root = input_path if input_path.is_dir() else input_path.parent
+    try:
+        for path in scan_images([input_path], recursive=recursive):
+            target_path = output_path / path.relative_to(root)
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            task_queue.put(ImageHandleTask(path, target_path))
+    finally:
+        task_queue.close()
+
+
+def render(args, reporter: JsonLinesReporter) -> int:
+    # 渲染相关的模块在重定向标准输出之后再导入, 只依赖渲染核心, 不加载 Qt
+    from dataclasses import replace
+    from app.core.paths import SETTINGS_PATH
+    from app.core.render_config import RenderConfig
+    from app.core.batch import BatchRenderer, TaskQueue, ImageHandleStatus, HandleProgress
+
+    input_path = Path(args.input)
+    if not input_path.exists():
+        reporter.emit("error", message=f"输入路径不存在: {input_path}")
+        return EXIT_USAGE
+
+    try:
+        # 以当前设置为基础, 指定的样式覆盖其中的配置, 不写入设置文件
+        config = RenderConfig.from_file(SETTINGS_PATH)
+        if args.style:
+            config = RenderConfig.from_style(args.style, base=config)
+        if args.blur_quality:
+            config = replace(config, blurQuality=args.blur_quality)
+    except (OSError, ValueError) as e:
+        reporter.emit("error", message=str(e))
+        return EXIT_USAGE
+
+    output_path = Path(args.output)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    # 扫描与渲染同时进行, 大目录不需要等待遍历结束
+    task_queue = TaskQueue()
+    producer = threading.Thread(target=produce_tasks, daemon=True,
+                                args=(input_path, output_path, args.recursive, task_queue))
+    producer.start()
+
+    done = 0
+
+    def on_loading(progress: HandleProgress):
+        # 同一任务的状态变化会被合并, 结束状态只会出现一次
+        nonlocal done
+        for update in progress.updates:
+            if update.status not in (ImageHandleStatus.FINISHED, ImageHandleStatus.ERROR):
+                continue
+            done += 1
+            task = batch.tasks[update.index]
+            reporter.emit("image", index=update.index, source=str(task.image_path), target=str(task.target_path),
+                          status=update.status.name.lower(), error=update.errorInfo,
+                          elapsed=round(update.elapsed, 3), done=done)
+
+    batch = BatchRenderer(task_queue, config, max_workers=args.jobs, max_size=args.max_size, on_progress=on_loading)
+    reporter.emit("start", workers=batch.worker_count(), style=args.style or config.styleName)
+
+    start = time.perf_counter()
+    batch.run()
+    producer.join()
+
+    if args.timings:
+        batch.timings.write_json(args.timings)
+    if args.trace:
+        batch.timings.write_trace(args.trace)
+
+    tasks = batch.tasks
+    failed = sum(1 for task in tasks if task.status != ImageHandleStatus.FINISHED)
+    reporter.emit("finish", total=len(tasks), succeeded=len(tasks) - failed, failed=failed,
+                  elapsed=round(time.perf_counter() - start, 3))
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    reporter = JsonLinesReporter(redirect_stdout_to_stderr())
+    if args.command == "render":
+        return render(args, reporter)
+    return EXIT_USAGE
+
+
+if __name__ == "__main__":
+    # 渲染进程池使用 spawn 启动，打包后需要 freeze_support 才能正确启动子进程
+    multiprocessing.freeze_support()
+    sys.exit(main())
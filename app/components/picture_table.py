@@ -0,0 +1,305 @@
+import os
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QRect, QEvent, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor, QPainter, QHelpEvent, QPixmap
+from PyQt5.QtWidgets import QAbstractItemView, QHeaderView, QStyleOptionViewItem
+from qfluentwidgets import (
+    TableView,
+    TableItemDelegate,
+    FluentIcon as FIF,
+    themeColor
+)
+from app.core.batch import ImageHandleStatus
+from app.core.scan import path_key, unique_name
+from app.entity.picutre_item import PictureItem
+
+NAME_COLUMN = 0
+ACTION_COLUMN = 1
+STATUS_COLUMN = 2
+
+FINISHED_BRUSH = QBrush(QColor("#52CD9F"))
+ERROR_BRUSH = QBrush(QColor("#F14A5B"))
+
+
+class PictureAction(Enum):
+    """图片表格中每行的操作按钮, 值为按钮提示"""
+    OPEN_FOLDER = "打开源文件目录"
+    DELETE = "删除文件"
+    INFO = "查看元信息"
+    EDIT = "编辑元信息"
+
+
+ACTION_ICONS = {
+    PictureAction.OPEN_FOLDER: FIF.FOLDER,
+    PictureAction.DELETE: FIF.DELETE,
+    PictureAction.INFO: FIF.INFO,
+    PictureAction.EDIT: FIF.EDIT,
+}
+
+
+class PictureTableModel(QAbstractTableModel):
+    """
+    图片表格的数据模型, 表格只绘制可见的行
+    状态变化时只通知对应的单元格刷新, 不重建整个表格
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items: List[PictureItem] = []
+        # 以 path_key 为键的行号索引, 用于导入去重与按路径查找
+        self._rows: Dict[str, int] = {}
+        # 已使用的输出文件名, 重名的图片加上序号, 避免输出互相覆盖
+        self._names: Set[str] = set()
+        # 鼠标所在的操作按钮, 操作列的提示文字
+        self._tooltipAction: Optional[PictureAction] = None
+        self._headers = [self.tr("名称"), self.tr("操作"), self.tr("状态")]
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.items)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == NAME_COLUMN:
+                return item.name
+            if column == STATUS_COLUMN:
+                return self.tr(item.status.value)
+        elif role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        elif role == Qt.ForegroundRole and column == STATUS_COLUMN:
+            if item.status == ImageHandleStatus.FINISHED:
+                return FINISHED_BRUSH
+            if item.status == ImageHandleStatus.ERROR:
+                return ERROR_BRUSH
+        elif role == Qt.ToolTipRole:
+            if column == STATUS_COLUMN and item.status == ImageHandleStatus.ERROR:
+                return item.errorInfo
+            if column == ACTION_COLUMN and self._tooltipAction is not None:
+                return self.tr(self._tooltipAction.value)
+        return None
+
+    def setToolTipAction(self, action: Optional[PictureAction]):
+        """
+        设置鼠标所在的操作按钮, 由代理在显示提示前调用
+        """
+        self._tooltipAction = action
+
+    def item(self, row: int) -> PictureItem:
+        return self.items[row]
+
+    def row_of(self, path) -> int:
+        """
+        获取图片所在的行, 不存在时返回 -1
+        """
+        return self._rows.get(path_key(path), -1)
+
+    def keys(self):
+        return self._rows.keys()
+
+    def names(self) -> Set[str]:
+        return self._names
+
+    def add_paths(self, paths: Iterable, target_path: str) -> int:
+        """
+        添加图片, 已存在的图片直接跳过, 输出文件名与已有图片重名时加上序号
+        :param paths: 图片路径
+        :param target_path: 输出目录
+        :return: 新增的图片数量
+        """
+        return self.add_outputs(((path, None) for path in paths), target_path)
+
+    def add_outputs(self, entries: Iterable[Tuple[str, Optional[str]]], target_path: str) -> int:
+        """
+        添加图片并指定输出文件名, 已存在的图片直接跳过, 一批图片只通知一次插入
+        :param entries: (图片路径, 输出文件名), 输出文件名为空时使用图片的文件名
+        :param target_path: 输出目录
+        :return: 新增的图片数量
+        """
+        items = []
+        keys = set()
+        for path, output_name in entries:
+            key = path_key(path)
+            if key in self._rows or key in keys:
+                continue
+            keys.add(key)
+            items.append(PictureItem(
+                name=os.path.basename(path),
+                original_path=path,
+                target_path=target_path,
+                output_name=unique_name(output_name or os.path.basename(path), self._names),
+                status=ImageHandleStatus.WAITING
+            ))
+        if not items:
+            return 0
+
+        start = len(self.items)
+        self.beginInsertRows(QModelIndex(), start, start + len(items) - 1)
+        for row, item in enumerate(items, start):
+            self.items.append(item)
+            self._rows[path_key(item.original_path)] = row
+        self.endInsertRows()
+        return len(items)
+
+    def remove_row(self, row: int):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        item = self.items.pop(row)
+        self._names.discard(os.path.normcase(item.output_name))
+        self.endRemoveRows()
+        self._reindex()
+
+    def clear(self):
+        self.beginResetModel()
+        self.items.clear()
+        self._rows.clear()
+        self._names.clear()
+        self.endResetModel()
+
+    def set_path(self, row: int, path):
+        """
+        更新图片路径, 例如编辑元信息后另存为新文件
+        """
+        item = self.items[row]
+        self._rows.pop(path_key(item.original_path), None)
+        self._names.discard(os.path.normcase(item.output_name))
+        item.original_path = path
+        item.name = os.path.basename(path)
+        # 保留原来的子目录, 文件名换成新文件的名称
+        item.output_name = unique_name(os.path.join(os.path.dirname(item.output_name), item.name), self._names)
+        self._rows[path_key(path)] = row
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    def update_status(self, row: int, status: ImageHandleStatus, error: str = ""):
+        """
+        更新一行的处理状态, 状态没有变化时不通知界面
+        """
+        item = self.items[row]
+        if item.status == status and item.errorInfo == error:
+            return
+        item.status = status
+        item.errorInfo = error
+        index = self.index(row, STATUS_COLUMN)
+        self.dataChanged.emit(index, index)
+
+    def _reindex(self):
+        self._rows = {path_key(item.original_path): row for row, item in enumerate(self.items)}
+
+
+class PictureActionDelegate(TableItemDelegate):
+    """
+    直接绘制操作按钮的代理, 不为每行创建按钮控件
+    """
+    actionTriggered = pyqtSignal(int, PictureAction)
+
+    BUTTON_SIZE = 32
+    ICON_SIZE = 16
+    SPACING = 8
+
+    def __init__(self, parent: QAbstractItemView):
+        super().__init__(parent)
+        self.deleteEnabled = True
+        # 按 (操作, 颜色, 缩放比例) 缓存渲染好的图标, 绘制时不再解析 svg
+        self._pixmaps: Dict[tuple, QPixmap] = {}
+
+    def setDeleteEnabled(self, enabled: bool):
+        self.deleteEnabled = enabled
+        self.parent().viewport().update()
+
+    def buttonRects(self, rect: QRect) -> List[tuple]:
+        """
+        计算一个单元格中各个按钮的位置
+        :return: (操作, 区域) 列表
+        """
+        actions = list(PictureAction)
+        width = len(actions) * self.BUTTON_SIZE + (len(actions) - 1) * self.SPACING
+        x = rect.x() + (rect.width() - width) // 2
+        y = rect.y() + (rect.height() - self.BUTTON_SIZE) // 2
+        rects = []
+        for action in actions:
+            rects.append((action, QRect(x, y, self.BUTTON_SIZE, self.BUTTON_SIZE)))
+            x += self.BUTTON_SIZE + self.SPACING
+        return rects
+
+    def actionAt(self, rect: QRect, pos) -> Optional[PictureAction]:
+        for action, button_rect in self.buttonRects(rect):
+            if button_rect.contains(pos):
+                return action
+        return None
+
+    def isActionEnabled(self, action: PictureAction) -> bool:
+        return action != PictureAction.DELETE or self.deleteEnabled
+
+    def actionPixmap(self, action: PictureAction, ratio: float) -> QPixmap:
+        color = themeColor()
+        key = (action, color.name(), ratio)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is None:
+            size = round(self.ICON_SIZE * ratio)
+            pixmap = ACTION_ICONS[action].icon(color=color).pixmap(size, size)
+            pixmap.setDevicePixelRatio(ratio)
+            self._pixmaps[key] = pixmap
+        return pixmap
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex):
+        super().paint(painter, option, index)
+        if index.column() != ACTION_COLUMN:
+            return
+
+        painter.save()
+        ratio = painter.device().devicePixelRatioF()
+        offset = (self.BUTTON_SIZE - self.ICON_SIZE) // 2
+        for action, rect in self.buttonRects(option.rect):
+            painter.setOpacity(1 if self.isActionEnabled(action) else 0.36)
+            painter.drawPixmap(rect.x() + offset, rect.y() + offset, self.actionPixmap(action, ratio))
+        painter.restore()
+
+    def editorEvent(self, event, model, option: QStyleOptionViewItem, index: QModelIndex) -> bool:
+        if index.column() == ACTION_COLUMN and event.type() == QEvent.MouseButtonRelease \
+                and event.button() == Qt.LeftButton:
+            action = self.actionAt(option.rect, event.pos())
+            if action is not None and self.isActionEnabled(action):
+                self.actionTriggered.emit(index.row(), action)
+                return True
+        return super().editorEvent(event, model, option, index)
+
+    def helpEvent(self, event: QHelpEvent, view: QAbstractItemView, option: QStyleOptionViewItem,
+                  index: QModelIndex) -> bool:
+        if index.column() == ACTION_COLUMN and event and event.type() == QEvent.ToolTip:
+            # 操作列按鼠标所在的按钮显示提示, 提示文字由模型的 ToolTipRole 提供
+            index.model().setToolTipAction(self.actionAt(view.visualRect(index), event.pos()))
+        return super().helpEvent(event, view, option, index)
+
+
+class PictureTableView(TableView):
+    """
+    图片表格, 行由 PictureTableModel 提供, 操作按钮由 PictureActionDelegate 绘制
+    """
+
+    def __init__(self, model: PictureTableModel, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.actionDelegate = PictureActionDelegate(self)
+        self.setItemDelegate(self.actionDelegate)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setBorderVisible(True)
+        self.setBorderRadius(8)
+
+        header = self.horizontalHeader()
+        header.setSectionResizeMode(NAME_COLUMN, QHeaderView.Stretch)
+        header.setSectionResizeMode(ACTION_COLUMN, QHeaderView.Fixed)
+        header.setSectionResizeMode(STATUS_COLUMN, QHeaderView.Fixed)
+        self.setColumnWidth(ACTION_COLUMN, 300)
+        self.setColumnWidth(STATUS_COLUMN, 120)
@@ -1,156 +1,116 @@
-import sys
-import platform
-import logging
-from pathlib import Path
 from qfluentwidgets import (
     QConfig,
     qconfig,
     ConfigItem
 )
+from app.core.paths import (
+    LOG_LEVEL,
+    ROOT_PATH,
+    APPDATA_PATH,
+    RESOURCE_PATH,
+    LOG_PATH,
+    ASSETS_PATH,
+    CACHE_PATH,
+    SETTINGS_PATH,
+    STYLE_PATH,
+    EXIFTOOL_PATH,
+    OUTPUT_PATH,
+    FONT_PATH,
+    LOGO_PATH
+)
+from app.core.render_config import RenderConfig
 
-LOG_LEVEL = logging.INFO
-
-if getattr(sys, 'frozen', False):
-    ROOT_PATH = Path(__file__).parent.parent
-    if platform.system() == 'Windows':
-        APPDATA_PATH = ROOT_PATH.parent / "AppData"
-        RESOURCE_PATH = ROOT_PATH.parent / "resource"
-        LOG_PATH = APPDATA_PATH / "logs"
-        ASSETS_PATH = RESOURCE_PATH / "assets"
-        CACHE_PATH = APPDATA_PATH / "cache"
-        SETTINGS_PATH = APPDATA_PATH / "settings.json"
-        STYLE_PATH = RESOURCE_PATH / "style"
-        EXIFTOOL_PATH = APPDATA_PATH / "exiftool"
-        OUTPUT_PATH = APPDATA_PATH / "output"
-        FONT_PATH = RESOURCE_PATH / "fonts"
-    else:
-        APPDATA_PATH = f"{ROOT_PATH}/AppData"
-        RESOURCE_PATH = f"{ROOT_PATH}/resource"
-        LOG_PATH = f"{APPDATA_PATH}/logs"
-        ASSETS_PATH = f"{RESOURCE_PATH}/assets"
-        CACHE_PATH = f"{APPDATA_PATH}/cache"
-        SETTINGS_PATH = f"{APPDATA_PATH}/settings.json"
-        STYLE_PATH = f"{RESOURCE_PATH}/style"
-        EXIFTOOL_PATH = f"{APPDATA_PATH}/exiftool"
-        OUTPUT_PATH = f"{APPDATA_PATH}/output"
-        FONT_PATH = f"{RESOURCE_PATH}/fonts"
-else:
-    ROOT_PATH = Path(__file__).parent
-    APPDATA_PATH = ROOT_PATH.parent / "AppData"
-    RESOURCE_PATH = ROOT_PATH.parent / "resource"
-    LOG_PATH = APPDATA_PATH / "logs"
-    ASSETS_PATH = RESOURCE_PATH / "assets"
-    CACHE_PATH = APPDATA_PATH / "cache"
-    SETTINGS_PATH = APPDATA_PATH / "settings.json"
-    STYLE_PATH = RESOURCE_PATH / "style"
-    EXIFTOOL_PATH = APPDATA_PATH / "exiftool"
-    OUTPUT_PATH = APPDATA_PATH / "output"
-    FONT_PATH = RESOURCE_PATH / "fonts"
-
-
-LOGO_PATH = {
-    "default": Path(f"{RESOURCE_PATH}/logos/empty.png"),
-    "APPLE": Path(f"{RESOURCE_PATH}/logos/apple.png"),
-    "Canon": Path(f"{RESOURCE_PATH}/logos/canon.png"),
-    "DJI": Path(f"{RESOURCE_PATH}/logos/DJI.png"),
-    "\u7A7A": Path(f"{RESOURCE_PATH}/logos/empty.png"),
-    "FUJIFILM": Path(f"{RESOURCE_PATH}/logos/fujifilm.png"),
-    "HASSELBLAD": Path(f"{RESOURCE_PATH}/logos/hasselblad.png"),
-    "HUAWEI": Path(f"{RESOURCE_PATH}/logos/xmage.png"),
-    "leica": Path(f"{RESOURCE_PATH}/logos/leica_logo.png"),
-    "NIKON": Path(f"{RESOURCE_PATH}/logos/nikon.png"),
-    "Olympus": Path(f"{RESOURCE_PATH}/logos/olympus_blue_gold.png"),
-    "Panasonic": Path(f"{RESOURCE_PATH}/logos/panasonic.png"),
-    "PENTAX": Path(f"{RESOURCE_PATH}/logos/pentax.png"),
-    "RICOH": Path(f"{RESOURCE_PATH}/logos/RICOH.png"),
-    "SONY": Path(f"{RESOURCE_PATH}/logos/sony.png"),
-}
+# 渲染相关配置项的默认值统一在 RenderConfig 中定义, 这里直接引用, 避免两处默认值不一致
+DEFAULT = RenderConfig()
 
 
 class Config(QConfig):
-    styleName = ConfigItem("Style", "StyleName", "default")
-
-    baseQuality = ConfigItem("Base", "BaseQuality", 100)
-    baseFontName = ConfigItem("Base", "BaseFontName",
-                              "AlibabaPuHuiTi-2-45-Light")
-    boldFontName = ConfigItem("Base", "BoldFontName",
-                              "AlibabaPuHuiTi-2-45-Bold")
-    baseFontSize = ConfigItem("Base", "BaseFontSize", 1)
-    boldFontSize = ConfigItem("Base", "BoldFontSize", 1)
-    radiusInfo = ConfigItem("Base", "RadiusInfo", 20)
-    backgroundColor = ConfigItem("Base", "BackgroundColor", "#ffffffff")
+    styleName = ConfigItem("Style", "StyleName", DEFAULT.styleName)
+
+    baseQuality = ConfigItem("Base", "BaseQuality", DEFAULT.baseQuality)
+    # 输出图片的最长边, 0 表示保持原图尺寸
+    maxOutputEdge = ConfigItem("Base", "MaxOutputEdge", DEFAULT.maxOutputEdge)
+    baseFontName = ConfigItem("Base", "BaseFontName", DEFAULT.baseFontName)
+    boldFontName = ConfigItem("Base", "BoldFontName", DEFAULT.boldFontName)
+    baseFontSize = ConfigItem("Base", "BaseFontSize", DEFAULT.baseFontSize)
+    boldFontSize = ConfigItem("Base", "BoldFontSize", DEFAULT.boldFontSize)
+    radiusInfo = ConfigItem("Base", "RadiusInfo", DEFAULT.radiusInfo)
+    backgroundColor = ConfigItem("Base", "BackgroundColor", DEFAULT.backgroundColor)
     targetPath = ConfigItem("Base", "TargetPath", str(OUTPUT_PATH))
     previewPath = ConfigItem("Base", "PreviewPath", f"{ASSETS_PATH}/default_bg.jpg")
 
-    markMode = ConfigItem("Mode", "MarkMode", "standard")
-
-    useEquivalentFocal = ConfigItem("Global", "UseEquivalentFocal", True)
-    useOriginRatioPadding = ConfigItem(
-        "Global", "UseOriginRatioPadding", False)
-    addShadow = ConfigItem("Global", "AddShadow", False)
-    shadowColor = ConfigItem("Global", "ShadowColor", "#00000000")
-    shadowBlur = ConfigItem("Global", "ShadowBlur", 20)
-    backgroundBlur = ConfigItem("Global", "BackgroundBlur", False)
-    blurExtent = ConfigItem("Global", "BlurExtent", 35)
-    blurHorizontalPadding = ConfigItem("Global", "BlurHorizontalPadding", 0.09)
-    blurTopPadding = ConfigItem("Global", "BlurTopPadding", 0.09)
-    blurBottomPadding = ConfigItem("Global", "BlurBottomPadding", 0.09)
-
-    whiteMargin = ConfigItem("Global", "WhiteMargin", True)
-    whiteMarginWidth = ConfigItem("Global", "WhiteMarginWidth", 3)
-    whiteMarginColor = ConfigItem("Global", "WhiteMarginColor", "#ffffff")
-
-    logoEnable = ConfigItem("LOGO", "LogoEnable", True)
-    isLogoLeft = ConfigItem("LOGO", "isLogoLeft", True)
-    simpleLogoSize = ConfigItem("LOGO", "SimpleLogoSize", 0.3)
-    customLogoEnable = ConfigItem("LOGO", "CustomLogoEnable", False)
-    customLogoPath = ConfigItem("LOGO", "CustomLogoPath", "")
-
-    leftTopType = ConfigItem("Layout", "LeftTopType", "LensModel")
-    leftTopBold = ConfigItem("Layout", "LeftTopBold", True)
-    leftTopFontColor = ConfigItem("Layout", "LeftTopFontColor", "#212121")
-
-    leftBottomType = ConfigItem("Layout", "LeftBottomType", "Model")
-    leftBottomBold = ConfigItem("Layout", "LeftBottomBold", False)
-    leftBottomFontColor = ConfigItem(
-        "Layout", "LeftBottomFontColor", "#757575")
-
-    rightTopType = ConfigItem("Layout", "RightTopType", "Datetime")
-    rightTopBold = ConfigItem("Layout", "RightTopBold", True)
-    rightTopFontColor = ConfigItem("Layout", "RightTopFontColor", "#212121")
-
-    rightBottomType = ConfigItem("Layout", "RightBottomType", "Param")
-    rightBottomBold = ConfigItem("Layout", "RightBottomBold", False)
-    rightBottomFontColor = ConfigItem(
-        "Layout", "RightBottomFontColor", "#757575")
+    markMode = ConfigItem("Mode", "MarkMode", DEFAULT.markMode)
+
+    useEquivalentFocal = ConfigItem("Global", "UseEquivalentFocal", DEFAULT.useEquivalentFocal)
+    useOriginRatioPadding = ConfigItem("Global", "UseOriginRatioPadding", DEFAULT.useOriginRatioPadding)
+    addShadow = ConfigItem("Global", "AddShadow", DEFAULT.addShadow)
+    shadowColor = ConfigItem("Global", "ShadowColor", DEFAULT.shadowColor)
+    shadowBlur = ConfigItem("Global", "ShadowBlur", DEFAULT.shadowBlur)
+    backgroundBlur = ConfigItem("Global", "BackgroundBlur", DEFAULT.backgroundBlur)
+    blurExtent = ConfigItem("Global", "BlurExtent", DEFAULT.blurExtent)
+    blurHorizontalPadding = ConfigItem("Global", "BlurHorizontalPadding", DEFAULT.blurHorizontalPadding)
+    blurTopPadding = ConfigItem("Global", "BlurTopPadding", DEFAULT.blurTopPadding)
+    blurBottomPadding = ConfigItem("Global", "BlurBottomPadding", DEFAULT.blurBottomPadding)
+
+    whiteMargin = ConfigItem("Global", "WhiteMargin", DEFAULT.whiteMargin)
+    whiteMarginWidth = ConfigItem("Global", "WhiteMarginWidth", DEFAULT.whiteMarginWidth)
+    whiteMarginColor = ConfigItem("Global", "WhiteMarginColor", DEFAULT.whiteMarginColor)
+
+    logoEnable = ConfigItem("LOGO", "LogoEnable", DEFAULT.logoEnable)
+    isLogoLeft = ConfigItem("LOGO", "isLogoLeft", DEFAULT.isLogoLeft)
+    simpleLogoSize = ConfigItem("LOGO", "SimpleLogoSize", DEFAULT.simpleLogoSize)
+    customLogoEnable = ConfigItem("LOGO", "CustomLogoEnable", DEFAULT.customLogoEnable)
+    customLogoPath = ConfigItem("LOGO", "CustomLogoPath", DEFAULT.customLogoPath)
+
+    leftTopType = ConfigItem("Layout", "LeftTopType", DEFAULT.leftTopType)
+    leftTopBold = ConfigItem("Layout", "LeftTopBold", DEFAULT.leftTopBold)
+    leftTopFontColor = ConfigItem("Layout", "LeftTopFontColor", DEFAULT.leftTopFontColor)
+
+    leftBottomType = ConfigItem("Layout", "LeftBottomType", DEFAULT.leftBottomType)
+    leftBottomBold = ConfigItem("Layout", "LeftBottomBold", DEFAULT.leftBottomBold)
+    leftBottomFontColor = ConfigItem("Layout", "LeftBottomFontColor", DEFAULT.leftBottomFontColor)
+
+    rightTopType = ConfigItem("Layout", "RightTopType", DEFAULT.rightTopType)
+    rightTopBold = ConfigItem("Layout", "RightTopBold", DEFAULT.rightTopBold)
+    rightTopFontColor = ConfigItem("Layout", "RightTopFontColor", DEFAULT.rightTopFontColor)
+
+    rightBottomType = ConfigItem("Layout", "RightBottomType", DEFAULT.rightBottomType)
+    rightBottomBold = ConfigItem("Layout", "RightBottomBold", DEFAULT.rightBottomBold)
+    rightBottomFontColor = ConfigItem("Layout", "RightBottomFontColor", DEFAULT.rightBottomFontColor)
     
-    standardVerticalPadding = ConfigItem("Layout", "StandardVerticalPadding", 0.50)
-    standardLeftPadding = ConfigItem("Layout", "StandardLeftPadding", 200)
-    standardRightPadding = ConfigItem("Layout", "StandardRightPadding", 200)
+    standardVerticalPadding = ConfigItem("Layout", "StandardVerticalPadding", DEFAULT.standardVerticalPadding)
+    standardLeftPadding = ConfigItem("Layout", "StandardLeftPadding", DEFAULT.standardLeftPadding)
+    standardRightPadding = ConfigItem("Layout", "StandardRightPadding", DEFAULT.standardRightPadding)
 
-    simpleFirstLineType = ConfigItem("Layout", "SimpleFirstLineType", "Model")
-    simpleFirstLineBold = ConfigItem("Layout", "SimpleFirstLineBold", True)
-    simpleFirstLineColor = ConfigItem("Layout", "SimpleFirstLineColor", "#212121")
+    simpleFirstLineType = ConfigItem("Layout", "SimpleFirstLineType", DEFAULT.simpleFirstLineType)
+    simpleFirstLineBold = ConfigItem("Layout", "SimpleFirstLineBold", DEFAULT.simpleFirstLineBold)
+    simpleFirstLineColor = ConfigItem("Layout", "SimpleFirstLineColor", DEFAULT.simpleFirstLineColor)
 
-    simpleSecondLineType = ConfigItem("Layout", "SimpleSecondLineType", "Param")
-    simpleSecondLineBold = ConfigItem("Layout", "SimpleSecondLineBold", False)
-    simpleSecondLineColor = ConfigItem("Layout", "SimpleSecondLineColor", "#757575")
+    simpleSecondLineType = ConfigItem("Layout", "SimpleSecondLineType", DEFAULT.simpleSecondLineType)
+    simpleSecondLineBold = ConfigItem("Layout", "SimpleSecondLineBold", DEFAULT.simpleSecondLineBold)
+    simpleSecondLineColor = ConfigItem("Layout", "SimpleSecondLineColor", DEFAULT.simpleSecondLineColor)
 
-    simpleThirdLineType = ConfigItem("Layout", "SimpleThirdLineType", "Datetime")
-    simpleThirdLineBold = ConfigItem("Layout", "SimpleThirdLineBold", False)
-    simpleThirdLineColor = ConfigItem("Layout", "SimpleThirdLineColor", "#757575")
+    simpleThirdLineType = ConfigItem("Layout", "SimpleThirdLineType", DEFAULT.simpleThirdLineType)
+    simpleThirdLineBold = ConfigItem("Layout", "SimpleThirdLineBold", DEFAULT.simpleThirdLineBold)
+    simpleThirdLineColor = ConfigItem("Layout", "SimpleThirdLineColor", DEFAULT.simpleThirdLineColor)
 
-    simpleScale = ConfigItem("Layout", "SimpleScale", 0.16)
-    simplePaddingScale = ConfigItem("Layout", "SimplePaddingScale", 0.1)
+    simpleScale = ConfigItem("Layout", "SimpleScale", DEFAULT.simpleScale)
+    simplePaddingScale = ConfigItem("Layout", "SimplePaddingScale", DEFAULT.simplePaddingScale)
 
-    def get_font_padding_level(self):
-        bold_font_size = self.boldFontSize.value if 1 <= self.boldFontSize.value <= 3 else 1
-        font_size = self.baseFontSize.value if 1 <= self.baseFontSize.value <= 3 else 1
-        return bold_font_size + font_size
+    # 批量渲染的进程数, 0 表示使用全部 CPU 核心
+    renderWorkers = ConfigItem("Performance", "RenderWorkers", DEFAULT.renderWorkers)
+    # 背景模糊的质量, fast 在缩小的图片上模糊后放大, high 在原图上模糊
+    blurQuality = ConfigItem("Performance", "BlurQuality", DEFAULT.blurQuality)
 
     def to_dict(self):
         return self._cfg.toDict()
 
+    def render_config(self) -> RenderConfig:
+        """
+        获取当前配置的快照, 交给不依赖 Qt 的渲染核心使用
+        """
+        return RenderConfig.from_dict(self.to_dict())
+
 
 cfg = Config()
 qconfig.load(SETTINGS_PATH, cfg)
@@ -0,0 +1,5 @@
+"""
+不依赖 Qt 的渲染核心, 只使用 PIL 与普通的数据类
+
+界面、命令行与渲染子进程都依赖这里, 这里的模块不能导入 PyQt5 或 qfluentwidgets
+"""
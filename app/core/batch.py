@@ -0,0 +1,330 @@
+import os
+import time
+import queue
+import itertools
+import multiprocessing
+from enum import Enum
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from app.core.render_config import RenderConfig
+from app.core.timing import BatchTimings
+from app.core.renderer import (
+    ImageRenderer,
+    RenderResult,
+    init_worker,
+    render_task
+)
+from app.utils.image_handle import read_exif_batch
+from app.utils.logger import setup_logger
+logger = setup_logger("batch")
+
+# 每次批量读取 exif 并提交渲染的任务数
+CHUNK_SIZE = 32
+# 任务队列的容量, 扫描比渲染快时扫描线程在这里等待
+QUEUE_SIZE = 256
+# 进度通知的最小间隔, 单位秒, 期间的状态变化合并后一起通知
+PROGRESS_INTERVAL = 0.05
+
+
+class ImageHandleStatus(Enum):
+    WAITING = "等待中"
+    PROCESSING = "处理中"
+    FINISHED = "已完成"
+    ERROR = "出错"
+
+
+@dataclass
+class ImageHandleTask:
+    image_path: Path
+    target_path: Path
+    status: ImageHandleStatus = ImageHandleStatus.WAITING
+    errorInfo: str = ""
+
+
+def create_task(image_path: str, name: str, target_path: str) -> ImageHandleTask:
+    """
+    创建渲染任务, 输出文件在子目录中时先创建子目录
+    :param image_path: 图片路径
+    :param name: 相对输出目录的文件名
+    :param target_path: 输出目录
+    """
+    output_path = Path(target_path) / name
+    if os.path.dirname(name):
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+    return ImageHandleTask(image_path, output_path)
+
+
+@dataclass
+class TaskUpdate:
+    """
+    单个任务的状态变化
+    """
+    index: int
+    image_path: Path
+    status: ImageHandleStatus
+    errorInfo: str = ""
+    # 渲染耗时, 单位秒, 渲染结束后才有
+    elapsed: float = 0.0
+
+
+@dataclass
+class HandleProgress:
+    """
+    一次进度通知, 只包含上次通知之后状态有变化的任务
+    """
+    updates: List[TaskUpdate]
+    progress: int
+    # 已结束的任务数
+    done: int = 0
+    # 任务总数, 流式任务在取完之前为空
+    total: Optional[int] = None
+
+
+class TaskQueue:
+    """
+    有界的渲染任务队列, 扫描线程边发现图片边放入, 渲染流程边取边渲染
+    队列满时 put 会阻塞, 扫描不会比渲染超前太多
+    """
+    _CLOSED = object()
+
+    def __init__(self, maxsize: int = QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize)
+
+    def put(self, task: ImageHandleTask):
+        self._queue.put(task)
+
+    def close(self):
+        """
+        所有任务都已放入, 渲染流程取完剩余的任务后结束
+        """
+        self._queue.put(self._CLOSED)
+
+    def __iter__(self) -> Iterator[ImageHandleTask]:
+        while True:
+            task = self._queue.get()
+            if task is self._CLOSED:
+                return
+            yield task
+
+
+class BatchRenderer:
+    """
+    批量渲染一组图片, 不依赖 Qt, 进度通过回调通知
+    界面的 ImageHandleThread 与命令行共用这一流程
+    """
+
+    def __init__(self, tasks: Iterable[ImageHandleTask], config: RenderConfig, max_workers: int = None,
+                 max_size: int = None, on_progress: Optional[Callable[[HandleProgress], None]] = None,
+                 progress_interval: float = PROGRESS_INTERVAL):
+        """
+        :param tasks: 渲染任务, 状态会被原地更新; 列表在开始前就知道总数,
+                      TaskQueue 等其他可迭代对象则边取边渲染, 取出的任务追加到 self.tasks
+        :param config: 本批次的渲染配置
+        :param max_workers: 进程池大小, 为空时读取配置
+        :param max_size: 输出图片的最长边, 为空时读取配置
+        :param on_progress: 进度回调, 每次只传入有变化的任务
+        :param progress_interval: 进度回调的最小间隔, 0 表示每次变化都通知
+        """
+        if isinstance(tasks, list):
+            self.tasks = tasks
+            self.total = len(tasks)
+        else:
+            self.tasks: List[ImageHandleTask] = []
+            self.total = None
+        self.source = tasks
+        self.config = config
+        self.max_workers = max_workers
+        self.max_size = max_size
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.backends = {}
+        # 本批次的分阶段耗时
+        self.timings = BatchTimings()
+        self.done = 0
+        # 尚未通知的状态变化, 同一任务只保留最新的状态
+        self._updates: Dict[int, TaskUpdate] = {}
+        self._notified_at = 0.0
+
+    def worker_count(self) -> int:
+        """
+        获取进程池大小, 未指定时读取配置, 配置为 0 时使用全部核心
+        """
+        workers = self.max_workers if self.max_workers else self.config.renderWorkers
+        if not workers or workers <= 0:
+            workers = os.cpu_count() or 1
+        if self.total is not None:
+            workers = min(workers, self.total)
+        return max(1, workers)
+
+    def output_max_size(self) -> int:
+        """
+        获取输出图片的最长边, 未指定时读取配置, 0 表示不限制
+        """
+        max_size = self.max_size if self.max_size is not None else self.config.maxOutputEdge
+        return max(0, int(max_size or 0))
+
+    def run(self):
+        if self.total == 0:
+            return
+        self.timings = BatchTimings()
+        try:
+            if self.worker_count() > 1:
+                self.run_parallel()
+            else:
+                self.run_serial()
+        except Exception:
+            # 意外错误时未结束的任务记为出错, 不会一直停在等待中或处理中
+            for index, task in enumerate(self.tasks):
+                if task.status not in (ImageHandleStatus.FINISHED, ImageHandleStatus.ERROR):
+                    self.update_task(RenderResult(index, False, "未知错误"))
+            raise
+        finally:
+            # 出现意外错误时也通知已有的进度, 界面与命令行据此结束本批次
+            self.total = len(self.tasks)
+            self.flush()
+            logger.info(f"exif 读取完成, 读取方式统计: {self.backends}")
+            logger.info(self.timings.format_table())
+
+    def chunks(self) -> Iterator[List[Tuple[int, ImageHandleTask]]]:
+        """
+        按 CHUNK_SIZE 从任务来源中分批取出任务, 每批一起读取 exif
+        :return: (任务下标, 任务) 列表的迭代器
+        """
+        tasks = iter(self.source)
+        index = 0
+        while True:
+            chunk = list(itertools.islice(tasks, CHUNK_SIZE))
+            if not chunk:
+                return
+            if self.total is None:
+                self.tasks.extend(chunk)
+            yield [(index + offset, task) for offset, task in enumerate(chunk)]
+            index += len(chunk)
+
+    def run_serial(self):
+        """
+        在当前线程中逐张渲染, 用于单张任务, 避免进程池的启动开销
+        """
+        renderer = ImageRenderer()
+        max_size = self.output_max_size()
+        for chunk in self.chunks():
+            exifs = self.read_exifs(chunk)
+            for index, task in chunk:
+                self.set_status(index, ImageHandleStatus.PROCESSING)
+                self.update_task(render_task(index, task.image_path, task.target_path, self.config,
+                                             exifs.get(task.image_path), max_size, renderer))
+
+    def run_parallel(self):
+        """
+        将任务分发到进程池中渲染, 池中只保留有限的任务, 按任务顺序回传进度
+        渲染进程异常退出时, 已提交的任务记为出错, 重建进程池后继续渲染剩余的任务
+        """
+        context = multiprocessing.get_context("spawn")
+        max_size = self.output_max_size()
+        max_pending = self.worker_count() * 2
+        executor = self.create_executor(context)
+        pending = deque()
+        try:
+            for chunk in self.chunks():
+                exifs = self.read_exifs(chunk)
+                for index, task in chunk:
+                    args = (render_task, index, task.image_path, task.target_path,
+                            None, exifs.get(task.image_path), max_size)
+                    try:
+                        future = executor.submit(*args)
+                    except BrokenProcessPool as e:
+                        logger.error(f"渲染进程异常退出, 重建进程池，Error: {str(e)}")
+                        # 进程池损坏后已提交的任务都会失败, 取回结果后换新的进程池
+                        while pending:
+                            self.collect(*pending.popleft())
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        executor = self.create_executor(context)
+                        future = executor.submit(*args)
+                    self.set_status(index, ImageHandleStatus.PROCESSING)
+                    pending.append((index, future))
+                    # 每提交一张就检查, 池中最多保留 max_pending 张, 不会整批堆积
+                    while len(pending) > max_pending:
+                        self.collect(*pending.popleft())
+            while pending:
+                self.collect(*pending.popleft())
+        finally:
+            executor.shutdown(wait=not pending, cancel_futures=True)
+
+    def create_executor(self, context) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.worker_count(),
+                                   mp_context=context,
+                                   initializer=init_worker,
+                                   initargs=(self.config,))
+
+    def collect(self, index: int, future):
+        """
+        等待一个进程池任务结束并记录结果
+        """
+        try:
+            try:
+                result = future.result(timeout=self.progress_interval)
+            except TimeoutError:
+                # 需要等待较长时间, 先把积攒的进度通知出去
+                self.flush()
+                result = future.result()
+        except BrokenProcessPool as e:
+            logger.error(f"渲染进程异常退出，Error: {str(e)}")
+            result = RenderResult(index, False, "渲染进程异常退出")
+        except Exception as e:
+            logger.exception(f"渲染进程出错，Error: {str(e)}")
+            result = RenderResult(index, False, "未知错误")
+        self.update_task(result)
+
+    def read_exifs(self, chunk: List[Tuple[int, ImageHandleTask]]) -> dict:
+        """
+        批量读取一批任务的 exif 信息
+        """
+        with self.timings.main.stage("read_exif"):
+            results = read_exif_batch(task.image_path for _, task in chunk)
+        for path, (_, backend) in results.items():
+            self.backends[backend] = self.backends.get(backend, 0) + 1
+            logger.debug(f"{path} exif 读取方式: {backend}")
+        return {path: exif for path, (exif, _) in results.items()}
+
+    def update_task(self, result: RenderResult):
+        self.done += 1
+        self.timings.add(result.index, result.timing)
+        if result.success:
+            self.set_status(result.index, ImageHandleStatus.FINISHED, elapsed=result.elapsed)
+        else:
+            self.set_status(result.index, ImageHandleStatus.ERROR, result.errorInfo, result.elapsed)
+
+    def set_status(self, index: int, status: ImageHandleStatus, error: str = "", elapsed: float = 0.0):
+        """
+        更新任务状态并记录变化, 到达通知间隔时一起通知
+        """
+        task = self.tasks[index]
+        task.status = status
+        if error:
+            task.errorInfo = error
+        self._updates[index] = TaskUpdate(index, task.image_path, status, task.errorInfo, elapsed)
+        if time.monotonic() - self._notified_at >= self.progress_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        立即通知所有尚未通知的状态变化
+        """
+        if not self._updates:
+            return
+        updates = list(self._updates.values())
+        self._updates.clear()
+        self._notified_at = time.monotonic()
+        if self.on_progress is not None:
+            self.on_progress(HandleProgress(updates, self.progress(), self.done, self.total))
+
+    def progress(self) -> int:
+        """
+        计算进度, 流式任务的总数未知, 以已取出的任务数估算
+        """
+        total = self.total if self.total is not None else len(self.tasks)
+        return int(self.done / max(total, 1) * 100)
@@ -0,0 +1,188 @@
+"""
+标准模式水印条的排版
+
+排版分两步: 先按字体的 getbbox 与配置在未缩放的水印条 (高度为 NORMAL_HEIGHT) 上计算每个文字、logo
+与分割线的位置, 再按输出宽度换算坐标, 直接在最终分辨率上绘制文字、缩放 logo,
+不再绘制放大的中间图片后整体缩小
+"""
+import math
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence, Tuple
+from PIL import Image, ImageDraw, ImageFont
+from app.utils.compositor import stack
+
+# 直接在输出分辨率上绘制的最小字号, 更小的文字放大绘制后缩小
+MIN_TEXT_SIZE = 64
+
+
+@dataclass
+class TextItem:
+    content: str
+    font: ImageFont.FreeTypeFont
+    fill: str
+
+
+@dataclass
+class Block:
+    """
+    水印条中的一个区块, 例如一列文字、logo 或分割线, 坐标以区块左上角为原点
+    区块放入水印条时整体缩放到水印条的高度
+    """
+    width: int
+    height: int
+    # (文字, 位置)
+    texts: List[Tuple[TextItem, Tuple[int, int]]] = field(default_factory=list)
+    # (按尺寸获取图片的函数, 区域)
+    images: List[Tuple[Callable, Tuple[int, int, int, int]]] = field(default_factory=list)
+    # (颜色, 区域)
+    rects: List[Tuple[str, Tuple[int, int, int, int]]] = field(default_factory=list)
+
+
+def text_size(item: TextItem) -> Tuple[int, int]:
+    """
+    文字图片的尺寸, 与 text_to_image 生成的图片一致
+    """
+    _, _, width, height = item.font.getbbox(item.content or '   ')
+    return width, height
+
+
+def column_size(lines: Sequence[TextItem], gap: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    两行文字中间留出间隔排成一列时的尺寸
+    """
+    size, _ = stack([text_size(lines[0]), gap, text_size(lines[1])], axis=1, align=2)
+    return size
+
+
+def text_block(lines: Sequence[TextItem], gap: Tuple[int, int], padding: int, height: int) -> Block:
+    """
+    两行文字左对齐排成一列, 中间留出间隔, 顶部留白
+    :param lines: 第一行与第二行文字
+    :param gap: 两行之间的间隔尺寸
+    :param padding: 顶部留白
+    :param height: 区块高度, 左右两列的高度相同
+    """
+    size, positions = stack([text_size(lines[0]), gap, text_size(lines[1])], axis=1, align=2)
+    block = Block(size[0], height)
+    for line, (x, y) in zip(lines, (positions[0], positions[2])):
+        block.texts.append((line, (x, y + padding)))
+    return block
+
+
+def image_block(source: Callable[[Tuple[int, int]], Image.Image], size: Tuple[int, int], padding: int) -> Block:
+    """
+    上下留白的图片
+    :param source: 按输出尺寸获取 RGBA 图片的函数, 返回的图片不会被修改或关闭
+    :param size: 排版时的图片尺寸
+    :param padding: 上下留白
+    """
+    block = Block(size[0], size[1] + padding * 2)
+    block.images.append((source, (0, padding, size[0], size[1])))
+    return block
+
+
+def rect_block(color: Optional[str], size: Tuple[int, int], padding: int = 0) -> Block:
+    """
+    上下留白的纯色矩形, 颜色为空时只占位
+    """
+    block = Block(size[0], size[1] + padding * 2)
+    if color is not None:
+        block.rects.append((color, (0, padding, size[0], size[1])))
+    return block
+
+
+@lru_cache(maxsize=32)
+def _sized_font(path: str, size: float) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(path, size)
+
+
+class StripLayout:
+    """
+    水印条的排版结果, 坐标为未缩放水印条上的浮点坐标
+    """
+
+    def __init__(self, size: Tuple[int, int], color):
+        self.size = size
+        self.color = color
+        self.texts: List[Tuple[TextItem, float, float, float]] = []
+        self.images: List[Tuple[Callable, Tuple[float, float, float, float]]] = []
+        self.rects: List[Tuple[str, Tuple[float, float, float, float]]] = []
+
+    def place(self, block: Block, x: int) -> int:
+        """
+        将区块缩放到水印条的高度后放在指定的横坐标
+        :return: 区块缩放后的宽度, 与 resize_image_with_height 的取整方式一致
+        """
+        scale = self.size[1] / block.height
+        for item, (tx, ty) in block.texts:
+            self.texts.append((item, x + tx * scale, ty * scale, scale))
+        for source, (bx, by, bw, bh) in block.images:
+            self.images.append((source, (x + bx * scale, by * scale, bw * scale, bh * scale)))
+        for color, (bx, by, bw, bh) in block.rects:
+            self.rects.append((color, (x + bx * scale, by * scale, bw * scale, bh * scale)))
+        return round(block.width * scale)
+
+    def append(self, blocks: Sequence[Block], padding: int, inner_padding: int, side='left'):
+        """
+        从一侧依次排列区块, 与 append_image_by_side(is_start=True) 的排列方式一致
+        :param blocks: 区块列表, 为空的区块跳过
+        :param padding: 边缘间距
+        :param inner_padding: 区块之间的间距
+        :param side: 排列方向，left/right
+        """
+        blocks = [block for block in blocks if block is not None]
+        if side == 'right':
+            x_offset = self.size[0] - padding
+            for block in reversed(blocks):
+                # 先算出缩放后的宽度再确定位置
+                width = round(block.width * self.size[1] / block.height)
+                x_offset -= width + inner_padding
+                self.place(block, x_offset)
+        else:
+            x_offset = padding
+            for block in blocks:
+                x_offset += self.place(block, x_offset) + inner_padding
+
+    def rasterize(self, width: int) -> Image.Image:
+        """
+        在输出宽度上绘制水印条
+        :param width: 水印条的输出宽度
+        :return: RGBA格式的水印条
+        """
+        factor = width / self.size[0]
+        canvas = Image.new('RGBA', (width, round(self.size[1] * factor)), color=self.color)
+
+        for source, box in self.images:
+            x0, y0, x1, y1 = self._scale_box(box, factor)
+            if x1 > x0 and y1 > y0:
+                canvas.paste(source((x1 - x0, y1 - y0)), (x0, y0))
+
+        draw = ImageDraw.Draw(canvas)
+        for color, box in self.rects:
+            x0, y0, x1, y1 = self._scale_box(box, factor)
+            if x1 > x0 and y1 > y0:
+                draw.rectangle((x0, y0, x1 - 1, y1 - 1), fill=color)
+
+        for item, x, y, scale in self.texts:
+            content = item.content or '   '
+            position = (round(x * factor), round(y * factor))
+            size = item.font.size * scale * factor
+            if size >= MIN_TEXT_SIZE:
+                draw.text(position, content, fill=item.fill, font=_sized_font(item.font.path, round(size, 2)))
+                continue
+
+            # 小字号的字形按整像素微调, 宽度与排版误差较大, 放大绘制后缩小到排版的区域
+            font = _sized_font(item.font.path, round(size * math.ceil(MIN_TEXT_SIZE / size), 2))
+            width, height = text_size(item)
+            target = (max(1, round(width * scale * factor)), max(1, round(height * scale * factor)))
+            with Image.new('RGBA', font.getbbox(content)[2:], color=self.color) as tile:
+                ImageDraw.Draw(tile).text((0, 0), content, fill=item.fill, font=font)
+                with tile.resize(target, Image.LANCZOS) as resized:
+                    canvas.paste(resized, position)
+        return canvas
+
+    @staticmethod
+    def _scale_box(box, factor: float) -> Tuple[int, int, int, int]:
+        x, y, w, h = box
+        return round(x * factor), round(y * factor), round((x + w) * factor), round((y + h) * factor)
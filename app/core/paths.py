@@ -0,0 +1,65 @@
+import sys
+import platform
+import logging
+from pathlib import Path
+
+LOG_LEVEL = logging.INFO
+
+# app 目录
+_APP_DIR = Path(__file__).parent.parent
+
+if getattr(sys, 'frozen', False):
+    ROOT_PATH = _APP_DIR.parent
+    if platform.system() == 'Windows':
+        APPDATA_PATH = ROOT_PATH.parent / "AppData"
+        RESOURCE_PATH = ROOT_PATH.parent / "resource"
+        LOG_PATH = APPDATA_PATH / "logs"
+        ASSETS_PATH = RESOURCE_PATH / "assets"
+        CACHE_PATH = APPDATA_PATH / "cache"
+        SETTINGS_PATH = APPDATA_PATH / "settings.json"
+        STYLE_PATH = RESOURCE_PATH / "style"
+        EXIFTOOL_PATH = APPDATA_PATH / "exiftool"
+        OUTPUT_PATH = APPDATA_PATH / "output"
+        FONT_PATH = RESOURCE_PATH / "fonts"
+    else:
+        APPDATA_PATH = f"{ROOT_PATH}/AppData"
+        RESOURCE_PATH = f"{ROOT_PATH}/resource"
+        LOG_PATH = f"{APPDATA_PATH}/logs"
+        ASSETS_PATH = f"{RESOURCE_PATH}/assets"
+        CACHE_PATH = f"{APPDATA_PATH}/cache"
+        SETTINGS_PATH = f"{APPDATA_PATH}/settings.json"
+        STYLE_PATH = f"{RESOURCE_PATH}/style"
+        EXIFTOOL_PATH = f"{APPDATA_PATH}/exiftool"
+        OUTPUT_PATH = f"{APPDATA_PATH}/output"
+        FONT_PATH = f"{RESOURCE_PATH}/fonts"
+else:
+    ROOT_PATH = _APP_DIR
+    APPDATA_PATH = ROOT_PATH.parent / "AppData"
+    RESOURCE_PATH = ROOT_PATH.parent / "resource"
+    LOG_PATH = APPDATA_PATH / "logs"
+    ASSETS_PATH = RESOURCE_PATH / "assets"
+    CACHE_PATH = APPDATA_PATH / "cache"
+    SETTINGS_PATH = APPDATA_PATH / "settings.json"
+    STYLE_PATH = RESOURCE_PATH / "style"
+    EXIFTOOL_PATH = APPDATA_PATH / "exiftool"
+    OUTPUT_PATH = APPDATA_PATH / "output"
+    FONT_PATH = RESOURCE_PATH / "fonts"
+
+
+LOGO_PATH = {
+    "default": Path(f"{RESOURCE_PATH}/logos/empty.png"),
+    "APPLE": Path(f"{RESOURCE_PATH}/logos/apple.png"),
+    "Canon": Path(f"{RESOURCE_PATH}/logos/canon.png"),
+    "DJI": Path(f"{RESOURCE_PATH}/logos/DJI.png"),
+    "\u7A7A": Path(f"{RESOURCE_PATH}/logos/empty.png"),
+    "FUJIFILM": Path(f"{RESOURCE_PATH}/logos/fujifilm.png"),
+    "HASSELBLAD": Path(f"{RESOURCE_PATH}/logos/hasselblad.png"),
+    "HUAWEI": Path(f"{RESOURCE_PATH}/logos/xmage.png"),
+    "leica": Path(f"{RESOURCE_PATH}/logos/leica_logo.png"),
+    "NIKON": Path(f"{RESOURCE_PATH}/logos/nikon.png"),
+    "Olympus": Path(f"{RESOURCE_PATH}/logos/olympus_blue_gold.png"),
+    "Panasonic": Path(f"{RESOURCE_PATH}/logos/panasonic.png"),
+    "PENTAX": Path(f"{RESOURCE_PATH}/logos/pentax.png"),
+    "RICOH": Path(f"{RESOURCE_PATH}/logos/RICOH.png"),
+    "SONY": Path(f"{RESOURCE_PATH}/logos/sony.png"),
+}
@@ -0,0 +1,141 @@
+import os
+import json
+from pathlib import Path
+from dataclasses import dataclass, fields, asdict
+from app.core.paths import STYLE_PATH
+
+
+@dataclass(frozen=True, slots=True)
+class RenderConfig:
+    """
+    渲染所需的配置, 字段与 app.config.Config 中的配置项同名
+    每个批次构建一次后不再修改, 显式传给渲染流程中的各个环节
+    不可变且可哈希, 可以直接作为缓存键的一部分, 也可以传给渲染子进程
+    """
+    styleName: str = "default"
+
+    baseQuality: int = 100
+    # 输出图片的最长边, 0 表示保持原图尺寸
+    maxOutputEdge: int = 0
+    baseFontName: str = "AlibabaPuHuiTi-2-45-Light"
+    boldFontName: str = "AlibabaPuHuiTi-2-45-Bold"
+    baseFontSize: int = 1
+    boldFontSize: int = 1
+    radiusInfo: int = 20
+    backgroundColor: str = "#ffffffff"
+
+    markMode: str = "standard"
+
+    useEquivalentFocal: bool = True
+    useOriginRatioPadding: bool = False
+    addShadow: bool = False
+    shadowColor: str = "#00000000"
+    shadowBlur: int = 20
+    backgroundBlur: bool = False
+    blurExtent: int = 35
+    blurHorizontalPadding: float = 0.09
+    blurTopPadding: float = 0.09
+    blurBottomPadding: float = 0.09
+
+    whiteMargin: bool = True
+    whiteMarginWidth: int = 3
+    whiteMarginColor: str = "#ffffff"
+
+    logoEnable: bool = True
+    isLogoLeft: bool = True
+    simpleLogoSize: float = 0.3
+    customLogoEnable: bool = False
+    customLogoPath: str = ""
+
+    leftTopType: str = "LensModel"
+    leftTopBold: bool = True
+    leftTopFontColor: str = "#212121"
+
+    leftBottomType: str = "Model"
+    leftBottomBold: bool = False
+    leftBottomFontColor: str = "#757575"
+
+    rightTopType: str = "Datetime"
+    rightTopBold: bool = True
+    rightTopFontColor: str = "#212121"
+
+    rightBottomType: str = "Param"
+    rightBottomBold: bool = False
+    rightBottomFontColor: str = "#757575"
+
+    standardVerticalPadding: float = 0.50
+    standardLeftPadding: int = 200
+    standardRightPadding: int = 200
+
+    simpleFirstLineType: str = "Model"
+    simpleFirstLineBold: bool = True
+    simpleFirstLineColor: str = "#212121"
+
+    simpleSecondLineType: str = "Param"
+    simpleSecondLineBold: bool = False
+    simpleSecondLineColor: str = "#757575"
+
+    simpleThirdLineType: str = "Datetime"
+    simpleThirdLineBold: bool = False
+    simpleThirdLineColor: str = "#757575"
+
+    simpleScale: float = 0.16
+    simplePaddingScale: float = 0.1
+
+    # 批量渲染的进程数, 0 表示使用全部 CPU 核心
+    renderWorkers: int = 0
+    # 背景模糊的质量, fast 在缩小的图片上模糊后放大, high 在原图上模糊
+    blurQuality: str = "fast"
+
+    def get_font_padding_level(self):
+        bold_font_size = self.boldFontSize if 1 <= self.boldFontSize <= 3 else 1
+        font_size = self.baseFontSize if 1 <= self.baseFontSize <= 3 else 1
+        return bold_font_size + font_size
+
+    @classmethod
+    def from_dict(cls, data: dict, base: "RenderConfig" = None) -> "RenderConfig":
+        """
+        从 {分组: {配置名: 值}} 格式的字典中构建配置
+        :param data: 设置文件、样式文件或 cfg.to_dict() 的内容
+        :param base: 字典中缺少的配置从这里取值, 为空时使用默认值
+        :return: 渲染配置
+        """
+        # 配置名在各分组中唯一, 与字段名只差首字母大小写
+        values = {}
+        for group in data.values():
+            if isinstance(group, dict):
+                for name, value in group.items():
+                    values[name.lower()] = value
+
+        kwargs = asdict(base) if base is not None else {}
+        kwargs.update({item.name: values[item.name.lower()]
+                       for item in fields(cls) if item.name.lower() in values})
+        return cls(**kwargs)
+
+    @classmethod
+    def from_file(cls, path, base: "RenderConfig" = None) -> "RenderConfig":
+        """
+        从设置文件或样式文件中构建配置, 文件不存在时使用默认配置
+        :param path: json 文件路径
+        :param base: 文件中缺少的配置从这里取值, 为空时使用默认值
+        :return: 渲染配置
+        """
+        if not os.path.exists(path):
+            return base if base is not None else cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f), base)
+
+    @classmethod
+    def from_style(cls, style: str, base: "RenderConfig" = None) -> "RenderConfig":
+        """
+        从 resource/style 中的样式构建配置
+        :param style: 样式名称或样式文件路径
+        :param base: 样式中缺少的配置从这里取值, 为空时使用默认值
+        :return: 渲染配置
+        """
+        style_path = Path(style)
+        if not style_path.is_file():
+            style_path = Path(f"{STYLE_PATH}/{style}.json")
+        if not style_path.is_file():
+            raise FileNotFoundError(f"样式不存在: {style}")
+        return cls.from_file(style_path, base)
@@ -0,0 +1,555 @@
+import os
+import time
+from functools import partial
+from pathlib import Path
+from typing import Optional
+from dataclasses import dataclass
+from app.core.render_config import RenderConfig
+from app.core.timing import ImageTiming, StageTimer
+from app.entity.enums import MARK_MODE, ExifId, DISPLAY_TYPE
+from app.entity.custom_error import CustomError
+from PIL import Image
+from PIL.Image import Transpose
+from app.entity.image_info import ImageInfo
+from app.utils.image_handle import (
+    text_to_image,
+    resize_height_with_size,
+    resize_image_with_height,
+    resize_image_to_fit,
+    open_image
+)
+from app.manager.font_manager import font_manager
+from app.manager.logo_manager import logo_manager
+from app.utils.image_render import (
+    add_shadow,
+    add_rounded_corners,
+    add_background_blur,
+    paste_rounded,
+    white_margin_size
+)
+from app.utils.render_cache import watermark_cache
+from app.utils.compositor import Layer, stack, compose
+from app.core.layout import StripLayout, TextItem, column_size, text_block, image_block, rect_block
+from app.utils.logger import setup_logger
+logger = setup_logger("renderer")
+
+
+NORMAL_HEIGHT = 1000
+TRANSPARENT = (0, 0, 0, 0)
+GRAY = '#CBCBC9'
+LINE_TRANSPARENT = Image.new('RGBA', (20, 1000), color=TRANSPARENT)
+LINE_GRAY = Image.new('RGBA', (20, 1000), color=GRAY)
+SMALL_VERTICAL_GAP = Image.new('RGBA', (20, 50), color=TRANSPARENT)
+MIDDLE_VERTICAL_GAP = Image.new('RGBA', (20, 100), color=TRANSPARENT)
+MIDDLE_HORIZONTAL_GAP = Image.new('RGBA', (100, 20), color=TRANSPARENT)
+LARGE_HORIZONTAL_GAP = Image.new('RGBA', (200, 20), color=TRANSPARENT)
+# 水印中图片之间的间距
+INNER_PADDING = 200
+
+
+@dataclass
+class RenderResult:
+    index: int
+    success: bool
+    errorInfo: str = ""
+    # 渲染耗时, 单位秒
+    elapsed: float = 0.0
+    # 分阶段耗时
+    timing: Optional[ImageTiming] = None
+
+
+class ImageRenderer:
+    """
+    单张图片的水印渲染流程，不依赖 QThread，可在子进程中使用
+    """
+
+    def __init__(self):
+        self.config: RenderConfig = None
+        # 原图, 合成到画布后即关闭
+        self.image: Image.Image = None
+        # 输出画布, 原图、阴影或模糊背景与水印条都直接合成到这一张图片上
+        self.watermark_img = None
+        self.orientation = None
+        # 按 EXIF 方向旋转后的原图尺寸
+        self.oriented_size = None
+        # 水印条上方的图片部分 (原图、带阴影的原图或模糊背景) 的尺寸
+        self.top_size = None
+        # 像素参数的缩放比例, 预览缩略图时小于 1
+        self.scale = 1.0
+        # 最近一次渲染的分阶段耗时
+        self.timer = StageTimer()
+
+    def render(self, image_path: Path, target_path: Path, config: RenderConfig,
+               exif: dict = None, max_size: int = 0):
+        """
+        渲染一张图片并保存到目标路径
+        :param image_path: 原图路径
+        :param target_path: 输出路径
+        :param config: 渲染配置
+        :param exif: 预取的 exif 信息, 为空时单独读取
+        :param max_size: 输出图片的最长边, 0 表示不限制
+        """
+        self.timer.reset()
+        try:
+            with self.timer.stage("decode"):
+                image, self.scale = open_image(image_path, max_size)
+            self.process(image, image_path, config, exif)
+            self.save(target_path, quality=config.baseQuality, max_size=max_size)
+        finally:
+            self.scale = 1.0
+            self.close()
+
+    def render_preview(self, image_path: Path, max_size: int, config: RenderConfig,
+                       exif: dict = None) -> Image.Image:
+        """
+        在缩略图上渲染预览, 像素参数按缩略比例缩放, 结果直接返回不写入文件
+        :param image_path: 原图路径
+        :param max_size: 缩略图的最大边长
+        :param config: 渲染配置
+        :param exif: 预取的 exif 信息, 为空时单独读取
+        :return: 渲染后的预览图片
+        """
+        self.timer.reset()
+        try:
+            with self.timer.stage("decode"):
+                image, self.scale = open_image(image_path, max_size)
+            self.process(image, image_path, config, exif)
+            return self.output_image().copy()
+        finally:
+            self.scale = 1.0
+            self.close()
+
+    def process(self, image: Image.Image, image_path: Path, config: RenderConfig, exif: dict = None):
+        self.config = config
+        self.image = image
+        with self.timer.stage("exif"):
+            image_info = ImageInfo(image_path, exif, config.useEquivalentFocal)
+        self.fix_orientation(image_info)
+        self.hanle_task(image_info)
+
+    def px(self, value: float) -> int:
+        """
+        按缩放比例换算像素值
+        """
+        return round(value * self.scale)
+
+    def scaled(self, image: Image.Image) -> Image.Image:
+        """
+        按缩放比例缩放固定尺寸的间隔图片
+        """
+        if self.scale == 1:
+            return image
+        return image.resize((max(1, self.px(image.width)), max(1, self.px(image.height))))
+
+    def get_ratio(self):
+        return self.oriented_size[0] / self.oriented_size[1]
+
+    def get_width(self):
+        return self.top_size[0]
+
+    def get_height(self):
+        return self.top_size[1]
+
+    def update_watermark_img(self, watermark_img) -> None:
+        if self.watermark_img == watermark_img:
+            return
+        original_watermark_img = self.watermark_img
+        self.watermark_img = watermark_img
+        if original_watermark_img is not None:
+            original_watermark_img.close()
+
+    def logo_path(self, make: str) -> Path:
+        """
+        根据厂商获取 logo 路径, 开启自定义 logo 时使用自定义的路径
+        :param make: 厂商
+        :return: logo 路径
+        """
+        if self.config.customLogoEnable:
+            if not os.path.exists(self.config.customLogoPath):
+                raise CustomError("自定义Logo不存在")
+            return Path(self.config.customLogoPath)
+        return logo_manager.logo_path(make)
+
+    def logo_key(self, make: str) -> tuple:
+        """
+        水印缓存键中的 logo 部分, logo 文件修改后缓存的水印条不再命中
+        """
+        return logo_manager.stamp(self.logo_path(make))
+
+    def load_logo(self, make: str) -> Image.Image:
+        """
+        根据厂商获取 logo, 预览时返回按缩放比例缩小后的 logo
+        返回的图片由 logo_manager 共享, 不能修改或关闭
+        :param make: 厂商
+        :return: logo
+        """
+        logo = self.load_origin_logo(make)
+        if self.scale == 1:
+            return logo
+        return logo_manager.scaled(self.logo_path(make), max(1, self.px(logo.height)))
+
+    def load_origin_logo(self, make: str) -> Image.Image:
+        """
+        根据厂商获取原始尺寸的 logo
+        :param make: 厂商
+        :return: logo
+        """
+        return logo_manager.get(self.logo_path(make))
+
+    def hanle_task(self, image_info: ImageInfo):
+        mode: MARK_MODE = MARK_MODE.key(self.config.markMode)
+        top_height = self.image.height
+        top_width = self.image.width
+        if self.config.backgroundBlur:
+            top_height = top_height * (1 + self.config.blurTopPadding + self.config.blurBottomPadding)
+            top_width = top_width * (1 + self.config.blurHorizontalPadding * 2)
+            self.compose_on_blur(image_info, mode, top_height, top_width)
+        else:
+            self.compose_below(image_info, mode, top_height, top_width)
+        # 原图已经合成到画布上, 提前释放
+        self.image.close()
+
+    def get_watermark(self, image_info: ImageInfo, mode: MARK_MODE, top_height: float, top_width: float):
+        with self.timer.stage("watermark"):
+            if mode == MARK_MODE.SIMPLE:
+                return self.simple_watermark(image_info, top_height)
+            return self.standard_watermark(image_info, int(top_width))
+
+    def compose_on_blur(self, image_info: ImageInfo, mode: MARK_MODE, top_height: float, top_width: float):
+        """
+        以模糊背景为画布, 水印条底部对齐叠加在画布上
+        """
+        with self.timer.stage("background_blur"):
+            canvas = add_background_blur(
+                self.image,
+                self.config,
+                bottom_padding=self.cal_water_mark_height(top_height, top_width, mode),
+                scale=self.scale)
+        self.top_size = canvas.size
+        self.update_watermark_img(canvas)
+        watermark = self.get_watermark(image_info, mode, top_height, top_width)
+
+        with self.timer.stage("composite"):
+            # 只在水印条的区域内合成, 不创建整张画布大小的前景图
+            overlay = Image.new('RGBA', watermark.size, TRANSPARENT)
+            overlay.paste(watermark, (0, 0), watermark)
+            canvas.alpha_composite(overlay, (0, canvas.height - watermark.height))
+            overlay.close()
+
+            if self.config.whiteMargin:
+                margin = white_margin_size(canvas.size, self.config)
+                # 画布之后只会转为 RGB, 边框直接画在 RGB 画布上
+                padded = Image.new('RGB', (canvas.width + margin * 2, canvas.height + margin * 2),
+                                   self.config.whiteMarginColor)
+                padded.paste(canvas, (margin, margin))
+                self.update_watermark_img(padded)
+
+    def compose_below(self, image_info: ImageInfo, mode: MARK_MODE, top_height: float, top_width: float):
+        """
+        水印条拼接在图片下方, 先算出最终尺寸, 再把图片、水印条与边框画到同一张画布上
+        """
+        shadow = None
+        if self.config.addShadow:
+            with self.timer.stage("shadow"):
+                with add_rounded_corners(self.image, self.config, self.config.backgroundColor) as rounded:
+                    shadow = add_shadow(rounded, self.config, self.scale)
+            self.top_size = shadow.size
+        else:
+            self.top_size = self.image.size
+        watermark = self.get_watermark(image_info, mode, top_height, top_width)
+
+        with self.timer.stage("composite"):
+            if mode == MARK_MODE.SIMPLE:
+                # 将水印图片作为底部扩展叠加到原图
+                with Image.new('RGBA', watermark.size, color='white') as white:
+                    strip = Image.alpha_composite(white, watermark)
+            else:
+                # 将水印图片放置在原始图片的下方
+                strip = watermark.resize((self.get_width(), watermark.height))
+
+            # 与垂直拼接的对齐方式一致: 宽度取较宽者, 右对齐
+            width = max(self.get_width(), strip.width)
+            height = self.get_height() + strip.height
+            margin = white_margin_size((width, height), self.config) if self.config.whiteMargin else 0
+            # 画布之后只会转为 RGB, 没有需要透明度的合成, 直接使用 RGB 画布
+            canvas = Image.new('RGB', (width + margin * 2, height + margin * 2),
+                               self.config.whiteMarginColor if self.config.whiteMargin else TRANSPARENT)
+            position = (margin + width - self.get_width(), margin)
+            if shadow is not None:
+                canvas.paste(shadow, position)
+                shadow.close()
+            else:
+                with self.timer.stage("rounded_corners"):
+                    canvas.paste(self.config.backgroundColor, position + (position[0] + self.image.width,
+                                                                          position[1] + self.image.height))
+                    paste_rounded(canvas, self.image, position, self.config)
+            canvas.paste(strip, (margin + width - strip.width, margin + self.get_height()))
+            strip.close()
+        self.update_watermark_img(canvas)
+
+    def simple_watermark(self, image_info: ImageInfo, origin_height: float):
+        key = (
+            MARK_MODE.SIMPLE,
+            image_info.parse_exif_info(self.config.simpleFirstLineType),
+            image_info.parse_exif_info(self.config.simpleSecondLineType),
+            image_info.parse_exif_info(self.config.simpleThirdLineType),
+            image_info.logo(),
+            self.logo_key(image_info.logo()) if self.config.logoEnable else None,
+            self.get_width(),
+            origin_height,
+            self.scale,
+            self.config
+        )
+        # 相同内容的水印条只生成一次, 缓存中的图片不能修改或关闭
+        return watermark_cache.get_or_create(
+            key, lambda: self.generate_simple_watermark(image_info, origin_height))
+
+    def cal_water_mark_height(self, height: float, width: float, mode: MARK_MODE):
+        if mode == MARK_MODE.SIMPLE:
+            return height * self.config.simpleScale
+        else:
+            ratio = (.04 if self.get_ratio() >= 1 else .09) + \
+            0.02 * self.config.get_font_padding_level()
+            result = resize_height_with_size(NORMAL_HEIGHT / ratio, NORMAL_HEIGHT, width)
+            if self.config.addShadow:
+              result += self.px(self.config.shadowBlur) * 2
+            return result
+
+    def generate_simple_watermark(self, image_info: ImageInfo, origin_height: float):
+        ratio = self.config.simpleScale
+        padding_ratio = self.config.simplePaddingScale
+        logo_ratio = self.config.simpleLogoSize
+
+        self.bg_color = self.config.backgroundColor
+
+        images = []
+        if self.config.logoEnable:
+            logo = self.load_logo(image_info.logo())
+            logo = logo_manager.scaled(self.logo_path(image_info.logo()), int(logo.height * logo_ratio))
+            images.append(logo)
+            images.append(self.scaled(LARGE_HORIZONTAL_GAP))
+
+        first_display_type: DISPLAY_TYPE = DISPLAY_TYPE.from_str(self.config.simpleFirstLineType)
+        if first_display_type != DISPLAY_TYPE.NONE:
+            first_text = text_to_image(image_info.parse_exif_info(self.config.simpleFirstLineType),
+                                       font_manager.get_font(self.config, self.scale),
+                                       font_manager.get_bold_font(self.config, self.scale),
+                                       is_bold=self.config.simpleFirstLineBold,
+                                       fill=self.config.simpleFirstLineColor)
+            images.append(first_text)
+            images.append(self.scaled(MIDDLE_VERTICAL_GAP))
+
+        second_display_type: DISPLAY_TYPE = DISPLAY_TYPE.from_str(self.config.simpleSecondLineType)
+        if second_display_type != DISPLAY_TYPE.NONE:
+            second_text = text_to_image(image_info.parse_exif_info(self.config.simpleSecondLineType),
+                                        font_manager.get_font(self.config, self.scale),
+                                        font_manager.get_bold_font(self.config, self.scale),
+                                        is_bold=self.config.simpleSecondLineBold,
+                                        fill=self.config.simpleSecondLineColor)
+            images.append(second_text)
+            images.append(self.scaled(MIDDLE_VERTICAL_GAP))
+
+        third_display_type: DISPLAY_TYPE = DISPLAY_TYPE.from_str(self.config.simpleThirdLineType)
+        if third_display_type != DISPLAY_TYPE.NONE:
+            third_text = text_to_image(image_info.parse_exif_info(self.config.simpleThirdLineType),
+                                       font_manager.get_font(self.config, self.scale),
+                                       font_manager.get_bold_font(self.config, self.scale),
+                                       is_bold=self.config.simpleThirdLineBold,
+                                       fill=self.config.simpleThirdLineColor)
+            images.append(third_text)
+
+        size, positions = stack([image.size for image in images], axis=1)
+        image = compose(size, [Layer(image, position) for image, position in zip(images, positions)])
+
+        content_height = origin_height * ratio
+
+        height = content_height * (1 - padding_ratio)
+        image = resize_image_with_height(image, int(height))
+        left_padding = int((self.get_width() - image.width) / 2)
+        right_padding = self.get_width() - image.width - left_padding
+        vertical_padding = int((content_height - image.height) / 2)
+
+        # 内容直接混合到带背景色的水印条上
+        watermark = compose((left_padding + image.width + right_padding, image.height + vertical_padding * 2),
+                            [Layer(image, (left_padding, vertical_padding), blend=True)], color=self.bg_color)
+        image.close()
+        return watermark
+
+    def standard_watermark(self, image_info: ImageInfo, origin_width: int):
+        key = (
+            MARK_MODE.STANDARD,
+            image_info.parse_exif_info(self.config.leftTopType),
+            image_info.parse_exif_info(self.config.leftBottomType),
+            image_info.parse_exif_info(self.config.rightTopType),
+            image_info.parse_exif_info(self.config.rightBottomType),
+            image_info.logo(),
+            self.logo_key(image_info.logo()),
+            self.get_ratio() >= 1,
+            origin_width,
+            self.scale,
+            self.config
+        )
+        # 相同内容的水印条只生成一次, 缓存中的图片不能修改或关闭
+        return watermark_cache.get_or_create(
+            key, lambda: self.generate_standard_watermark(image_info, origin_width))
+
+    def generate_standard_watermark(self, image_info: ImageInfo, origin_width: int):
+        self.bg_color = self.config.backgroundColor
+
+        # 下方水印的占比
+        ratio = (.04 if self.get_ratio() >= 1 else .09) + \
+            0.02 * self.config.get_font_padding_level()
+        # 水印中上下边缘空白部分的占比
+        padding_ratio = (.54 if self.get_ratio() >= 1 else .7) - \
+            0.04 * self.config.get_font_padding_level()
+        final_padding_ratio = padding_ratio if self.config.standardVerticalPadding < 0 else self.config.standardVerticalPadding
+
+        # 先在未缩放的水印条上排版, 再按输出宽度直接绘制
+        normal_height = self.px(NORMAL_HEIGHT)
+        layout = StripLayout((int(normal_height / ratio), normal_height), self.bg_color)
+
+        font = font_manager.get_font(self.config, self.scale)
+        bold_font = font_manager.get_bold_font(self.config, self.scale)
+
+        def text_item(display_type: str, is_bold: bool, fill: str) -> TextItem:
+            return TextItem(image_info.parse_exif_info(display_type), bold_font if is_bold else font, fill)
+
+        # 左边的文字内容
+        left_lines = [text_item(self.config.leftTopType, self.config.leftTopBold, self.config.leftTopFontColor),
+                      text_item(self.config.leftBottomType, self.config.leftBottomBold,
+                                self.config.leftBottomFontColor)]
+        # 右边的文字内容
+        right_lines = [text_item(self.config.rightTopType, self.config.rightTopBold, self.config.rightTopFontColor),
+                       text_item(self.config.rightBottomType, self.config.rightBottomBold,
+                                 self.config.rightBottomFontColor)]
+
+        # 左右两边的文字上下留白后高度相同, 之后缩放到水印条的高度
+        gap = (max(1, self.px(10)), self.px(100))
+        left_size = column_size(left_lines, gap)
+        right_size = column_size(right_lines, gap)
+        padding = int(max(left_size[1], right_size[1]) * final_padding_ratio)
+        height = left_size[1] + padding * 2
+        left = text_block(left_lines, gap, padding, height)
+        right = text_block(right_lines, gap, padding, height)
+
+        # 排版使用预览缩放后的 logo 尺寸, 绘制时从原始 logo 直接缩放到输出尺寸
+        logo = self.load_logo(image_info.logo())
+        logo_path = self.logo_path(image_info.logo())
+        logo_source = partial(logo_manager.fitted, logo_path)
+        line = rect_block(None, (max(1, self.px(20)), self.px(1000)))
+        left_padding = self.px(self.config.standardLeftPadding)
+        right_padding = self.px(self.config.standardRightPadding)
+        inner_padding = self.px(INNER_PADDING)
+        if self.config.logoEnable:
+            if self.config.isLogoLeft:
+                # 如果 logo 在左边
+                logo = image_block(logo_source, logo.size, int(final_padding_ratio * logo.height))
+                layout.append([line, logo, left], left_padding, inner_padding)
+                layout.append([right], right_padding, inner_padding, side='right')
+            else:
+                # 如果 logo 在右边
+                if logo is not None:
+                    # 如果 logo 不为空，等比例缩小 logo
+                    logo = image_block(logo_source, logo.size, int(padding_ratio * logo.height))
+                    # 插入一根线条用于分割 logo 和文字
+                    line_size = (max(1, self.px(LINE_GRAY.width)), max(1, self.px(LINE_GRAY.height)))
+                    line = rect_block(GRAY, line_size, int(padding_ratio * line_size[1] * .8))
+                layout.append([left], left_padding, inner_padding)
+                layout.append([logo, line, right], right_padding, inner_padding, side='right')
+        else:
+            layout.append([left], left_padding, inner_padding)
+            layout.append([right], right_padding, inner_padding, side='right')
+
+        return layout.rasterize(origin_width)
+
+    def fix_orientation(self, image_info: ImageInfo):
+        self.orientation = image_info.exif[ExifId.ORIENTATION.value] if ExifId.ORIENTATION.value in image_info.exif else 1
+        # 排版只需要旋转后的宽高比, 不旋转原图的像素
+        if self.orientation in ("Rotate 90 CW", "Rotate 270 CW"):
+            self.oriented_size = (self.image.height, self.image.width)
+        else:
+            self.oriented_size = self.image.size
+
+    def close(self):
+        if self.image:
+            self.image.close()
+        if self.watermark_img:
+            self.watermark_img.close()
+        self.image = None
+        self.watermark_img = None
+
+    def output_image(self) -> Image.Image:
+        """
+        将渲染结果恢复为原图的方向并转换为 RGB
+        """
+        with self.timer.stage("convert"):
+            return self._output_image()
+
+    def _output_image(self) -> Image.Image:
+        if self.orientation == "Rotate 0":
+            pass
+        elif self.orientation == "Rotate 90 CW":
+            self.update_watermark_img(self.watermark_img.transpose(Transpose.ROTATE_90))
+        elif self.orientation == "Rotate 180":
+            self.update_watermark_img(self.watermark_img.transpose(Transpose.ROTATE_180))
+        elif self.orientation == "Rotate 270 CW":
+            self.update_watermark_img(self.watermark_img.transpose(Transpose.ROTATE_270))
+        else:
+            pass
+
+        if self.watermark_img.mode != 'RGB':
+            self.update_watermark_img(self.watermark_img.convert('RGB'))
+        return self.watermark_img
+
+    def save(self, target_path, quality=100, max_size=0):
+        self.output_image()
+        if max_size:
+            # 边框、水印会让输出比原图大, 最后再整体缩放到限制以内
+            with self.timer.stage("resize"):
+                self.watermark_img = resize_image_to_fit(self.watermark_img, max_size)
+        with self.timer.stage("encode"):
+            self.watermark_img.save(target_path, quality=quality, encoding='utf-8')
+
+
+# 子进程内复用的渲染器与配置
+_renderer: Optional[ImageRenderer] = None
+_config: Optional[RenderConfig] = None
+
+
+def init_worker(config: RenderConfig):
+    """
+    进程池初始化函数，保存主进程传来的配置快照
+    :param config: 本批次的渲染配置
+    """
+    global _renderer, _config
+    _config = config
+    _renderer = ImageRenderer()
+
+
+def render_task(index: int, image_path: Path, target_path: Path, config: RenderConfig = None,
+                exif: dict = None, max_size: int = 0, renderer: ImageRenderer = None) -> RenderResult:
+    """
+    渲染单个任务，供进程池调用，异常会被转换为 RenderResult 返回
+    :param index: 任务下标
+    :param image_path: 原图路径
+    :param target_path: 输出路径
+    :param config: 渲染配置, 为空时使用子进程初始化时的配置
+    :param exif: 预取的 exif 信息
+    :param max_size: 输出图片的最长边, 0 表示不限制
+    :param renderer: 指定的渲染器, 为空时使用子进程内的渲染器
+    :return: 渲染结果
+    """
+    global _renderer
+    if renderer is None:
+        if _renderer is None:
+            _renderer = ImageRenderer()
+        renderer = _renderer
+    start = time.perf_counter()
+    try:
+        renderer.render(image_path, target_path, config or _config or RenderConfig(), exif, max_size)
+        return RenderResult(index, True, elapsed=time.perf_counter() - start, timing=renderer.timer.result())
+    except CustomError as e:
+        return RenderResult(index, False, e.message, time.perf_counter() - start, renderer.timer.result())
+    except Exception as e:
+        logger.exception(f"渲染出错，Error: {str(e)}")
+        return RenderResult(index, False, "未知错误", time.perf_counter() - start, renderer.timer.result())
@@ -0,0 +1,90 @@
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Set
+from app.entity.enums import SupportedImageFormats
+from app.utils.logger import setup_logger
+logger = setup_logger("scan")
+
+SUPPORTED_SUFFIXES = {f".{fmt.value}" for fmt in SupportedImageFormats}
+
+
+def path_key(path) -> str:
+    """
+    图片路径在去重索引中的键, 同一个文件的不同写法得到相同的键
+    :param path: 图片路径
+    :return: 规范化后的路径
+    """
+    return os.path.normcase(os.path.abspath(path))
+
+
+def unique_name(name: str, used: Set[str]) -> str:
+    """
+    输出文件名去重, 与已使用的文件名重复时在文件名后加 _1、_2 ...
+    :param name: 相对输出目录的文件名, 可以包含子目录
+    :param used: 已使用文件名的 normcase 集合, 返回的文件名会加入其中
+    :return: 不重复的文件名
+    """
+    stem, suffix = os.path.splitext(name)
+    candidate = name
+    count = 0
+    while os.path.normcase(candidate) in used:
+        count += 1
+        candidate = f"{stem}_{count}{suffix}"
+    used.add(os.path.normcase(candidate))
+    return candidate
+
+
+def is_supported_image(path) -> bool:
+    return os.path.splitext(str(path))[1].lower() in SUPPORTED_SUFFIXES
+
+
+def scan_images(paths: Iterable, recursive: bool = True, seen: Optional[Set[str]] = None) -> Iterator[Path]:
+    """
+    惰性遍历图片文件, 每读完一个目录就交出其中的图片, 不等待整个目录树遍历结束
+    同一目录中的图片按文件名排序, 子目录在图片之后遍历
+    :param paths: 图片或目录路径
+    :param recursive: 是否遍历子目录
+    :param seen: 已有图片的 path_key 集合, 用于去重, 交出的图片会加入其中
+    :return: 图片路径的迭代器
+    """
+    if seen is None:
+        seen = set()
+
+    def accept(path: str) -> bool:
+        key = path_key(path)
+        if key in seen:
+            return False
+        seen.add(key)
+        return True
+
+    for root in paths:
+        root = str(root)
+        if os.path.isfile(root):
+            if is_supported_image(root) and accept(root):
+                yield Path(root)
+            continue
+
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            files, dirs = [], []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_file():
+                                if is_supported_image(entry.name):
+                                    files.append(entry.path)
+                            elif recursive and entry.is_dir(follow_symlinks=False):
+                                dirs.append(entry.path)
+                        except OSError:
+                            continue
+            except OSError as e:
+                logger.warning(f"无法读取目录 {directory}: {str(e)}")
+                continue
+
+            for path in sorted(files):
+                if accept(path):
+                    yield Path(path)
+            # 栈顶先出, 倒序入栈后按名称顺序遍历子目录
+            stack.extend(sorted(dirs, reverse=True))
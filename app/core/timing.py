@@ -0,0 +1,187 @@
+"""
+渲染流程的分阶段计时
+
+每张图片的各个阶段记录墙钟时间与 CPU 时间, 批次结束后汇总为 p50/p95 统计表,
+写入日志, 也可以导出为 JSON 或 Chrome Trace (chrome://tracing, Perfetto) 格式
+计时只使用 perf_counter 与 process_time, 开销在微秒级, 可以常开
+"""
+import os
+import sys
+import json
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块, 不采集内存峰值
+    resource = None
+
+
+class Span(NamedTuple):
+    """
+    一个阶段的耗时, 时间单位均为秒
+    """
+    name: str
+    start: float
+    wall: float
+    cpu: float
+
+
+@dataclass
+class ImageTiming:
+    """
+    单张图片的计时结果, 由渲染进程回传给主进程
+    """
+    pid: int
+    spans: List[Span] = field(default_factory=list)
+    # 渲染结束时进程的内存峰值, 单位字节, 无法采集时为 0
+    peak_rss: int = 0
+
+
+def peak_rss() -> int:
+    """
+    获取当前进程的内存峰值, 单位字节
+    """
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 的单位是字节, Linux 的单位是 KB
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class StageTimer:
+    """
+    记录一张图片各个阶段的耗时
+    """
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.spans.append(Span(name, start, time.perf_counter() - start, time.process_time() - cpu))
+
+    def reset(self):
+        self.spans = []
+
+    def result(self) -> ImageTiming:
+        return ImageTiming(os.getpid(), self.spans, peak_rss())
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    最近秩法计算百分位数
+    :param values: 已排序的数值
+    :param percent: 百分位, 0 - 100
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+class BatchTimings:
+    """
+    汇总一个批次中所有图片的分阶段耗时
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.images: Dict[int, ImageTiming] = {}
+        # 主进程中的阶段, 例如批量读取 exif
+        self.main = StageTimer()
+
+    def add(self, index: int, timing: Optional[ImageTiming]):
+        if timing is not None:
+            self.images[index] = timing
+
+    def stages(self) -> Dict[str, List[Span]]:
+        """
+        按阶段名称归类, 保持阶段第一次出现的顺序
+        """
+        stages: Dict[str, List[Span]] = {}
+        for span in self.main.spans:
+            stages.setdefault(span.name, []).append(span)
+        for timing in self.images.values():
+            for span in timing.spans:
+                stages.setdefault(span.name, []).append(span)
+        return stages
+
+    def summary(self) -> dict:
+        """
+        汇总各阶段的次数、总耗时与 p50/p95, 时间单位为毫秒
+        """
+        stages = {}
+        for name, spans in self.stages().items():
+            walls = sorted(span.wall * 1000 for span in spans)
+            cpus = sorted(span.cpu * 1000 for span in spans)
+            stages[name] = {
+                "count": len(spans),
+                "total_ms": round(sum(walls), 3),
+                "wall_p50_ms": round(percentile(walls, 50), 3),
+                "wall_p95_ms": round(percentile(walls, 95), 3),
+                "cpu_p50_ms": round(percentile(cpus, 50), 3),
+                "cpu_p95_ms": round(percentile(cpus, 95), 3),
+            }
+        peaks = [timing.peak_rss for timing in self.images.values()] + [peak_rss()]
+        return {
+            "images": len(self.images),
+            "elapsed_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "peak_rss_mb": round(max(peaks) / 1024 / 1024, 1),
+            "stages": stages,
+        }
+
+    def format_table(self) -> str:
+        """
+        将汇总结果格式化为文本表格, 用于写入日志
+        """
+        summary = self.summary()
+        lines = [f"分阶段耗时 (ms), 图片 {summary['images']} 张, "
+                 f"总耗时 {summary['elapsed_ms']:.0f} ms, 内存峰值 {summary['peak_rss_mb']} MB",
+                 f"{'阶段':<16}{'次数':>8}{'总计':>12}{'p50':>10}{'p95':>10}{'cpu p50':>10}{'cpu p95':>10}"]
+        for name, stage in summary["stages"].items():
+            lines.append(f"{name:<18}{stage['count']:>8}{stage['total_ms']:>12.1f}{stage['wall_p50_ms']:>10.2f}"
+                         f"{stage['wall_p95_ms']:>10.2f}{stage['cpu_p50_ms']:>10.2f}{stage['cpu_p95_ms']:>10.2f}")
+        return "\n".join(lines)
+
+    def trace_events(self) -> List[dict]:
+        """
+        转换为 Chrome Trace 的事件列表, 每个进程一条时间线
+        """
+        events = []
+        main_pid = os.getpid()
+        for span in self.main.spans:
+            events.append(self._trace_event(span, main_pid, {}))
+        for index, timing in sorted(self.images.items()):
+            for span in timing.spans:
+                events.append(self._trace_event(span, timing.pid, {"index": index}))
+        return events
+
+    def _trace_event(self, span: Span, pid: int, args: dict) -> dict:
+        # perf_counter 在各进程间使用同一个单调时钟, 以批次开始的时间为零点
+        return {
+            "name": span.name,
+            "ph": "X",
+            "ts": round((span.start - self.start) * 1e6, 1),
+            "dur": round(span.wall * 1e6, 1),
+            "pid": pid,
+            "tid": pid,
+            "args": {**args, "cpu_ms": round(span.cpu * 1000, 3)},
+        }
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+    def write_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f)
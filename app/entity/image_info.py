@@ -5,7 +5,6 @@ from app.utils.logger import setup_logger
 from app.entity.enums import ExifId, DISPLAY_TYPE
 from datetime import datetime
 from dateutil import parser
-from app.config import cfg
 from app.entity.custom_error import CustomError
 from app.utils.image_handle import get_exif, extract_attribute
 logger = setup_logger("image_info")
@@ -19,10 +18,13 @@ class ImageInfo(object):
     path: str
     exif: dict
 
-    def __init__(self, path: str):
+    def __init__(self, path: str, exif: dict = None, use_equivalent_focal: bool = True):
         self.path = path
         self.name = os.path.basename(path)
-        self.exif = get_exif(path)
+        # 批量预取过的 exif 信息直接使用, 否则单独读取
+        self.exif = exif if exif is not None else get_exif(path)
+        # 拍摄参数中是否使用等效焦距
+        self.use_equivalent_focal = use_equivalent_focal
 
     def logo(self) -> str:
         return extract_attribute(
@@ -115,7 +117,7 @@ class ImageInfo(object):
         :return: 拍摄参数字符串
         """
         self.focal_length, self.focal_length_in_35mm_film = self.get_focal_length()
-        focal_length = self.focal_length_in_35mm_film if cfg.useEquivalentFocal.value else self.focal_length
+        focal_length = self.focal_length_in_35mm_film if self.use_equivalent_focal else self.focal_length
         f_number: str = extract_attribute(
             self.exif, ExifId.F_NUMBER.value, default_value=DEFAULT_VALUE)
         exposure_time: str = extract_attribute(self.exif, ExifId.EXPOSURE_TIME.value, default_value=DEFAULT_VALUE,
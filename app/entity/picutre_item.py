@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from app.thread.image_handle_thread import ImageHandleStatus
+from app.core.batch import ImageHandleStatus
 
 
 @dataclass
@@ -7,5 +7,7 @@ class PictureItem:
     name: str
     original_path: str
     target_path: str
+    # 相对输出目录的输出文件名, 同一批图片中不重复
+    output_name: str
     status: ImageHandleStatus
     errorInfo: str = ""
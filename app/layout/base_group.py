@@ -8,7 +8,7 @@ from app.components.common_card import (
 )
 from app.config import cfg
 from app.manager.font_manager import font_manager
-from app.utils.image_handle import qcolor_to_hex, hex_to_qcolor
+from app.utils.qcolor import qcolor_to_hex, hex_to_qcolor
 
 
 class BaseGroup(SettingCardGroup):
@@ -29,6 +29,7 @@ class BaseGroup(SettingCardGroup):
         self.baseFontSizeValue = cfg.baseFontSize.value
         self.boldFontSizeValue = cfg.boldFontSize.value
         self.baseQualityValue = cfg.baseQuality.value
+        self.maxOutputEdgeValue = cfg.maxOutputEdge.value
         self.radiusInfoValue = cfg.radiusInfo.value
 
     def __setup_sub_layout(self):
@@ -88,6 +89,15 @@ class BaseGroup(SettingCardGroup):
             maximum=100,
         )
 
+        # 输出尺寸
+        self.maxOutputEdge = SpinBoxSettingCard(
+            FIF.FIT_PAGE,
+            self.tr("最大输出边长"),
+            self.tr("限制输出图片的最长边, 0 表示保持原图尺寸"),
+            minimum=0,
+            maximum=20000,
+        )
+
         # 圆角设置
         self.radiusInfo = SpinBoxSettingCard(
             FIF.ALIGNMENT,
@@ -104,6 +114,7 @@ class BaseGroup(SettingCardGroup):
         self.addSettingCard(self.boldFont)
         self.addSettingCard(self.boldFontSize)
         self.addSettingCard(self.baseQuality)
+        self.addSettingCard(self.maxOutputEdge)
         self.addSettingCard(self.radiusInfo)
 
     def reset_style(self):
@@ -116,6 +127,7 @@ class BaseGroup(SettingCardGroup):
         self.baseFont.comboBox.setCurrentText(self.baseFontName)
         self.boldFont.comboBox.setCurrentText(self.boldFontName)
         self.baseQuality.setValue(self.baseQualityValue)
+        self.maxOutputEdge.setValue(self.maxOutputEdgeValue)
         self.radiusInfo.setValue(self.radiusInfoValue)
         self.baseFontSize.setValue(self.baseFontSizeValue)
         self.boldFontSize.setValue(self.boldFontSizeValue)
@@ -134,6 +146,8 @@ class BaseGroup(SettingCardGroup):
             lambda text: setattr(self, "boldFontSizeValue", text))
         self.baseQuality.valueChanged.connect(
             lambda text: setattr(self, "baseQualityValue", text))
+        self.maxOutputEdge.valueChanged.connect(
+            lambda text: setattr(self, "maxOutputEdgeValue", text))
         self.radiusInfo.valueChanged.connect(
             lambda text: setattr(self, "radiusInfoValue", text))
 
@@ -146,6 +160,7 @@ class BaseGroup(SettingCardGroup):
         self.boldFontName = style_content["Base"]["BoldFontName"]
         self.boldFontSizeValue = style_content["Base"]["BoldFontSize"]
         self.baseQualityValue = int(style_content["Base"]["BaseQuality"])
+        self.maxOutputEdgeValue = int(style_content["Base"].get("MaxOutputEdge", 0))
         self.radiusInfoValue = int(style_content["Base"]["RadiusInfo"])
         self.__set_settings()
 
@@ -158,6 +173,7 @@ class BaseGroup(SettingCardGroup):
         cfg.set(cfg.baseFontSize, self.baseFontSizeValue)
         cfg.set(cfg.boldFontSize, self.boldFontSizeValue)
         cfg.set(cfg.baseQuality, self.baseQualityValue)
+        cfg.set(cfg.maxOutputEdge, self.maxOutputEdgeValue)
         cfg.set(cfg.radiusInfo, self.radiusInfoValue)
 
     
@@ -6,7 +6,7 @@ from app.components.common_card import (
     ColorSettingCard
 )
 from app.config import cfg
-from app.utils.image_handle import qcolor_to_hex, hex_to_qcolor
+from app.utils.qcolor import qcolor_to_hex, hex_to_qcolor
 
 
 class GlobalGroup(SettingCardGroup):
@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+from app.core.paths import CACHE_PATH
+from app.utils.exif_reader import EXIFTOOL_BACKEND
+from app.utils.logger import setup_logger
+
+logger = setup_logger("exif_cache_manager")
+
+# 缓存条目上限, 超出后按最近访问时间淘汰
+MAX_ENTRIES = 50000
+# 每写入多少条检查一次是否需要淘汰
+EVICT_INTERVAL = 500
+
+
+class ExifCacheManager:
+    """
+    持久化的 exif 缓存, 以 (绝对路径, 文件大小, 修改时间) 作为键, 文件变化后自动失效
+    没有元信息的文件缓存为空字典, 截图、导出图片等不会每次都交给 exiftool
+    """
+
+    def __init__(self, db_path: Path = None, max_entries: int = MAX_ENTRIES):
+        self.db_path = Path(db_path or f"{CACHE_PATH}/exif_cache.sqlite3")
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._puts = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS exif_cache (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    backend TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_exif_cache_accessed ON exif_cache (accessed)")
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(path) -> Optional[Tuple[str, int, int]]:
+        try:
+            abs_path = os.path.abspath(str(path))
+            stat = os.stat(abs_path)
+            return abs_path, stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self, path, native: bool = True) -> Optional[Tuple[dict, str]]:
+        """
+        读取单个文件的缓存
+        :param path: 照片路径
+        :param native: 是否接受 Pillow 读取的结果, 为 False 时只返回 exiftool 的完整结果
+        :return: (exif信息, 后端名称), 未命中时返回 None
+        """
+        return self.get_many([path], native).get(path)
+
+    def get_many(self, paths: Iterable, native: bool = True) -> Dict[str, Tuple[dict, str]]:
+        """
+        批量读取缓存
+        :param paths: 照片路径列表
+        :param native: 是否接受 Pillow 读取的结果
+        :return: 以传入路径为键的 (exif信息, 后端名称) 字典, 只包含命中的文件
+        """
+        result = {}
+        try:
+            conn = self._connection()
+            hits = []
+            for path in paths:
+                key = self._key(path)
+                if key is None:
+                    continue
+                row = conn.execute(
+                    "SELECT size, mtime_ns, backend, data FROM exif_cache WHERE path = ?", (key[0],)).fetchone()
+                if row is None or (row[0], row[1]) != key[1:]:
+                    continue
+                if not native and row[2] != EXIFTOOL_BACKEND:
+                    continue
+                result[path] = (json.loads(row[3]), row[2])
+                hits.append(key[0])
+            if hits:
+                now = time.time()
+                conn.executemany("UPDATE exif_cache SET accessed = ? WHERE path = ?",
+                                 [(now, hit) for hit in hits])
+                conn.commit()
+        except Exception as e:
+            logger.error(f"读取 exif 缓存失败: {e}")
+        return result
+
+    def put(self, path, exif: dict, backend: str):
+        self.put_many({path: (exif, backend)})
+
+    def put_many(self, items: Dict[str, Tuple[dict, str]]):
+        """
+        批量写入缓存
+        :param items: 以路径为键的 (exif信息, 后端名称) 字典, exif信息为空字典时记录为没有元信息
+        """
+        try:
+            rows = []
+            now = time.time()
+            for path, (exif, backend) in items.items():
+                key = self._key(path)
+                if key is None:
+                    continue
+                rows.append((*key, backend, json.dumps(exif, ensure_ascii=False), now))
+            if not rows:
+                return
+            conn = self._connection()
+            conn.executemany("INSERT OR REPLACE INTO exif_cache VALUES (?, ?, ?, ?, ?, ?)", rows)
+            conn.commit()
+
+            self._puts += len(rows)
+            if self._puts >= EVICT_INTERVAL:
+                self._puts = 0
+                self.evict()
+        except Exception as e:
+            logger.error(f"写入 exif 缓存失败: {e}")
+
+    def invalidate(self, path):
+        """
+        删除指定文件的缓存, 在修改文件的元信息后调用
+        """
+        try:
+            conn = self._connection()
+            conn.execute("DELETE FROM exif_cache WHERE path = ?", (os.path.abspath(str(path)),))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"删除 exif 缓存失败: {e}")
+
+    def evict(self):
+        """
+        按最近访问时间淘汰超出上限的缓存
+        """
+        conn = self._connection()
+        count = conn.execute("SELECT COUNT(*) FROM exif_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return
+        conn.execute(
+            "DELETE FROM exif_cache WHERE path IN "
+            "(SELECT path FROM exif_cache ORDER BY accessed ASC LIMIT ?)", (overflow,))
+        conn.commit()
+        logger.info(f"exif 缓存已淘汰 {overflow} 条")
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM exif_cache")
+        conn.commit()
+
+
+exif_cache_manager = ExifCacheManager()
@@ -0,0 +1,256 @@
+import os
+import atexit
+import shutil
+import zipfile
+import platform
+import threading
+import subprocess
+from queue import Queue, Empty
+from pathlib import Path
+from typing import List, Tuple
+from app.core.paths import EXIFTOOL_PATH
+from app.entity.custom_error import CustomError
+from app.utils.logger import setup_logger
+
+logger = setup_logger("exiftool_manager")
+
+
+def exiftool_command() -> Path:
+    if platform.system() == 'Windows':
+        return Path(f"{EXIFTOOL_PATH}/exiftool.exe")
+    elif shutil.which('exiftool'):
+        return Path(shutil.which('exiftool'))
+    else:
+        check_handle_exiftool()
+        return Path(f"{EXIFTOOL_PATH}/exiftool-mac/exiftool")
+
+
+def check_handle_exiftool():
+    """
+    检查并解压exiftool，修复文件权限问题
+    """
+    dir_path = Path(f"{EXIFTOOL_PATH}/exiftool-mac")
+    if os.path.isdir(dir_path):
+        return
+
+    zip_path = Path(f"{EXIFTOOL_PATH}/exiftool-mac.zip")
+    if not os.path.exists(zip_path):
+        logger.error(f"Error: 文件 {zip_path} 不存在")
+        raise CustomError("exifTool zip文件不存在", 503)
+
+    if not zipfile.is_zipfile(zip_path):
+        logger.error(f"Error: {zip_path} 不是有效的zip文件")
+        raise CustomError("exifTool zip不是有效文件", 502)
+
+    try:
+        # 解压文件
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            zip_ref.extractall(os.path.dirname(zip_path))
+            logger.info(f"成功解压 {zip_path} 到当前目录")
+
+        # macOS专用：修复权限和文件类型
+        if platform.system() == 'Darwin':
+            exiftool_path = dir_path / "exiftool"
+            # 移除可能存在的扩展属性
+            subprocess.run(['xattr', '-c', str(exiftool_path)], check=True)
+            # 添加可执行权限
+            subprocess.run(['chmod', '+x', str(exiftool_path)], check=True)
+            # 验证文件类型
+            subprocess.run(['file', str(exiftool_path)], check=True)
+
+        return True
+    except subprocess.CalledProcessError as e:
+        logger.error(f"修复权限失败: {e}")
+        raise CustomError("exifTool 权限修复失败", 504)
+    except Exception as e:
+        logger.exception(f"解压失败: {e}")
+        raise CustomError("exifTool 解压失败", 501)
+
+
+class PipeReader:
+    """
+    在后台线程中持续读取管道, 避免 exiftool 写满一个管道的缓冲区后阻塞, 而主线程在等待另一个管道
+    """
+
+    def __init__(self, stream):
+        self._buffer = b''
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._pump, args=(stream.fileno(),), daemon=True)
+        self._thread.start()
+
+    def _pump(self, fd: int):
+        try:
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                with self._condition:
+                    self._buffer += chunk
+                    self._condition.notify_all()
+        except OSError:
+            pass
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+
+    def read_until(self, ready: str) -> str:
+        """
+        等待并取出标记之前的输出, 标记之后的内容留给下一条命令
+        :param ready: 结束标记
+        :return: 标记之前的输出
+        """
+        sentinel = ready.encode('utf-8')
+        with self._condition:
+            while sentinel not in self._buffer:
+                if self._closed:
+                    raise CustomError("exiftool 进程意外退出", 505)
+                self._condition.wait()
+            output, _, self._buffer = self._buffer.partition(sentinel)
+            self._buffer = self._buffer.lstrip(b'\r\n')
+        return output.decode('utf-8', errors='ignore')
+
+
+class ExifToolSession:
+    """
+    常驻的 exiftool 进程，通过 -stay_open True -@ - 从标准输入逐条接收命令
+    """
+
+    def __init__(self):
+        self.process: subprocess.Popen = None
+        self._stderr: PipeReader = None
+        self._counter = 0
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        command = [str(exiftool_command()), '-stay_open', 'True', '-@', '-']
+        subprocess_args = {
+            'stdin': subprocess.PIPE,
+            'stdout': subprocess.PIPE,
+            'stderr': subprocess.PIPE,
+        }
+
+        if platform.system() == 'Windows':
+            subprocess_args['creationflags'] = subprocess.CREATE_NO_WINDOW
+
+        self.process = subprocess.Popen(command, **subprocess_args)
+        # 错误输出在后台读取, 警告很多时也不会与标准输出互相阻塞
+        self._stderr = PipeReader(self.process.stderr)
+        logger.info(f"exiftool 常驻进程已启动, pid: {self.process.pid}")
+
+    def execute(self, args: List[str]) -> Tuple[str, str]:
+        """
+        执行一条 exiftool 命令
+        :param args: 命令参数, 不包含 exiftool 本身
+        :return: (标准输出, 错误输出)
+        """
+        if not self.is_alive():
+            self.start()
+
+        self._counter += 1
+        ready = f"{{ready{self._counter}}}"
+        lines = [str(arg) for arg in args]
+        if platform.system() == 'Windows':
+            # 通过参数文件传入的路径需要显式指定编码
+            lines = ['-charset', 'filename=utf8'] + lines
+        lines += ['-echo4', ready, f'-execute{self._counter}']
+        payload = ''.join(f"{line}\n" for line in lines)
+
+        self.process.stdin.write(payload.encode('utf-8'))
+        self.process.stdin.flush()
+
+        stdout = self._read_until(self.process.stdout.fileno(), ready)
+        stderr = self._stderr.read_until(ready)
+        return stdout, stderr
+
+    def _read_until(self, fd: int, ready: str) -> str:
+        sentinel = ready.encode('utf-8')
+        output = b''
+        while not output.rstrip().endswith(sentinel):
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise CustomError("exiftool 进程意外退出", 505)
+            output += chunk
+        output = output.rstrip()[:-len(sentinel)]
+        return output.decode('utf-8', errors='ignore')
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            if self.is_alive():
+                self.process.stdin.write(b"-stay_open\nFalse\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=3)
+        except Exception as e:
+            logger.info(f"exiftool 进程无法正常退出, 强制结束: {e}")
+            self.process.kill()
+        finally:
+            for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+                if stream:
+                    stream.close()
+            self.process = None
+            self._stderr = None
+
+
+class ExifToolManager:
+    """
+    管理一组常驻的 exiftool 进程，进程崩溃后自动重启，程序退出时统一关闭
+    """
+
+    def __init__(self, pool_size: int = 2):
+        self.pool_size = pool_size
+        self._sessions: List[ExifToolSession] = []
+        self._idle: Queue = Queue()
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> ExifToolSession:
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+
+        with self._lock:
+            if len(self._sessions) < self.pool_size:
+                session = ExifToolSession()
+                self._sessions.append(session)
+                return session
+        return self._idle.get()
+
+    def _release(self, session: ExifToolSession):
+        self._idle.put(session)
+
+    def execute(self, args: List[str]) -> Tuple[str, str]:
+        """
+        从进程池中取出一个 exiftool 进程执行命令，失败时重启进程并重试一次
+        :param args: 命令参数
+        :return: (标准输出, 错误输出)
+        """
+        session = self._acquire()
+        try:
+            try:
+                return session.execute(args)
+            except (OSError, CustomError) as e:
+                logger.error(f"exiftool 进程异常, 正在重启: {e}")
+                session.close()
+                return session.execute(args)
+        except Exception:
+            session.close()
+            raise
+        finally:
+            self._release(session)
+
+    def shutdown(self):
+        """
+        关闭所有常驻的 exiftool 进程
+        """
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+
+
+exiftool_manager = ExifToolManager()
+atexit.register(exiftool_manager.shutdown)
@@ -1,11 +1,13 @@
 import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import List
 from pathlib import Path
-from app.config import FONT_PATH
+from app.core.paths import FONT_PATH
+from app.core.render_config import RenderConfig
 from PIL import ImageFont
 from pathlib import Path
-from app.config import cfg
 
 
 @dataclass
@@ -14,9 +16,16 @@ class FontItem:
     path: Path
 
 
+# 缓存的字体对象数量上限
+MAX_CACHED_FONTS = 8
+
+
 class FontManager:
     def __init__(self):
         self.items: List[FontItem] = []
+        # 以 (字体名称, 字号, 字重) 为键缓存已加载的字体, 每个进程各自持有
+        self._fonts: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
         self.load_fonts()
 
     def load_fonts(self):
@@ -47,8 +56,8 @@ class FontManager:
 
         return Path(self.items[0].path)
 
-    def get_font_size(self):
-        font_size = cfg.baseFontSize.value
+    def get_font_size(self, config: RenderConfig):
+        font_size = config.baseFontSize
         if font_size == 1:
             return 240
         elif font_size == 2:
@@ -58,11 +67,11 @@ class FontManager:
         else:
             return 240
 
-    def get_font(self):
-        return ImageFont.truetype(self.font_path(cfg.baseFontName.value), self.get_font_size())
+    def get_font(self, config: RenderConfig, scale: float = 1.0):
+        return self.load_font(config.baseFontName, round(self.get_font_size(config) * scale), "regular")
 
-    def get_bold_font_size(self):
-        font_size = cfg.boldFontSize.value
+    def get_bold_font_size(self, config: RenderConfig):
+        font_size = config.boldFontSize
         if font_size == 1:
             return 260
         elif font_size == 2:
@@ -72,8 +81,37 @@ class FontManager:
         else:
             return 260
 
-    def get_bold_font(self):
-        return ImageFont.truetype(self.font_path(cfg.boldFontName.value), self.get_bold_font_size())
+    def get_bold_font(self, config: RenderConfig, scale: float = 1.0):
+        return self.load_font(config.boldFontName, round(self.get_bold_font_size(config) * scale), "bold")
+
+    def load_font(self, name: str, size: int, variant: str) -> ImageFont.FreeTypeFont:
+        """
+        获取字体对象, 相同的字体只解析一次
+        :param name: 字体名称
+        :param size: 字号
+        :param variant: 字重, regular/bold
+        :return: 字体对象
+        """
+        key = (name, size, variant)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                return font
+
+        font = ImageFont.truetype(self.font_path(name), size)
+        with self._lock:
+            self._fonts[key] = font
+            while len(self._fonts) > MAX_CACHED_FONTS:
+                self._fonts.popitem(last=False)
+        return font
+
+    def clear_cache(self):
+        """
+        清空已缓存的字体
+        """
+        with self._lock:
+            self._fonts.clear()
 
 
 font_manager = FontManager()
@@ -0,0 +1,116 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+from PIL import Image
+from app.core.paths import LOGO_PATH
+from app.utils.render_cache import RenderCache
+from app.utils.logger import setup_logger
+
+logger = setup_logger("logo_manager")
+
+# 缩放后的 logo 占用内存的上限
+MAX_VARIANT_BYTES = 32 * 1024 * 1024
+
+
+class LogoManager:
+    """
+    进程内共享的 logo 缓存, 批次与预览之间复用
+    厂商对应的 logo 路径只匹配一次, 原图解码后常驻内存, 缩放后的 logo 按目标尺寸缓存
+    文件修改后按修改时间重新读取, 用于自定义 logo
+    缓存中的图片是共享的, 使用方不能修改或关闭
+    """
+
+    def __init__(self):
+        # 按 LOGO_PATH 的顺序匹配厂商, 先匹配到的优先
+        self._candidates = [(key.lower(), path) for key, path in LOGO_PATH.items()]
+        # 以厂商为键的 logo 路径
+        self._paths: Dict[str, Path] = {}
+        # 以路径为键的 ((修改时间, 文件大小), 原图)
+        self._logos: Dict[str, Tuple[tuple, Image.Image]] = {}
+        self._variants = RenderCache(MAX_VARIANT_BYTES)
+        self._lock = threading.Lock()
+
+    def logo_path(self, make: str) -> Path:
+        """
+        获取厂商对应的 logo 路径, 厂商名称包含 LOGO_PATH 中的键即匹配, 没有匹配时使用默认 logo
+        :param make: 厂商
+        :return: logo 路径
+        """
+        path = self._paths.get(make)
+        if path is None:
+            make_lower = make.lower()
+            path = next((value for key, value in self._candidates if key in make_lower), LOGO_PATH['default'])
+            self._paths[make] = path
+        return path
+
+    def get(self, path) -> Image.Image:
+        """
+        获取 logo 原图, 文件修改后重新读取
+        :param path: logo 路径
+        :return: 原图
+        """
+        key, stamp = self.stamp(path)
+        with self._lock:
+            cached = self._logos.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        with Image.open(path) as image:
+            image.load()
+            logo = image.copy()
+        with self._lock:
+            self._logos[key] = (stamp, logo)
+        if cached is not None:
+            logger.info(f"logo 文件已修改, 重新读取: {key}")
+        return logo
+
+    def scaled(self, path, height: int) -> Image.Image:
+        """
+        获取按高度等比缩放的 logo, 与 resize_image_with_height 的结果一致
+        :param path: logo 路径
+        :param height: 目标高度
+        :return: 缩放后的 logo
+        """
+        logo = self.get(path)
+        if height == logo.height:
+            return logo
+        size = (round(logo.width * (height / logo.height)), height)
+        return self._variant(path, logo, size, logo.mode)
+
+    def fitted(self, path, size: Tuple[int, int]) -> Image.Image:
+        """
+        获取缩放到指定尺寸的 RGBA 格式 logo
+        :param path: logo 路径
+        :param size: 目标尺寸
+        :return: 缩放后的 logo
+        """
+        return self._variant(path, self.get(path), size, 'RGBA')
+
+    def clear_cache(self):
+        with self._lock:
+            self._paths.clear()
+            self._logos.clear()
+        self._variants.clear()
+
+    def _variant(self, path, logo: Image.Image, size: Tuple[int, int], mode: str) -> Image.Image:
+        key, stamp = self.stamp(path)
+
+        def create():
+            source = logo if logo.mode == mode else logo.convert(mode)
+            return source.resize(size, Image.LANCZOS)
+
+        # 键中包含文件的修改时间, 文件修改后旧的缓存不再命中, 按 LRU 淘汰
+        return self._variants.get_or_create((key, stamp, size, mode), create)
+
+    @staticmethod
+    def stamp(path) -> Tuple[str, tuple]:
+        """
+        logo 文件的标识, 文件修改后改变, 可以作为缓存键的一部分
+        :return: (绝对路径, (修改时间, 文件大小))
+        """
+        stat = os.stat(path)
+        return os.path.abspath(path), (stat.st_mtime_ns, stat.st_size)
+
+
+logo_manager = LogoManager()
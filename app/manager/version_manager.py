@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from typing import Optional, List
 from app.entity.constants import CHECK_VERSION_URL, CURRENT_VERSION, IS_INNER
 from packaging import version
-from app.config import ROOT_PATH
+from app.core.paths import ROOT_PATH
 
 from app.utils.logger import setup_logger
 logger = setup_logger("version_manager")
@@ -0,0 +1,88 @@
+import os
+import threading
+from typing import Iterator, List, Optional, Set, Tuple
+from PyQt5.QtCore import QThread, pyqtSignal
+from app.core.batch import TaskQueue, create_task
+from app.core.scan import scan_images, unique_name
+from app.utils.logger import setup_logger
+logger = setup_logger("folder_scan_thread")
+
+# 每批发送给界面的图片数
+SCAN_CHUNK_SIZE = 200
+
+
+class FolderScanThread(QThread):
+    """
+    在后台递归遍历文件夹中的图片, 分批发送给界面
+    输出文件按相对扫描目录的路径保存, 与已导入的图片重名时加上序号
+    扫描过程中开始处理时可以接上渲染任务队列, 之后扫描到的图片直接放入队列渲染
+    """
+    # (图片路径, 输出文件名) 列表
+    found = pyqtSignal(list)
+
+    def __init__(self, folders: List[str], seen: Set[str], names: Set[str]):
+        """
+        :param folders: 需要遍历的文件夹
+        :param seen: 已导入图片的 path_key 集合的副本, 扫描线程独占使用
+        :param names: 已使用的输出文件名集合的副本, 扫描线程独占使用
+        """
+        super().__init__()
+        self.folders = folders
+        self.seen = seen
+        self.names = names
+        # 已扫描到的全部图片, (图片路径, 输出文件名)
+        self.paths: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+        self._done = False
+        self._queue: Optional[TaskQueue] = None
+        self._target_path = None
+
+    def run(self):
+        chunk = []
+        try:
+            for path, name in self.scan():
+                with self._lock:
+                    self.paths.append((path, name))
+                    task_queue = self._queue
+                if task_queue is not None:
+                    # 队列满时在这里等待渲染, 不阻塞界面
+                    task_queue.put(create_task(path, name, self._target_path))
+                chunk.append((path, name))
+                if len(chunk) >= SCAN_CHUNK_SIZE:
+                    self.found.emit(chunk)
+                    chunk = []
+            if chunk:
+                self.found.emit(chunk)
+        except Exception as e:
+            logger.exception(f"扫描文件夹出错，Error: {str(e)}")
+        finally:
+            with self._lock:
+                self._done = True
+                task_queue = self._queue
+            if task_queue is not None:
+                task_queue.close()
+
+    def scan(self) -> Iterator[Tuple[str, str]]:
+        """
+        遍历图片并确定输出文件名, 与 cli 的 --recursive 一致按相对扫描目录的路径输出
+        :return: (图片路径, 输出文件名) 的迭代器
+        """
+        for folder in self.folders:
+            for path in scan_images([folder], recursive=True, seen=self.seen):
+                path = str(path)
+                yield path, unique_name(os.path.relpath(path, folder), self.names)
+
+    def attach(self, task_queue: TaskQueue, target_path: str) -> Tuple[List[Tuple[str, str]], bool]:
+        """
+        接上渲染任务队列, 之后扫描到的图片由扫描线程放入队列, 扫描结束时关闭队列
+        :param task_queue: 渲染任务队列
+        :param target_path: 输出目录
+        :return: (接上之前已扫描到的 (图片路径, 输出文件名), 是否接上), 扫描已经结束时不会接上, 由调用方关闭队列
+        """
+        with self._lock:
+            if self._done:
+                return list(self.paths), False
+            self._queue = task_queue
+            self._target_path = target_path
+            return list(self.paths), True
+
@@ -1,440 +1,46 @@
-import os
-from enum import Enum
-from typing import List
-from pathlib import Path
+from typing import Iterable
 from PyQt5.QtCore import QThread, pyqtSignal
-from dataclasses import dataclass
-from app.config import cfg, LOGO_PATH
-from app.entity.enums import MARK_MODE, ExifId
-from app.entity.custom_error import CustomError
-from PIL import Image, ImageOps
-from PIL.Image import Transpose
-from app.entity.image_info import ImageInfo
-from app.utils.image_handle import (
-    text_to_image,
-    concatenate_image,
-    padding_image,
-    append_image_by_side,
-    resize_image_with_width,
-    resize_height_with_size,
-    merge_images,
-    resize_image_with_height
+from app.config import cfg
+from app.core.render_config import RenderConfig
+from app.core.batch import (
+    BatchRenderer,
+    ImageHandleStatus,
+    ImageHandleTask,
+    TaskUpdate,
+    HandleProgress
 )
-from app.manager.font_manager import font_manager
-from app.utils.image_render import (
-    add_shadow,
-    add_rounded_corners,
-    add_white_margin,
-    add_background_blur
-)
-from app.entity.enums import ExifId, DISPLAY_TYPE
 from app.utils.logger import setup_logger
 logger = setup_logger("image_handle_thread")
 
 
-NORMAL_HEIGHT = 1000
-TRANSPARENT = (0, 0, 0, 0)
-GRAY = '#CBCBC9'
-LINE_TRANSPARENT = Image.new('RGBA', (20, 1000), color=TRANSPARENT)
-LINE_GRAY = Image.new('RGBA', (20, 1000), color=GRAY)
-SMALL_VERTICAL_GAP = Image.new('RGBA', (20, 50), color=TRANSPARENT)
-MIDDLE_VERTICAL_GAP = Image.new('RGBA', (20, 100), color=TRANSPARENT)
-MIDDLE_HORIZONTAL_GAP = Image.new('RGBA', (100, 20), color=TRANSPARENT)
-LARGE_HORIZONTAL_GAP = Image.new('RGBA', (200, 20), color=TRANSPARENT)
-
-
-class ImageHandleStatus(Enum):
-    WAITING = "等待中"
-    PROCESSING = "处理中"
-    FINISHED = "已完成"
-    ERROR = "出错"
-
-
-@dataclass
-class ImageHandleTask:
-    image_path: Path
-    target_path: Path
-    status: ImageHandleStatus = ImageHandleStatus.WAITING
-    errorInfo: str = ""
-
-
-@dataclass
-class HandleProgress:
-    tasks: List[ImageHandleTask]
-    progress: int
-
-
 class ImageHandleThread(QThread):
     finished = pyqtSignal(HandleProgress)
     loading = pyqtSignal(HandleProgress)
     error = pyqtSignal(str)
 
-    def __init__(self, tasks: List[ImageHandleStatus]):
-        super().__init__()
-        self.tasks = tasks
-        self.image: Image.Image = None
-        self.watermark_img = None
-        self._logos = {}
-
-    def get_ratio(self):
-        return self.image.width / self.image.height
-
-    def get_watermark_img(self) -> Image.Image:
-        if self.watermark_img is None:
-            self.watermark_img = self.image.copy()
-        return self.watermark_img
-
-    def get_width(self):
-        return self.get_watermark_img().width
-
-    def get_height(self):
-        return self.get_watermark_img().height
-
-    def update_watermark_img(self, watermark_img) -> None:
-        if self.watermark_img == watermark_img:
-            return
-        original_watermark_img = self.watermark_img
-        self.watermark_img = watermark_img
-        if original_watermark_img is not None:
-            original_watermark_img.close()
-
-    def load_logo(self, make: str) -> Image.Image:
+    def __init__(self, tasks: Iterable[ImageHandleTask], max_workers: int = None, max_size: int = None,
+                 config: RenderConfig = None):
         """
-        根据厂商获取 logo
-        :param make: 厂商
-        :return: logo
+        :param tasks: 任务列表, 或边扫描边放入任务的 TaskQueue
         """
-        if cfg.customLogoEnable.value:
-            if self._logos.get("custom") is None:
-                if not os.path.exists(cfg.customLogoPath.value):
-                    raise CustomError("自定义Logo不存在")
-                custom_logo_path = Path(cfg.customLogoPath.value)
-                self._logos["custom"] = Image.open(custom_logo_path)
-            return self._logos["custom"]
-
-        # 已经读到内存中的 logo
-        if make in self._logos:
-            return self._logos[make]
-        # 未读取到内存中的 logo
-        for (key, value) in LOGO_PATH.items():
-            if key == '':
-                pass
-            if key.lower() in make.lower():
-                logo = Image.open(value)
-                self._logos[make] = logo
-                return logo
-        logo_path = LOGO_PATH['default']
-        logo = Image.open(logo_path)
-        self._logos[make] = logo
-        return logo
-
-    def run(self):
-        progress = 0
-        for index, task in enumerate(self.tasks):
-            try:
-                self.image = Image.open(task.image_path)
-                if cfg.backgroundBlur.value:
-                    bgColor = TRANSPARENT
-                else:
-                    bgColor = cfg.backgroundColor.value
-                self.image = add_rounded_corners(self.image, bgColor)
-                self.watermark_img = self.image.copy()
-                image_info = ImageInfo(task.image_path)
-                self.fix_orientation(image_info)
-                self.tasks[index].status = ImageHandleStatus.PROCESSING
-                self.loading.emit(HandleProgress(self.tasks, progress))
-                self.hanle_task(image_info)
-                self.save(task.target_path, quality=cfg.baseQuality.value)
-
-                self.tasks[index].status = ImageHandleStatus.FINISHED
-                progress = int(index / len(self.tasks) * 100)
-                self.loading.emit(HandleProgress(self.tasks, progress))
-            except CustomError as e:
-                self.tasks[index].status = ImageHandleStatus.ERROR
-                self.tasks[index].errorInfo = e.message
-                self.loading.emit(HandleProgress(self.tasks, progress))
-            except Exception as e:
-                logger.exception(f"渲染出错，Error: {str(e)}")
-                self.tasks[index].status = ImageHandleStatus.ERROR
-                self.tasks[index].errorInfo = "未知错误"
-                self.loading.emit(HandleProgress(self.tasks, progress))
-        self.close()
-        self.finished.emit(HandleProgress(self.tasks, 100))
-
-    def hanle_task(self, image_info: ImageInfo):
-        mode: MARK_MODE = MARK_MODE.key(cfg.markMode.value)
-        top_height = self.get_height()
-        top_width = self.get_width()
-        if cfg.backgroundBlur.value:
-            top_height = top_height * (1 + cfg.blurTopPadding.value + cfg.blurBottomPadding.value)
-            top_width = top_width * (1 + cfg.blurHorizontalPadding.value * 2)
-
-        if (cfg.backgroundBlur.value):
-            image = add_background_blur(
-                self.get_watermark_img(), bottom_padding=self.cal_water_mark_height(top_height, top_width, mode))
-            self.update_watermark_img(image)
-        elif (cfg.addShadow.value):
-            image = add_shadow(self.get_watermark_img())
-            self.update_watermark_img(image)
-
-        if mode == MARK_MODE.SIMPLE:
-            self.simple_mode(image_info, top_height)
-        else:
-            self.standard_mode(image_info, int(top_width))
-        
-        if (cfg.whiteMargin.value):
-            image = add_white_margin(self.get_watermark_img())
-            self.update_watermark_img(image)
-
-    def simple_mode(self, image_info: ImageInfo, origin_height: float):
-        watermark = self.generate_simple_watermark(image_info, origin_height)
-
-        if cfg.backgroundBlur.value:
-            # 将水印图片底部对齐作为前景叠加到原图
-            bg = self.get_watermark_img().convert('RGBA')
-            fg = Image.new('RGBA', bg.size, TRANSPARENT)
-            fg.paste(watermark, (0, bg.height - watermark.height), watermark)
-            result = Image.alpha_composite(bg, fg)
-
-            self.update_watermark_img(result)
-        else:
-             # 将水印图片作为底部扩展叠加到原图
-            bg = Image.new('RGBA', watermark.size, color='white')
-            bg = Image.alpha_composite(bg, watermark)
-
-            watermark_img = merge_images([self.get_watermark_img(), bg], 1, 1)
-            self.update_watermark_img(watermark_img) 
-    
-    def cal_water_mark_height(self, height: float, width: float, mode: MARK_MODE):
-        if mode == MARK_MODE.SIMPLE:
-            return height * cfg.simpleScale.value
-        else:
-            ratio = (.04 if self.get_ratio() >= 1 else .09) + \
-            0.02 * cfg.get_font_padding_level()
-            result = resize_height_with_size(NORMAL_HEIGHT / ratio, NORMAL_HEIGHT, width)
-            if cfg.addShadow.value:
-              result += cfg.shadowBlur.value * 2
-            return result
-
-    def generate_simple_watermark(self, image_info: ImageInfo, origin_height: float):
-        ratio = cfg.simpleScale.value
-        padding_ratio = cfg.simplePaddingScale.value
-        logo_ratio = cfg.simpleLogoSize.value
-
-        self.bg_color = cfg.backgroundColor.value
-
-        images = []
-        if cfg.logoEnable.value:
-            logo = self.load_logo(image_info.logo())
-            logo = resize_image_with_height(logo, int(logo.height * logo_ratio), auto_close=False)
-            images.append(logo)
-            images.append(LARGE_HORIZONTAL_GAP)
-
-        first_display_type: DISPLAY_TYPE = DISPLAY_TYPE.from_str(cfg.simpleFirstLineType.value)
-        if first_display_type != DISPLAY_TYPE.NONE:
-            first_text = text_to_image(image_info.parse_exif_info(cfg.simpleFirstLineType.value),
-                                       font_manager.get_font(),
-                                       font_manager.get_bold_font(),
-                                       is_bold=cfg.simpleFirstLineBold.value,
-                                       fill=cfg.simpleFirstLineColor.value)
-            images.append(first_text)
-            images.append(MIDDLE_VERTICAL_GAP)
-
-        second_display_type: DISPLAY_TYPE = DISPLAY_TYPE.from_str(cfg.simpleSecondLineType.value)
-        if second_display_type != DISPLAY_TYPE.NONE:
-            second_text = text_to_image(image_info.parse_exif_info(cfg.simpleSecondLineType.value),
-                                        font_manager.get_font(),
-                                        font_manager.get_bold_font(),
-                                        is_bold=cfg.simpleSecondLineBold.value,
-                                        fill=cfg.simpleSecondLineColor.value)
-            images.append(second_text)
-            images.append(MIDDLE_VERTICAL_GAP)
-        
-        third_display_type: DISPLAY_TYPE = DISPLAY_TYPE.from_str(cfg.simpleThirdLineType.value)
-        if third_display_type != DISPLAY_TYPE.NONE:
-            third_text = text_to_image(image_info.parse_exif_info(cfg.simpleThirdLineType.value),
-                                       font_manager.get_font(),
-                                       font_manager.get_bold_font(),
-                                       is_bold=cfg.simpleThirdLineBold.value,
-                                       fill=cfg.simpleThirdLineColor.value)
-            images.append(third_text)
-
-        image = merge_images(images, 1, 0)
-
-        content_height = origin_height * ratio
-        
-        height = content_height * (1 - padding_ratio)
-        image = resize_image_with_height(image, int(height))
-        bg = Image.new('RGBA', image.size, self.bg_color)
-        image = Image.alpha_composite(bg, image)
-        left_padding = int((self.get_width() - image.width) / 2)
-        right_padding = self.get_width() - image.width - left_padding
-        vertical_padding = int((content_height - image.height) / 2)
-
-        return ImageOps.expand(
-            image, (left_padding, vertical_padding, right_padding, vertical_padding), fill=self.bg_color)
-
-    def standard_mode(self, image_info: ImageInfo, origin_width: int):
-        watermark = self.generate_standard_watermark(image_info, origin_width)
-
-        if cfg.backgroundBlur.value:
-            # 将水印图片底部对齐作为前景叠加到原图
-            bg = self.get_watermark_img().convert('RGBA')
-            fg = Image.new('RGBA', bg.size, TRANSPARENT)
-            fg.paste(watermark, (0, bg.height - watermark.height), watermark)
-            result = Image.alpha_composite(bg, fg)
-        else:  
-          # 将水印图片放置在原始图片的下方
-          watermark_resized = watermark.resize((self.get_width(), watermark.height))
-          bg = ImageOps.expand(self.get_watermark_img().convert('RGBA'),
-                              border=(0, 0, 0, watermark_resized.height),
-                              fill=TRANSPARENT)
-          fg = ImageOps.expand(watermark_resized, border=(
-              0, self.get_height(), 0, 0), fill=TRANSPARENT)
-          result = Image.alpha_composite(bg, fg)
-        
-        watermark.close()
-        # 更新图片对象
-        result = ImageOps.exif_transpose(result).convert('RGBA')
-        self.update_watermark_img(result)
-
-    def generate_standard_watermark(self, image_info: ImageInfo, origin_width: int):
-        self.bg_color = cfg.backgroundColor.value
-
-        # 下方水印的占比
-        ratio = (.04 if self.get_ratio() >= 1 else .09) + \
-            0.02 * cfg.get_font_padding_level()
-        # 水印中上下边缘空白部分的占比
-        padding_ratio = (.54 if self.get_ratio() >= 1 else .7) - \
-            0.04 * cfg.get_font_padding_level()
-        final_padding_ratio = padding_ratio if cfg.standardVerticalPadding.value < 0 else cfg.standardVerticalPadding.value
-
-        # 创建一个空白的水印图片
-        watermark = Image.new(
-            'RGBA', (int(NORMAL_HEIGHT / ratio), NORMAL_HEIGHT), color=self.bg_color)
-
-        with Image.new('RGBA', (10, 100), color=self.bg_color) as empty_padding:
-            # 填充左边的文字内容
-            left_top = text_to_image(image_info.parse_exif_info(cfg.leftTopType.value),
-                                     font_manager.get_font(),
-                                     font_manager.get_bold_font(),
-                                     is_bold=cfg.leftTopBold.value,
-                                     fill=cfg.leftTopFontColor.value,
-                                     color=self.bg_color)
-            left_bottom = text_to_image(image_info.parse_exif_info(cfg.leftBottomType.value),
-                                        font_manager.get_font(),
-                                        font_manager.get_bold_font(),
-                                        is_bold=cfg.leftBottomBold.value,
-                                        fill=cfg.leftBottomFontColor.value,
-                                        color=self.bg_color)
-            left = concatenate_image(
-                [left_top, empty_padding, left_bottom], color=self.bg_color)
-            # 填充右边的文字内容
-            right_top = text_to_image(image_info.parse_exif_info(cfg.rightTopType.value),
-                                      font_manager.get_font(),
-                                      font_manager.get_bold_font(),
-                                      is_bold=cfg.rightTopBold.value,
-                                      fill=cfg.rightTopFontColor.value,
-                                      color=self.bg_color)
-            right_bottom = text_to_image(image_info.parse_exif_info(cfg.rightBottomType.value),
-                                         font_manager.get_font(),
-                                         font_manager.get_bold_font(),
-                                         is_bold=cfg.rightBottomBold.value,
-                                         fill=cfg.rightBottomFontColor.value,
-                                         color=self.bg_color)
-            right = concatenate_image(
-                [right_top, empty_padding, right_bottom], color=self.bg_color)
-
-        # 将左右两边的文字内容等比例缩放到相同的高度
-        max_height = max(left.height, right.height)
-        left = padding_image(
-            left, int(max_height * final_padding_ratio), 'tb', color=self.bg_color)
-        right = padding_image(right, int(
-            max_height * final_padding_ratio), 't', color=self.bg_color)
-        right = padding_image(right, left.height -
-                              right.height, 'b',  color=self.bg_color)
-
-        logo = self.load_logo(image_info.logo())
-        line = Image.new('RGBA', (20, 1000), color=self.bg_color)
-        if cfg.logoEnable.value:
-            if cfg.isLogoLeft.value:
-                # 如果 logo 在左边
-                line = line.copy()
-                logo = padding_image(
-                    logo, int(final_padding_ratio * logo.height), color=self.bg_color)
-                append_image_by_side(
-                    watermark, 
-                    [line, logo, left], 
-                    padding=cfg.standardLeftPadding.value, 
-                    is_start=True
-                )
-                append_image_by_side(watermark, [right], padding=cfg.standardRightPadding.value, side='right', is_start=True)
-            else:
-                # 如果 logo 在右边
-                if logo is not None:
-                    # 如果 logo 不为空，等比例缩小 logo
-                    logo = padding_image(
-                        logo, int(padding_ratio * logo.height), color=self.bg_color)
-                    # 插入一根线条用于分割 logo 和文字
-                    line = padding_image(LINE_GRAY, int(
-                        padding_ratio * LINE_GRAY.height * .8), color=self.bg_color)
-                else:
-                    line = line.copy()
-                append_image_by_side(watermark, [left], padding=cfg.standardLeftPadding.value, is_start=True)
-                append_image_by_side(
-                    watermark, [logo, line, right], padding=cfg.standardRightPadding.value, side='right', is_start=True)
-                line.close()
-        else:
-            append_image_by_side(watermark, [left], padding=cfg.standardLeftPadding.value, is_start=True)
-            append_image_by_side(watermark, [right], padding=cfg.standardRightPadding.value, side='right', is_start=True)
-        left.close()
-        right.close()
-
-        # 缩放水印的大小
-        watermark = resize_image_with_width(watermark, origin_width)
-
-        return watermark
-
-    def fix_orientation(self, image_info: ImageInfo):
-        self.orientation = image_info.exif[ExifId.ORIENTATION.value] if ExifId.ORIENTATION.value in image_info.exif else 1
-        if self.orientation == "Rotate 0":
-            pass
-        elif self.orientation == "Rotate 90 CW":
-            self.image = self.image.transpose(Transpose.ROTATE_270)
-        elif self.orientation == "Rotate 180":
-            self.image = self.image.transpose(Transpose.ROTATE_180)
-        elif self.orientation == "Rotate 270 CW":
-            self.image = self.image.transpose(Transpose.ROTATE_90)
-        else:
-            pass
-
-    def close(self):
-        if self.image:
-            self.image.close()
-        if self.watermark_img:
-            self.watermark_img.close()
+        super().__init__()
+        # 创建时获取配置快照, 渲染过程中修改设置不影响本批次
+        # 进度只传递有变化的任务, 并按固定间隔合并, 任务再多界面的开销也不变
+        self.batch = BatchRenderer(tasks, config or cfg.render_config(), max_workers, max_size,
+                                   on_progress=self.loading.emit)
 
-    def save(self, target_path, quality=100):
-        if self.orientation == "Rotate 0":
-            pass
-        elif self.orientation == "Rotate 90 CW":
-            self.watermark_img = self.watermark_img.transpose(
-                Transpose.ROTATE_90)
-        elif self.orientation == "Rotate 180":
-            self.watermark_img = self.watermark_img.transpose(
-                Transpose.ROTATE_180)
-        elif self.orientation == "Rotate 270 CW":
-            self.watermark_img = self.watermark_img.transpose(
-                Transpose.ROTATE_270)
-        else:
-            pass
+    @property
+    def tasks(self):
+        return self.batch.tasks
 
-        if self.watermark_img.mode != 'RGB':
-            self.watermark_img = self.watermark_img.convert('RGB')
+    def worker_count(self) -> int:
+        return self.batch.worker_count()
 
-        if 'exif' in self.image.info:
-            self.watermark_img.save(target_path, quality=quality, encoding='utf-8',
-                                    exif=self.image.info['exif'] if 'exif' in self.image.info else '')
-        else:
-            self.watermark_img.save(
-                target_path, quality=quality, encoding='utf-8')
+    def run(self):
+        try:
+            self.batch.run()
+        except Exception as e:
+            logger.exception(f"批量处理出错，Error: {str(e)}")
+            self.error.emit("批量处理出错")
+            return
+        self.finished.emit(HandleProgress([], 100, self.batch.done, self.batch.total))
@@ -0,0 +1,127 @@
+import threading
+from pathlib import Path
+from PIL import Image
+from typing import Optional, Tuple
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage
+from app.config import cfg
+from app.entity.custom_error import CustomError
+from app.core.render_config import RenderConfig
+from app.core.renderer import ImageRenderer
+from app.utils.image_handle import get_exif
+from app.utils.logger import setup_logger
+logger = setup_logger("preview_thread")
+
+# 合并预览请求的等待时间(毫秒)
+PREVIEW_DELAY = 150
+
+# 所有预览共用一个渲染器, logo 由 logo_manager 在进程内共享
+_renderer = ImageRenderer()
+_renderer_lock = threading.Lock()
+
+
+def pil_to_qimage(image: Image.Image) -> QImage:
+    """
+    将 PIL 图片转换为 QImage, 不经过文件
+    :param image: PIL 图片对象
+    :return: QImage 对象
+    """
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    data = image.tobytes('raw', 'RGB')
+    qimage = QImage(data, image.width, image.height, image.width * 3, QImage.Format_RGB888)
+    # QImage 不持有 data 的引用, 需要拷贝一份
+    return qimage.copy()
+
+
+class PreviewThread(QThread):
+    """
+    在缩略图上渲染样式预览, 结果通过信号直接交给界面
+    被 requestInterruption 打断后不再发送结果
+    """
+    ready = pyqtSignal(QImage)
+    error = pyqtSignal(str)
+
+    def __init__(self, image_path: Path, max_size: int, config: RenderConfig):
+        super().__init__()
+        self.image_path = image_path
+        self.max_size = max_size
+        self.config = config
+
+    def run(self):
+        try:
+            exif = get_exif(self.image_path)
+            with _renderer_lock:
+                if self.isInterruptionRequested():
+                    return
+                image = _renderer.render_preview(self.image_path, self.max_size, self.config, exif)
+            if not self.isInterruptionRequested():
+                self.ready.emit(pil_to_qimage(image))
+        except CustomError as e:
+            self.error.emit(e.message)
+        except Exception as e:
+            logger.exception(f"预览渲染出错，Error: {str(e)}")
+            self.error.emit("未知错误")
+
+
+class PreviewScheduler(QObject):
+    """
+    预览渲染调度器
+    短时间内的多次请求合并为一次, 同一时间只有一个预览在渲染,
+    新的请求到达后正在渲染的结果即视为过期, 只有最新一次请求的结果会发送出去
+    """
+    finished = pyqtSignal(QImage)
+    error = pyqtSignal(str)
+
+    def __init__(self, parent=None, delay: int = PREVIEW_DELAY):
+        super().__init__(parent)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self._start)
+        self._request: Optional[Tuple[Path, int]] = None
+        self._generation = 0
+        self._thread: Optional[PreviewThread] = None
+
+    def schedule(self, image_path: Path, max_size: int):
+        """
+        请求渲染预览, 在等待时间内没有新的请求时才开始渲染
+        :param image_path: 预览原图路径
+        :param max_size: 缩略图的最大边长
+        """
+        self._generation += 1
+        self._request = (image_path, max_size)
+        if self._thread is not None:
+            self._thread.requestInterruption()
+        self._timer.start()
+
+    def _start(self):
+        # 上一次渲染结束后再开始, 避免多个渲染同时占用 CPU
+        if self._request is None or self._thread is not None:
+            return
+
+        image_path, max_size = self._request
+        self._request = None
+        generation = self._generation
+
+        # 在界面线程中获取配置快照, 渲染线程不再读取 cfg
+        thread = PreviewThread(image_path, max_size, cfg.render_config())
+        thread.ready.connect(lambda image: self._onReady(generation, image))
+        thread.error.connect(lambda info: self._onError(generation, info))
+        thread.finished.connect(self._onThreadFinished)
+        self._thread = thread
+        thread.start()
+
+    def _onReady(self, generation: int, image: QImage):
+        if generation == self._generation:
+            self.finished.emit(image)
+
+    def _onError(self, generation: int, info: str):
+        if generation == self._generation:
+            self.error.emit(info)
+
+    def _onThreadFinished(self):
+        self._thread.deleteLater()
+        self._thread = None
+        if not self._timer.isActive():
+            self._start()
@@ -0,0 +1,69 @@
+"""
+水印拼接用的合成器
+
+先计算所有图块在画布上的位置, 再在一张预先分配好的画布上依次合成,
+不再为拼接、填充生成中间图片, 每个水印区块只分配一次内存
+"""
+from typing import Iterable, List, NamedTuple, Sequence, Tuple
+from PIL import Image
+from app.entity.constants import TRANSPARENT
+
+
+class Layer(NamedTuple):
+    """
+    画布上的一个图块
+    """
+    image: Image.Image
+    position: Tuple[int, int]
+    # True 按透明度混合到画布上, False 直接覆盖画布上的像素
+    blend: bool = False
+
+
+def stack(sizes: Sequence[Tuple[int, int]], axis=0, align=0) -> Tuple[Tuple[int, int], List[Tuple[int, int]]]:
+    """
+    计算图块依次排成一行或一列时的位置, 与 merge_images 的排列方式一致
+    :param sizes: 图块尺寸列表
+    :param axis: 0 水平排列，1 垂直排列
+    :param align: 0 居中对齐，1 底部/右对齐，2 顶部/左对齐
+    :return: (所有图块占用的尺寸, 每个图块的位置)
+    """
+    widths, heights = zip(*sizes)
+    if axis == 0:
+        size = (sum(widths), max(heights))
+    else:
+        size = (max(widths), sum(heights))
+
+    positions = []
+    offset = 0
+    cross_size = size[1 - axis]
+    for item in sizes:
+        if align == 1:
+            cross = cross_size - item[1 - axis]
+        elif align == 2:
+            cross = 0
+        else:
+            cross = (cross_size - item[1 - axis]) // 2
+        positions.append((offset, cross) if axis == 0 else (cross, offset))
+        offset += item[axis]
+    return size, positions
+
+
+def compose(size: Tuple[int, int], layers: Iterable[Layer], color=TRANSPARENT) -> Image.Image:
+    """
+    在一张画布上一次合成所有图块, 超出画布的部分被裁掉
+    :param size: 画布尺寸
+    :param layers: 图块列表, 按顺序合成
+    :param color: 画布底色
+    :return: RGBA格式的图片
+    """
+    canvas = Image.new('RGBA', size, color=color)
+    for layer in layers:
+        if layer.image is None:
+            continue
+        x, y = layer.position
+        if layer.blend:
+            # alpha_composite 不支持负坐标, 画布外的部分从源图中跳过
+            canvas.alpha_composite(layer.image, (max(x, 0), max(y, 0)), (max(-x, 0), max(-y, 0)))
+        else:
+            canvas.paste(layer.image, (x, y))
+    return canvas
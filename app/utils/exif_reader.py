@@ -0,0 +1,139 @@
+import os
+from datetime import datetime
+from typing import Optional
+from PIL import Image
+from PIL.ExifTags import Base, GPS, IFD
+from app.utils.logger import setup_logger
+
+logger = setup_logger("exif_reader")
+
+NATIVE_BACKEND = "pillow"
+EXIFTOOL_BACKEND = "exiftool"
+
+# Pillow 能够直接读取 exif 的格式
+NATIVE_FORMATS = ('JPEG', 'MPO', 'TIFF')
+
+# 渲染需要的字段, 任意一个缺失时交给 exiftool 从 MakerNotes 等位置读取
+REQUIRED_KEYS = (
+    'Make',
+    'CameraModelName',
+    'LensModel',
+    'DateTimeOriginal',
+    'FNumber',
+    'ExposureTime',
+    'ISO',
+    'FocalLength',
+)
+
+ORIENTATIONS = {
+    1: 'Horizontal (normal)',
+    2: 'Mirror horizontal',
+    3: 'Rotate 180',
+    4: 'Mirror vertical',
+    5: 'Mirror horizontal and rotate 270 CW',
+    6: 'Rotate 90 CW',
+    7: 'Mirror horizontal and rotate 90 CW',
+    8: 'Rotate 270 CW',
+}
+
+
+def _text(value) -> str:
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', errors='ignore')
+    return str(value).strip('\x00 ')
+
+
+def _f_number(value) -> str:
+    value = float(value)
+    return f"{value:.2f}" if value < 1 else f"{value:.1f}"
+
+
+def _exposure_time(value) -> str:
+    value = float(value)
+    if 0 < value < 0.25001:
+        return f"1/{int(0.5 + 1 / value)}"
+    result = f"{value:.1f}"
+    return result[:-2] if result.endswith('.0') else result
+
+
+def _dms(value, ref: str) -> str:
+    degrees, minutes, seconds = (float(v) for v in value)
+    # 与 exiftool 的输出格式保持一致: 34 deg 3' 8.52" N
+    return f"{int(degrees)} deg {int(minutes)}' {seconds:.2f}\" {_text(ref)}".strip()
+
+
+def read_native_exif(path) -> Optional[dict]:
+    """
+    使用 Pillow 在进程内读取标准 EXIF 信息, 输出与 get_exif 相同的键值格式
+    :param path: 照片路径
+    :return: exif信息, 格式不支持或缺少必要字段时返回 None
+    """
+    try:
+        with Image.open(path) as image:
+            if image.format not in NATIVE_FORMATS:
+                return None
+            exif = image.getexif()
+            exif_ifd = exif.get_ifd(IFD.Exif)
+            gps_ifd = exif.get_ifd(IFD.GPSInfo)
+            width, height = image.size
+    except Exception as e:
+        logger.info(f'read_native_exif error: {path} : {e}')
+        return None
+
+    exif_dict = {
+        'FileName': os.path.basename(path),
+        'ImageWidth': str(width),
+        'ImageHeight': str(height),
+    }
+
+    if Base.Make in exif:
+        exif_dict['Make'] = _text(exif[Base.Make])
+    if Base.Model in exif:
+        exif_dict['CameraModelName'] = _text(exif[Base.Model])
+    if Base.Orientation in exif:
+        exif_dict['Orientation'] = ORIENTATIONS.get(exif[Base.Orientation], str(exif[Base.Orientation]))
+
+    try:
+        if Base.LensMake in exif_ifd:
+            exif_dict['LensMake'] = _text(exif_ifd[Base.LensMake])
+        if Base.LensModel in exif_ifd:
+            exif_dict['LensModel'] = _text(exif_ifd[Base.LensModel])
+        if Base.DateTimeOriginal in exif_ifd:
+            dt = datetime.strptime(_text(exif_ifd[Base.DateTimeOriginal]), '%Y:%m:%d %H:%M:%S')
+            exif_dict['DateTimeOriginal'] = dt.strftime('%Y-%m-%d %H:%M:%S')
+        if Base.FNumber in exif_ifd:
+            exif_dict['FNumber'] = _f_number(exif_ifd[Base.FNumber])
+        if Base.ExposureTime in exif_ifd:
+            exif_dict['ExposureTime'] = _exposure_time(exif_ifd[Base.ExposureTime])
+        if Base.ShutterSpeedValue in exif_ifd:
+            exif_dict['ShutterSpeedValue'] = _exposure_time(2 ** -float(exif_ifd[Base.ShutterSpeedValue]))
+        if Base.ISOSpeedRatings in exif_ifd:
+            iso = exif_ifd[Base.ISOSpeedRatings]
+            exif_dict['ISO'] = str(iso[0] if isinstance(iso, tuple) else iso)
+
+        focal_length = float(exif_ifd.get(Base.FocalLength, 0))
+        focal_length_35 = int(exif_ifd.get(Base.FocalLengthIn35mmFilm, 0))
+        if focal_length and focal_length_35:
+            # exiftool 的 Focal Length 是合成标签, 带有 35mm 等效焦距
+            exif_dict['FocalLength'] = f"{focal_length:.1f} mm (35 mm equivalent: {focal_length_35:.1f} mm)"
+            exif_dict['FocalLengthIn35mmFormat'] = f"{focal_length_35} mm"
+
+        if GPS.GPSLatitude in gps_ifd and GPS.GPSLongitude in gps_ifd:
+            latitude = _dms(gps_ifd[GPS.GPSLatitude], gps_ifd.get(GPS.GPSLatitudeRef, ''))
+            longitude = _dms(gps_ifd[GPS.GPSLongitude], gps_ifd.get(GPS.GPSLongitudeRef, ''))
+            exif_dict['GPSLatitude'] = latitude
+            exif_dict['GPSLongitude'] = longitude
+            exif_dict['GPSPosition'] = f"{latitude}, {longitude}"
+        if GPS.GPSAltitude in gps_ifd:
+            altitude = int(float(gps_ifd[GPS.GPSAltitude]) * 10) / 10
+            below = gps_ifd.get(GPS.GPSAltitudeRef, b'\x00') in (1, b'\x01')
+            exif_dict['GPSAltitude'] = f"{altitude} m {'Below' if below else 'Above'} Sea Level"
+    except Exception as e:
+        logger.info(f'read_native_exif parse error: {path} : {e}')
+        return None
+
+    # 镜头、35mm 焦距等信息只存在于 MakerNotes 中时，需要 exiftool 解析
+    if any(key not in exif_dict for key in REQUIRED_KEYS):
+        return None
+
+    return {key: ''.join(c for c in value if ord(c) < 128) for key, value in exif_dict.items()}
@@ -1,101 +1,56 @@
 
-import subprocess
-import platform
-import shutil
 import os
 import re
+import json
+from typing import Dict, Iterable, Tuple
 
 from app.utils.logger import setup_logger
-from PyQt5.QtGui import QColor
-from app.config import EXIFTOOL_PATH
 from datetime import datetime
 from pathlib import Path
 from app.entity.custom_error import CustomError
-import zipfile
 from dateutil import parser
 from app.entity.enums import ExifId
 from PIL import Image, ImageOps, ImageDraw
 from app.entity.constants import TRANSPARENT
+from app.manager.exiftool_manager import exiftool_manager
+from app.manager.exif_cache_manager import exif_cache_manager
+from app.utils.render_cache import text_cache
+from app.utils.exif_reader import read_native_exif, NATIVE_BACKEND, EXIFTOOL_BACKEND
 
 logger = setup_logger("image_handle")
 
 
-def exiftool_command() -> Path:
-    if platform.system() == 'Windows':
-        return Path(f"{EXIFTOOL_PATH}/exiftool.exe")
-    elif shutil.which('exiftool'):
-        return Path(shutil.which('exiftool'))
-    else:
-        check_handle_exiftool()
-        return Path(f"{EXIFTOOL_PATH}/exiftool-mac/exiftool")
-
-
-def check_handle_exiftool():
+def get_exif(path, native: bool = True) -> dict:
     """
-    检查并解压exiftool，修复文件权限问题
+    获取exif信息
+    :param path: 照片路径
+    :param native: 是否优先使用进程内的 Pillow 读取
+    :return: exif信息
     """
-    dir_path = Path(f"{EXIFTOOL_PATH}/exiftool-mac")
-    if os.path.isdir(dir_path):
-        return
-
-    zip_path = Path(f"{EXIFTOOL_PATH}/exiftool-mac.zip")
-    if not os.path.exists(zip_path):
-        logger.error(f"Error: 文件 {zip_path} 不存在")
-        raise CustomError("exifTool zip文件不存在", 503)
-
-    if not zipfile.is_zipfile(zip_path):
-        logger.error(f"Error: {zip_path} 不是有效的zip文件")
-        raise CustomError("exifTool zip不是有效文件", 502)
-
-    try:
-        # 解压文件
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(os.path.dirname(zip_path))
-            logger.info(f"成功解压 {zip_path} 到当前目录")
-
-        # macOS专用：修复权限和文件类型
-        if platform.system() == 'Darwin':
-            exiftool_path = dir_path / "exiftool"
-            # 移除可能存在的扩展属性
-            subprocess.run(['xattr', '-c', str(exiftool_path)], check=True)
-            # 添加可执行权限
-            subprocess.run(['chmod', '+x', str(exiftool_path)], check=True)
-            # 验证文件类型
-            subprocess.run(['file', str(exiftool_path)], check=True)
-
-        return True
-    except subprocess.CalledProcessError as e:
-        logger.error(f"修复权限失败: {e}")
-        raise CustomError("exifTool 权限修复失败", 504)
-    except Exception as e:
-        logger.exception(f"解压失败: {e}")
-        raise CustomError("exifTool 解压失败", 501)
+    exif_dict, _ = read_exif(path, native)
+    return exif_dict
 
 
-def get_exif(path) -> dict:
+def read_exif(path, native: bool = True) -> Tuple[dict, str]:
     """
-    获取exif信息
+    获取exif信息及读取所用的后端, 标准 EXIF 足够时不启动 exiftool
     :param path: 照片路径
-    :return: exif信息
+    :param native: 是否优先使用进程内的 Pillow 读取
+    :return: (exif信息, 后端名称)
     """
+    cached = exif_cache_manager.get(path, native)
+    if cached is not None:
+        return cached
+
+    if native:
+        exif_dict = read_native_exif(path)
+        if exif_dict is not None:
+            exif_cache_manager.put(path, exif_dict, NATIVE_BACKEND)
+            return exif_dict, NATIVE_BACKEND
+
     exif_dict = {}
     try:
-        command = [exiftool_command(), '-d', '%Y-%m-%d %H:%M:%S%3f%z', path]
-        subprocess_args = {
-            'stdout': subprocess.PIPE,
-            'stderr': subprocess.PIPE,
-            'universal_newlines': False  # Ensure bytes output for decode
-        }
-
-        if platform.system() == 'Windows':
-            subprocess_args['creationflags'] = subprocess.CREATE_NO_WINDOW
-
-        process = subprocess.Popen(
-            command,
-            **subprocess_args
-        )
-        output_bytes, _ = process.communicate()
-        output = output_bytes.decode('utf-8', errors='ignore')
+        output, _ = exiftool_manager.execute(['-d', '%Y-%m-%d %H:%M:%S%3f%z', path])
 
         lines = output.splitlines()
         utf8_lines = [line for line in lines]
@@ -118,9 +73,84 @@ def get_exif(path) -> dict:
             # 将处理后的值更新到 exif_dict 中
             exif_dict[key] = value_clean
     except Exception as e:
+        # 读取失败不写入缓存, 下次重新读取
         logger.error(f'get_exif error: {path} : {e}')
+        return exif_dict, EXIFTOOL_BACKEND
 
-    return exif_dict
+    exif_cache_manager.put(path, exif_dict, EXIFTOOL_BACKEND)
+    return exif_dict, EXIFTOOL_BACKEND
+
+
+EXIF_BATCH_SIZE = 200
+
+
+def get_exif_batch(paths: Iterable, native: bool = True) -> Dict[str, dict]:
+    """
+    批量获取exif信息, 每批文件只调用一次 exiftool
+    :param paths: 照片路径列表
+    :param native: 是否优先使用进程内的 Pillow 读取
+    :return: 以传入路径为键的exif信息字典, 没有元信息的文件为空字典, 读取失败的文件不会出现在结果中
+    """
+    return {path: exif for path, (exif, _) in read_exif_batch(paths, native).items()}
+
+
+def read_exif_batch(paths: Iterable, native: bool = True) -> Dict[str, Tuple[dict, str]]:
+    """
+    批量获取exif信息及读取所用的后端, Pillow 无法读取的文件合并后交给 exiftool
+    :param paths: 照片路径列表
+    :param native: 是否优先使用进程内的 Pillow 读取
+    :return: 以传入路径为键的 (exif信息, 后端名称) 字典
+    """
+    paths = list(paths)
+    result = exif_cache_manager.get_many(paths, native)
+    paths = [path for path in paths if path not in result]
+    loaded = {}
+    if native:
+        remaining = []
+        for path in paths:
+            exif_dict = read_native_exif(path)
+            if exif_dict is not None:
+                loaded[path] = (exif_dict, NATIVE_BACKEND)
+            else:
+                remaining.append(path)
+        paths = remaining
+
+    for start in range(0, len(paths), EXIF_BATCH_SIZE):
+        chunk = paths[start:start + EXIF_BATCH_SIZE]
+        # exiftool 返回的 SourceFile 可能与传入的写法不同, 统一规范化后再对应
+        lookup = {os.path.normcase(os.path.normpath(str(path))): path for path in chunk}
+        try:
+            # -l 会为每个标签附带描述, 用描述生成与 get_exif 一致的键
+            output, _ = exiftool_manager.execute(
+                ['-json', '-l', '-d', '%Y-%m-%d %H:%M:%S%3f%z', *chunk])
+            items = json.loads(output) if output.strip() else []
+        except Exception as e:
+            logger.error(f'get_exif_batch error: {len(chunk)} files : {e}')
+            continue
+
+        for item in items:
+            source = item.pop('SourceFile', None)
+            path = lookup.get(os.path.normcase(os.path.normpath(str(source))))
+            if path is None:
+                continue
+            exif_dict = {}
+            for tag in item.values():
+                if not isinstance(tag, dict) or 'desc' not in tag:
+                    continue
+                # 与 get_exif 相同的键值处理: 移除空格和斜杠, 过滤非 ASCII 字符
+                key = re.sub(r'\s+', '', tag['desc'])
+                key = re.sub(r'/', '', key)
+                value = tag.get('val', '')
+                value = ', '.join(str(v) for v in value) if isinstance(value, list) else str(value)
+                exif_dict[key] = ''.join(c for c in value if ord(c) < 128)
+            loaded[path] = (exif_dict, EXIFTOOL_BACKEND)
+        # exiftool 正常执行但没有返回的文件没有可读的元信息, 同样写入缓存, 不再重复读取
+        for path in chunk:
+            loaded.setdefault(path, ({}, EXIFTOOL_BACKEND))
+
+    exif_cache_manager.put_many(loaded)
+    result.update(loaded)
+    return result
 
 
 def update_custom_tags(image_path: str, tags: dict) -> bool:
@@ -133,7 +163,7 @@ def update_custom_tags(image_path: str, tags: dict) -> bool:
         bool: 是否更新成功
     """
     try:
-        command = [exiftool_command(), "-overwrite_original"]
+        command = ["-overwrite_original"]
 
         # 添加所有标签到命令中
         for tag, value in tags.items():
@@ -141,22 +171,10 @@ def update_custom_tags(image_path: str, tags: dict) -> bool:
 
         command.append(image_path)
 
-        if os.name == 'nt':
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-        else:
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-
         # 获取输出和错误信息
-        stdout, stderr = process.communicate()
+        stdout, stderr = exiftool_manager.execute(command)
+        # 文件已被改写, 缓存的元信息失效
+        exif_cache_manager.invalidate(image_path)
 
         # 打印命令输出
         if stdout:
@@ -166,13 +184,11 @@ def update_custom_tags(image_path: str, tags: dict) -> bool:
         if stderr:
             logger.error(f"ExifTool error: {stderr}")
 
-        # 打印返回码
-        logger.info(f"ExifTool return code: {process.returncode}")
-
-        if process.returncode != 0:
+        # 常驻进程没有返回码，根据输出判断是否更新成功
+        if "Error" in stderr or not re.search(r"[1-9]\d* image files (updated|unchanged)", stdout):
             raise CustomError(f"ExifTool failed: {stderr}", 601)
 
-        return process.returncode == 0
+        return True
 
     except Exception as e:
         error_msg = f"Error updating custom tags: {str(e)}"
@@ -468,6 +484,46 @@ def resize_height_with_size(width: float, height: float, target_width: float):
     scale = target_width / width
     return round(height * scale)
 
+
+def resize_image_to_fit(image, max_size, auto_close=True):
+    """
+    按最长边对图片进行等比缩放, 图片本身不超过最长边时原样返回
+    :param image: 图片对象
+    :param max_size: 最长边
+    :return: 缩放后的图片对象
+    """
+    scale = max_size / max(image.size)
+    if scale >= 1:
+        return image
+
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    resized_image = image.resize(size, Image.LANCZOS)
+
+    if auto_close:
+        image.close()
+
+    return resized_image
+
+
+def open_image(path, max_size: int = 0) -> Tuple[Image.Image, float]:
+    """
+    打开图片, 指定的最长边小于原图时按目标尺寸解码
+    JPEG 通过 draft 直接以 1/2、1/4、1/8 的 DCT 缩放解码出不小于目标的尺寸, 再缩放到目标大小
+    :param path: 图片路径
+    :param max_size: 最长边, 0 表示保持原图尺寸
+    :return: (图片对象, 相对原图的缩放比例)
+    """
+    image = Image.open(path)
+    long_edge = max(image.size)
+    if not max_size or long_edge <= max_size:
+        return image, 1.0
+
+    scale = max_size / long_edge
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    # 非 JPEG 格式时 draft 不做任何处理
+    image.draft(None, size)
+    return resize_image_to_fit(image, max_size), scale
+
 def square_image(image, auto_close=True) -> Image.Image:
     """
     将图片按照正方形进行填充
@@ -496,11 +552,17 @@ def square_image(image, auto_close=True) -> Image.Image:
 def text_to_image(content, font, bold_font, is_bold=False, fill='black', color=TRANSPARENT) -> Image.Image:
     """
     将文字内容转换为图片
+    相同的文字、字体和颜色只渲染一次, 返回的图片是共享的, 不能修改或关闭
     """
     if is_bold:
         font = bold_font
     if content == '':
         content = '   '
+    key = (content, getattr(font, 'path', id(font)), font.size, fill, color)
+    return text_cache.get_or_create(key, lambda: _render_text(content, font, fill, color))
+
+
+def _render_text(content, font, fill, color) -> Image.Image:
     _, _, text_width, text_height = font.getbbox(content)
     image = Image.new('RGBA', (text_width, text_height), color=color)
     draw = ImageDraw.Draw(image)
@@ -548,38 +610,3 @@ def hex_to_rgba(hex_color, alpha=255):
         raise ValueError("无效的十六进制颜色字符串。长度应为 6 或 8 个字符。")
 
     return (r, g, b, a)
-
-def qcolor_to_hex(color: QColor) -> str:
-        # 获取红、绿、蓝、Alpha 分量（0-255）
-        red = color.red()
-        green = color.green()
-        blue = color.blue()
-        alpha = color.alpha()
-
-        # 转换为两位十六进制字符串（补零）
-        red_hex = f"{red:02X}"
-        green_hex = f"{green:02X}"
-        blue_hex = f"{blue:02X}"
-        alpha_hex = f"{alpha:02X}"
-
-        # 拼接为 #RRGGBBAA 格式
-        return f"#{red_hex}{green_hex}{blue_hex}{alpha_hex}"
-
-def hex_to_qcolor(hex_color: str) -> QColor:
-    """将十六进制RGBA颜色字符串转换为QColor对象"""
-    if hex_color.startswith('#'):
-        hex_color = hex_color[1:]
-    if len(hex_color) == 8:  # 确保是8位十六进制颜色
-        r = int(hex_color[0:2], 16)
-        g = int(hex_color[2:4], 16)
-        b = int(hex_color[4:6], 16)
-        a = int(hex_color[6:8], 16)
-        return QColor(r, g, b, a)
-    elif len(hex_color) == 6:
-        r = int(hex_color[0:2], 16)
-        g = int(hex_color[2:4], 16)
-        b = int(hex_color[4:6], 16)
-        return QColor(r, g, b, 255)
-    else:
-        raise ValueError(
-            "Invalid hex color format. Expected #RRGGBBAA format.")
\ No newline at end of file
@@ -1,107 +1,166 @@
-from app.config import cfg
+import math
 from PIL import Image, ImageDraw, ImageFilter
 from app.entity.custom_error import CustomError
 from app.utils.image_handle import hex_to_rgba, padding_image
+from app.core.render_config import RenderConfig
+from app.utils.render_cache import shadow_cache
 
 from app.utils.logger import setup_logger
 logger = setup_logger("image_render")
 
 
-def raduis() -> int:
-    return max(100 - int(cfg.radiusInfo.value), 1)
+def raduis(config: RenderConfig) -> int:
+    return max(100 - int(config.radiusInfo), 1)
 
 
-def add_background_blur(img: Image.Image, bottom_padding=0) -> Image.Image:
+def _brighten_lut() -> list:
+    """
+    与白色按 0.1 混合的查找表, 由 Image.blend 生成, 结果与整图混合完全一致
+    """
+    gray = Image.frombytes('L', (256, 1), bytes(range(256)))
+    with Image.new('L', gray.size, 255) as white:
+        return list(Image.blend(gray, white, 0.1).getdata()) * 3
+
+
+BRIGHTEN_LUT = _brighten_lut()
+
+# 金字塔模糊缩小后的最小模糊半径与最小短边, 再小时放大后会出现块状痕迹
+PYRAMID_MIN_RADIUS = 4
+PYRAMID_MIN_EDGE = 32
+
+
+def add_background_blur(img: Image.Image, config: RenderConfig, bottom_padding=0, scale=1.0) -> Image.Image:
     """给图片添加模糊背景效果
     参数:
-        img: 输入图片(支持任意格式)
+        img: 原图(支持任意格式), 圆角在这里处理
+        config: 渲染配置
+        scale: 像素参数的缩放比例, 预览缩略图时小于 1
     返回:
-        带模糊背景的RGB格式图片
+        带模糊背景的RGBA格式图片, 即最终输出的画布
     """
     try:
-        # 转换为RGB确保无alpha通道
-        bg = img.convert('RGB')
-
-        # 应用高斯模糊
-        bg = bg.filter(ImageFilter.GaussianBlur(cfg.blurExtent.value))
-
-        # 调整亮度
-        white = Image.new('RGB', bg.size, (255, 255, 255))
-        bg = Image.blend(bg, white, 0.1)
-
         # 扩展尺寸
         new_size = (
-            int(img.width * (1 + cfg.blurHorizontalPadding.value * 2)),
-            int(img.height * (1 + cfg.blurTopPadding.value + cfg.blurBottomPadding.value) + bottom_padding)
+            int(img.width * (1 + config.blurHorizontalPadding * 2)),
+            int(img.height * (1 + config.blurTopPadding + config.blurBottomPadding) + bottom_padding)
         )
-        blurred_bg = bg.resize(new_size)
-        if (cfg.addShadow.value):
-            foreground = add_shadow(img)
-        else:
-            foreground = add_rounded_corners(img)
-
-        # 计算居中位置
-        x_offset = int((blurred_bg.width - foreground.width) / 2)
-        y_offset = int(img.height * cfg.blurTopPadding.value)
+        blurred_bg = blur_background(img, config, new_size, config.blurExtent * scale)
 
         # 创建结果画布
         result = blurred_bg.convert("RGBA")
+        blurred_bg.close()
+
+        foreground = add_rounded_corners(img, config)
+        if (config.addShadow):
+            rounded = foreground
+            foreground = add_shadow(rounded, config, scale)
+            rounded.close()
+
+        # 计算居中位置
+        x_offset = int((result.width - foreground.width) / 2)
+        y_offset = int(img.height * config.blurTopPadding)
 
         # 粘贴前景图（使用alpha通道）
         result.paste(foreground, (x_offset, y_offset), foreground)
+        foreground.close()
         return result
     except Exception as e:
         logger.exception(f"增加模糊背景出错, error:{str(e)}")
         raise CustomError("增加模糊背景出错", 404)
 
 
-def add_white_margin(img: Image.Image) -> Image.Image:
+def pyramid_factor(size, radius: float) -> int:
+    """
+    金字塔模糊的缩小倍数, 缩小后的模糊半径不小于 PYRAMID_MIN_RADIUS, 短边不小于 PYRAMID_MIN_EDGE
+    :param size: 原图尺寸
+    :param radius: 原图上的模糊半径
+    :return: 缩小倍数, 1 表示在原图上直接模糊
+    """
+    factor = min(int(radius / PYRAMID_MIN_RADIUS), min(size) // PYRAMID_MIN_EDGE)
+    return factor if factor >= 2 else 1
+
+
+def blur_background(img: Image.Image, config: RenderConfig, new_size, radius: float) -> Image.Image:
+    """生成模糊背景, 圆角外为黑色, 与白色按 0.1 混合提亮后放大到背景尺寸
+    参数:
+        img: 原图(支持任意格式)
+        config: 渲染配置, blurQuality 为 high 时在原图上模糊, 否则先缩小再模糊
+        new_size: 背景尺寸
+        radius: 原图上的模糊半径
+    返回:
+        RGB格式的背景图
+    """
+    factor = 1 if config.blurQuality == "high" else pyramid_factor(img.size, radius)
+    if factor > 1:
+        # 重度模糊后只剩低频信息, 在缩小的图片上模糊再放大, 视觉上与原图模糊一致
+        # 按块平均缩小本身相当于方差 (f^2 - 1) / 12 的模糊, 从模糊半径中扣除
+        source = img if img.mode in ("RGB", "RGBA", "L") else img.convert("RGB")
+        small = source.reduce(factor)
+        if source is not img:
+            source.close()
+        radius = math.sqrt(max(radius * radius - (factor * factor - 1) / 12, 0)) / factor
+    else:
+        small = img
+
+    # 圆角外为黑色的底图, 与透明圆角图片转为 RGB 的结果一致
+    bg = Image.new('RGB', small.size, (0, 0, 0))
+    paste_rounded(bg, small, (0, 0), config)
+    if small is not img:
+        small.close()
+
+    # 应用高斯模糊
+    blurred = bg.filter(ImageFilter.GaussianBlur(radius))
+    bg.close()
+
+    # 调整亮度, 查表代替与整张白色图片混合, 缩小时在小图上完成
+    bg = blurred.point(BRIGHTEN_LUT)
+    blurred.close()
+
+    # 缩小后模糊的图片足够平滑, 双线性放大与双三次放大看不出差别
+    result = bg.resize(new_size, Image.BILINEAR if factor > 1 else Image.BICUBIC)
+    bg.close()
+    return result
+
+
+def add_white_margin(img: Image.Image, config: RenderConfig) -> Image.Image:
     """给图片添加外部边框效果
     参数:
         img: 输入图片(支持任意格式)
+        config: 渲染配置
     返回:
         带外部边框的RGB格式图片
     """
     try:
-        padding_size = int(cfg.whiteMarginWidth.value *
-                           min(img.width, img.height) / 100)
+        padding_size = white_margin_size(img.size, config)
         padding_img = padding_image(
-            img, padding_size, 'tlrb', color=cfg.whiteMarginColor.value)
+            img, padding_size, 'tlrb', color=config.whiteMarginColor)
         return padding_img
     except Exception as e:
         logger.exception(f"增加边距错误, error:{str(e)}")
         raise CustomError("增加边距错误", 403)
 
 
-def add_shadow(img: Image.Image) -> Image.Image:
+def white_margin_size(size, config: RenderConfig) -> int:
+    """
+    外部边框的宽度
+    :param size: 加边框前的图片尺寸
+    """
+    return int(config.whiteMarginWidth * min(size) / 100)
+
+
+def add_shadow(img: Image.Image, config: RenderConfig, scale=1.0) -> Image.Image:
     try:
-        shadow_blur: int = cfg.shadowBlur.value
+        shadow_blur: int = round(config.shadowBlur * scale)
         # 使用半透明绿色 (R, G, B, Alpha)
-        shadow_color = cfg.shadowColor.value
-        corner_radius = min(img.width, img.height) // raduis()
+        shadow_color = config.shadowColor
+        corner_radius = min(img.width, img.height) // raduis(config)
+
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
 
-        img = img.convert("RGBA")
-        
-        # 直接在透明背景上创建阴影层
+        # 阴影层由缓存的图块拼接, 不再对整张图片模糊
         shadow_size = (img.width + shadow_blur*2, img.height + shadow_blur*2)
-        shadow_layer = Image.new("RGBA", shadow_size, (0, 0, 0, 0))
-        draw = ImageDraw.Draw(shadow_layer)
-        
-        # 绘制带透明度的阴影
-        offset = shadow_blur * 0.8  # 控制扩散程度
-        draw.rounded_rectangle(
-            [(offset, offset),  # 起点外移
-             (shadow_size[0] - offset, shadow_size[1] - offset)],  # 终点外扩
-            radius=corner_radius + int(offset/2),  # 增大圆角半径
-            fill=shadow_color
-        )
-        
-        # 应用模糊效果（保留透明度）
-        blurred_shadow = shadow_layer.filter(ImageFilter.GaussianBlur(shadow_blur))
-        
-        # 合成最终效果
-        result = Image.new("RGBA", shadow_size, (0, 0, 0, 0))
-        result.alpha_composite(blurred_shadow)
+        result = shadow_layer(shadow_size, corner_radius, shadow_blur, shadow_color)
         result.alpha_composite(img, (shadow_blur, shadow_blur))
         return result
     except Exception as e:
@@ -109,28 +168,136 @@ def add_shadow(img: Image.Image) -> Image.Image:
         raise CustomError("增加阴影出错", 402)
 
 
-def add_rounded_corners(img: Image.Image, backgroundColor=(0,0,0,0)) -> Image.Image:
+def shadow_layer(size, corner_radius: int, shadow_blur: int, shadow_color: str) -> Image.Image:
+    """生成模糊后的圆角矩形阴影层
+    阴影只在边缘约 3 倍模糊半径的范围内有变化, 直边处每行(列)都相同, 内部为纯色
+    先生成直边缩短到 1 像素的阴影图块, 再把直边与内部拉伸到实际尺寸,
+    结果与在整张图片上绘制并模糊完全一致, 耗时只与周长有关
+    参数:
+        size: 阴影层尺寸
+        corner_radius: 前景图的圆角半径
+        shadow_blur: 模糊半径
+        shadow_color: 阴影颜色
+    返回:
+        RGBA格式的阴影层
+    """
+    # 绘制圆角矩形的范围加上三次盒式模糊的扩散范围, 超出后直边上的像素与位置无关
+    offset = shadow_blur * 0.8
+    keep = math.ceil(offset + corner_radius + offset / 2) + 3 * (shadow_blur + 2)
+    tile_size = tuple(2 * keep + 1 if length > 2 * keep + 1 else length for length in size)
+
+    key = (tile_size, corner_radius, shadow_blur, shadow_color)
+    tile = shadow_cache.get_or_create(key, lambda: _shadow_tile(tile_size, corner_radius, shadow_blur, shadow_color))
+    if tile_size == tuple(size):
+        return tile.copy()
+
+    # 每个方向切成 (图块中的区间, 阴影层中的区间), 缩短的方向中间 1 像素拉伸到实际长度
+    def slices(length, tile_length):
+        if length == tile_length:
+            return [((0, length), (0, length))]
+        return [((0, keep), (0, keep)),
+                ((keep, keep + 1), (keep, length - keep)),
+                ((keep + 1, tile_length), (length - keep, length))]
+
+    result = Image.new("RGBA", size)
+    for (tx0, tx1), (x0, x1) in slices(size[0], tile_size[0]):
+        for (ty0, ty1), (y0, y1) in slices(size[1], tile_size[1]):
+            if tx1 - tx0 == 1 and ty1 - ty0 == 1:
+                # 内部为纯色, 直接填充
+                result.paste(tile.getpixel((tx0, ty0)), (x0, y0, x1, y1))
+                continue
+            with tile.crop((tx0, ty0, tx1, ty1)) as part:
+                if part.size == (x1 - x0, y1 - y0):
+                    result.paste(part, (x0, y0))
+                else:
+                    with part.resize((x1 - x0, y1 - y0), Image.NEAREST) as stretched:
+                        result.paste(stretched, (x0, y0))
+    return result
+
+
+def _shadow_tile(size, corner_radius: int, shadow_blur: int, shadow_color: str) -> Image.Image:
+    """
+    在指定尺寸上绘制并模糊圆角矩形阴影
+    """
+    # 直接在透明背景上创建阴影层
+    shadow_layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(shadow_layer)
+
+    # 绘制带透明度的阴影
+    offset = shadow_blur * 0.8  # 控制扩散程度
+    draw.rounded_rectangle(
+        [(offset, offset),  # 起点外移
+         (size[0] - offset, size[1] - offset)],  # 终点外扩
+        radius=corner_radius + int(offset/2),  # 增大圆角半径
+        fill=shadow_color
+    )
+
+    # 应用模糊效果（保留透明度）
+    blurred_shadow = shadow_layer.filter(ImageFilter.GaussianBlur(shadow_blur))
+    shadow_layer.close()
+
+    # 合成到透明背景上, 完全透明的像素颜色清零
+    result = Image.new("RGBA", size, (0, 0, 0, 0))
+    result.alpha_composite(blurred_shadow)
+    blurred_shadow.close()
+    return result
+
+
+def add_rounded_corners(img: Image.Image, config: RenderConfig, backgroundColor=(0,0,0,0)) -> Image.Image:
     """给图片添加透明背景的圆角效果
     参数:
         img: 输入图片(支持任意格式)
+        config: 渲染配置
     返回:
         带透明背景圆角的RGBA格式图片
     """
     try:
-        img = img.convert("RGBA")  # 确保转换为RGBA模式
-        radius = min(img.width, img.height) // raduis()
-        
         # 创建透明背景层
         background = Image.new("RGBA", img.size, backgroundColor)
-        
-        # 创建圆角蒙版
-        mask = Image.new("L", img.size, 0)
-        draw = ImageDraw.Draw(mask)
-        draw.rounded_rectangle([(0, 0), img.size], radius=radius, fill=255)
-        
+
         # 将原图粘贴到透明背景并应用蒙版
-        background.paste(img, (0, 0), mask=mask)
+        paste_rounded(background, img, (0, 0), config)
         return background
     except Exception as e:
         logger.exception(f"添加圆角出错, error:{str(e)}")
-        raise CustomError("添加圆角出错", 401)
\ No newline at end of file
+        raise CustomError("添加圆角出错", 401)
+
+
+def paste_rounded(canvas: Image.Image, img: Image.Image, position, config: RenderConfig):
+    """将图片按圆角蒙版粘贴到画布上, 圆角外保留画布原有的像素
+    参数:
+        canvas: 目标画布, 原地修改
+        img: 输入图片(支持任意格式)
+        position: 粘贴的位置
+        config: 渲染配置
+    """
+    radius = min(img.width, img.height) // raduis(config)
+    if radius <= 0:
+        # 没有圆角, 蒙版全为不透明, 直接粘贴
+        canvas.paste(img, position)
+        return
+
+    # 圆角蒙版只在四个角不透明度小于 255, 矩形右下边界包含在内, 所以每个角多取一个像素
+    corner = radius + 1
+    if corner * 4 > min(img.size):
+        # 圆角相对图片很大时, 圆角矩形的绘制结果不只在四个角有变化, 使用整张蒙版
+        mask = Image.new("L", img.size, 0)
+        ImageDraw.Draw(mask).rounded_rectangle([(0, 0), img.size], radius=radius, fill=255)
+        canvas.paste(img, position, mask=mask)
+        mask.close()
+        return
+
+    # 先保存画布上四个角的像素, 整张图片直接粘贴后, 只在四个角按蒙版重新混合
+    x, y = position
+    corners = [(0, 0), (img.width - corner, 0), (0, img.height - corner), (img.width - corner, img.height - corner)]
+    patches = [canvas.crop((x + cx, y + cy, x + cx + corner, y + cy + corner)) for cx, cy in corners]
+    canvas.paste(img, position)
+    for (cx, cy), patch in zip(corners, patches):
+        # 与整张蒙版相同的圆角矩形平移到角上绘制, 结果与整张蒙版的对应区域一致
+        mask = Image.new("L", patch.size, 0)
+        ImageDraw.Draw(mask).rounded_rectangle([(-cx, -cy), (img.width - cx, img.height - cy)], radius=radius, fill=255)
+        with img.crop((cx, cy, cx + corner, cy + corner)) as source:
+            patch.paste(source, (0, 0), mask=mask)
+        canvas.paste(patch, (x + cx, y + cy))
+        mask.close()
+        patch.close()
\ No newline at end of file
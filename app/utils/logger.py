@@ -1,7 +1,7 @@
 import logging
 import logging.handlers
 from pathlib import Path
-from app.config import LOG_LEVEL, LOG_PATH
+from app.core.paths import LOG_LEVEL, LOG_PATH
 
 
 def setup_logger(
@@ -0,0 +1,37 @@
+from PyQt5.QtGui import QColor
+
+
+def qcolor_to_hex(color: QColor) -> str:
+        # 获取红、绿、蓝、Alpha 分量（0-255）
+        red = color.red()
+        green = color.green()
+        blue = color.blue()
+        alpha = color.alpha()
+
+        # 转换为两位十六进制字符串（补零）
+        red_hex = f"{red:02X}"
+        green_hex = f"{green:02X}"
+        blue_hex = f"{blue:02X}"
+        alpha_hex = f"{alpha:02X}"
+
+        # 拼接为 #RRGGBBAA 格式
+        return f"#{red_hex}{green_hex}{blue_hex}{alpha_hex}"
+
+def hex_to_qcolor(hex_color: str) -> QColor:
+    """将十六进制RGBA颜色字符串转换为QColor对象"""
+    if hex_color.startswith('#'):
+        hex_color = hex_color[1:]
+    if len(hex_color) == 8:  # 确保是8位十六进制颜色
+        r = int(hex_color[0:2], 16)
+        g = int(hex_color[2:4], 16)
+        b = int(hex_color[4:6], 16)
+        a = int(hex_color[6:8], 16)
+        return QColor(r, g, b, a)
+    elif len(hex_color) == 6:
+        r = int(hex_color[0:2], 16)
+        g = int(hex_color[2:4], 16)
+        b = int(hex_color[4:6], 16)
+        return QColor(r, g, b, 255)
+    else:
+        raise ValueError(
+            "Invalid hex color format. Expected #RRGGBBAA format.")
@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+from PIL import Image
+
+
+class RenderCache:
+    """
+    渲染结果的 LRU 缓存, 按图片占用的内存大小限制容量
+    缓存中的图片是共享的, 使用方不能修改或关闭
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def get_or_create(self, key: Hashable, create: Callable[[], Image.Image]) -> Image.Image:
+        """
+        获取缓存的图片, 未命中时调用 create 生成并缓存
+        :param key: 缓存键, 需要包含所有影响渲染结果的参数
+        :param create: 生成图片的函数
+        :return: 缓存的图片
+        """
+        with self._lock:
+            image = self._items.get(key)
+            if image is not None:
+                self._items.move_to_end(key)
+                return image
+
+        image = create()
+        size = self._size(image)
+        if size > self.max_bytes:
+            return image
+
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = image
+                self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= self._size(evicted)
+        return image
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+# 文字图片缓存
+text_cache = RenderCache(64 * 1024 * 1024)
+# 合成后的水印条缓存
+watermark_cache = RenderCache(64 * 1024 * 1024)
+# 阴影的角与边缘图块缓存
+shadow_cache = RenderCache(32 * 1024 * 1024)
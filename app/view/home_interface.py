@@ -2,24 +2,21 @@ import os
 import json
 import sys
 import subprocess
+import itertools
 import webbrowser
-from typing import List
+from typing import List, Tuple
 from pathlib import Path
 from PyQt5.QtCore import Qt, QStandardPaths
-from PyQt5.QtGui import QColor, QIcon
+from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import (
     QWidget,
     QVBoxLayout,
-    QHeaderView,
-    QTableWidgetItem,
     QWidget,
     QHBoxLayout,
     QFileDialog,
     QApplication
 )
 from qfluentwidgets import (
-    TableWidget,
-    TableItemDelegate,
     HyperlinkButton,
     FluentIcon as FIF,
     ProgressBar,
@@ -31,14 +28,17 @@ from qfluentwidgets import (
 from app.thread.image_handle_thread import (
     ImageHandleThread,
     ImageHandleTask,
-    ImageHandleStatus,
     HandleProgress
 )
+from app.thread.folder_scan_thread import FolderScanThread
+from app.core.batch import TaskQueue, create_task
+from app.core.scan import is_supported_image
 from app.config import cfg, ASSETS_PATH
 from app.entity.constants import IS_INNER
 from app.entity.enums import SupportedImageFormats
 from app.entity.picutre_item import PictureItem
-from app.components.common_item import TipButton, SearchInput, ListActionButton, TagLabel
+from app.components.common_item import TipButton, SearchInput, TagLabel
+from app.components.picture_table import PictureTableModel, PictureTableView, PictureAction
 from app.view.log_window import LogWindow
 from app.utils.logger import setup_logger
 from app.manager.version_manager import version_manager
@@ -59,6 +59,7 @@ class HomeInterface(QWidget):
         self.log_window = None
         self.target_path = cfg.targetPath.value
         self.isEnable = True
+        self.scan_thread: FolderScanThread = None
 
         self.setup_ui()
         self.setup_signals()
@@ -70,8 +71,8 @@ class HomeInterface(QWidget):
 
         self.setup_header_view()
 
+        self.picture_model = PictureTableModel(self)
         self.picture_table = self._create_picture_table()
-        self.picture_models: List[PictureItem] = []
         self.main_layout.addWidget(self.picture_table)
 
         self.setup_status_layout()
@@ -100,6 +101,10 @@ class HomeInterface(QWidget):
         self.add_button.setIcon(QIcon(f"{ASSETS_PATH}/add.svg"))
         self.header_layout.addWidget(self.add_button)
 
+        self.folder_button = TipButton(self, self.tr("添加文件夹"))
+        self.folder_button.setIcon(FIF.FOLDER_ADD)
+        self.header_layout.addWidget(self.folder_button)
+
         self.clean_button = TipButton(self, self.tr("清空图片"))
         self.clean_button.setIcon(QIcon(f"{ASSETS_PATH}/delete.svg"))
         self.header_layout.addWidget(self.clean_button)
@@ -171,6 +176,7 @@ class HomeInterface(QWidget):
     def setup_signals(self):
         self.target_button.clicked.connect(self.on_target_button_clicked)
         self.add_button.clicked.connect(self.on_add_button_clicked)
+        self.folder_button.clicked.connect(self.on_folder_button_clicked)
         self.clean_button.clicked.connect(self.on_clean_button_clicked)
         self.start_button.clicked.connect(self.on_start_button_clicked)
         self.log_button.clicked.connect(self.show_log_window)
@@ -235,22 +241,7 @@ class HomeInterface(QWidget):
 
         # 处理选中的文件路径
         if file_paths:
-            has_added = False
-            for file_path in file_paths:
-                is_exist = any(
-                    model.original_path == file_path for model in self.picture_models)
-                if is_exist:
-                    continue
-                else:
-                    has_added = True
-                    self.picture_models.append(PictureItem(
-                        name=os.path.basename(file_path),
-                        original_path=file_path,
-                        target_path=self.target_path,
-                        status=ImageHandleStatus.WAITING
-                    ))
-            if has_added:
-                self._populate_model_table()
+            if self.picture_model.add_paths(file_paths, self.target_path):
                 InfoBar.success(
                     self.tr("导入成功"),
                     self.tr("导入图片文件成功"),
@@ -258,9 +249,56 @@ class HomeInterface(QWidget):
                     parent=self,
                 )
 
+    def on_folder_button_clicked(self):
+        desktop_path = QStandardPaths.writableLocation(
+            QStandardPaths.DesktopLocation
+        )
+        folder_path = QFileDialog.getExistingDirectory(
+            self, self.tr("选择图片文件夹"), desktop_path
+        )
+        if folder_path:
+            self._start_folder_scan([folder_path])
+
+    def is_scanning(self) -> bool:
+        return self.scan_thread is not None
+
+    def _start_folder_scan(self, folders: List[str]):
+        """
+        在后台递归扫描文件夹, 扫描到的图片分批加入表格
+        """
+        if self.is_scanning():
+            InfoBar.warning(
+                self.tr("正在导入"),
+                self.tr("请等待当前文件夹导入完成"),
+                duration=1500,
+                parent=self,
+            )
+            return
+        self.scan_thread = FolderScanThread(folders, set(self.picture_model.keys()), set(self.picture_model.names()))
+        self.scan_thread.found.connect(self._on_folder_found)
+        self.scan_thread.finished.connect(self._on_folder_scan_finished)
+        self.status_label.setText(self.tr("导入中"))
+        self.refreshButtons()
+        self.scan_thread.start()
+
+    def _on_folder_found(self, entries: List[Tuple[str, str]]):
+        self.picture_model.add_outputs(entries, self.target_path)
+
+    def _on_folder_scan_finished(self):
+        self.scan_thread.deleteLater()
+        self.scan_thread = None
+        if self.isEnable:
+            self.status_label.setText(self.tr("就绪"))
+        self.refreshButtons()
+        InfoBar.success(
+            self.tr("导入成功"),
+            self.tr("导入图片文件夹成功"),
+            duration=1500,
+            parent=self,
+        )
+
     def on_clean_button_clicked(self):
-        self.picture_models.clear()
-        self._populate_model_table()
+        self.picture_model.clear()
 
     def on_start_button_clicked(self):
         if not os.path.exists(self.target_path):
@@ -273,11 +311,20 @@ class HomeInterface(QWidget):
             return
         cfg.set(cfg.targetPath, self.target_path)
         tasks: List[ImageHandleTask] = []
-        for model in self.picture_models:
-            target_path = Path(f"{self.target_path}/{model.name}")
-            task = ImageHandleTask(model.original_path, target_path)
-            tasks.append(task)
-        self.image_handle_thread = ImageHandleThread(tasks)
+        for model in self.picture_model.items:
+            tasks.append(create_task(model.original_path, model.output_name, self.target_path))
+
+        source = tasks
+        if self.is_scanning():
+            # 文件夹还在扫描, 先渲染已导入的图片, 之后扫描到的图片由扫描线程放入队列
+            task_queue = TaskQueue()
+            scanned, attached = self.scan_thread.attach(task_queue, self.target_path)
+            for file_path, name in scanned:
+                if self.picture_model.row_of(file_path) < 0:
+                    tasks.append(create_task(file_path, name, self.target_path))
+            if attached:
+                source = itertools.chain(tasks, task_queue)
+        self.image_handle_thread = ImageHandleThread(source)
         self.image_handle_thread.finished.connect(
             self.on_image_handle_finished)
         self.image_handle_thread.loading.connect(self.on_image_handle_loading)
@@ -287,36 +334,20 @@ class HomeInterface(QWidget):
         self.image_handle_thread.start()
 
     def refreshButtons(self):
-        self.clean_button.setEnabled(self.isEnable)
+        # 扫描文件夹时只允许开始处理, 不允许再修改图片列表
+        canEdit = self.isEnable and not self.is_scanning()
+        self.clean_button.setEnabled(canEdit)
         self.start_button.setEnabled(self.isEnable)
-        self.add_button.setEnabled(self.isEnable)
+        self.add_button.setEnabled(canEdit)
+        self.folder_button.setEnabled(canEdit)
         self.search_input.setEnabled(self.isEnable)
         self.target_button.setEnabled(self.isEnable)
-        self._populate_model_table()
+        self.picture_table.actionDelegate.setDeleteEnabled(self.isEnable)
 
     def _create_picture_table(self):
         """创建图片表格"""
-        table = TableWidget(self)
-        table.setEditTriggers(TableWidget.NoEditTriggers)
-        table.setSelectionMode(TableWidget.NoSelection)
-        table.setColumnCount(3)
-        table.setHorizontalHeaderLabels(
-            [self.tr("名称"), self.tr("操作"), self.tr("状态")]
-        )
-
-        # 设置表格样式
-        table.setBorderVisible(True)
-        table.setBorderRadius(8)
-        table.setItemDelegate(TableItemDelegate(table))
-
-        # 设置列宽
-        header = table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.Stretch)
-        header.setSectionResizeMode(1, QHeaderView.Fixed)
-        header.setSectionResizeMode(2, QHeaderView.Fixed)
-
-        table.setColumnWidth(1, 300)
-        table.setColumnWidth(2, 120)
+        table = PictureTableView(self.picture_model, self)
+        table.actionDelegate.actionTriggered.connect(self._on_picture_action)
 
         # 设置行高
         row_height = 45
@@ -330,64 +361,15 @@ class HomeInterface(QWidget):
 
         return table
 
-    def _populate_model_table(self):
-        """填充照片表格数据"""
-        self.picture_table.setRowCount(len(self.picture_models))
-        for i, model in enumerate(self.picture_models):
-            self._add_model_row(i, model)
-
-    def _add_model_row(self, row, model: PictureItem):
-        """添加照片表格行"""
-        # 名称
-        name_item = QTableWidgetItem(model.name)
-        name_item.setTextAlignment(Qt.AlignCenter)
-        self.picture_table.setItem(row, 0, name_item)
-
-        # 删除
-        action_container = QWidget()
-        action_layout = QHBoxLayout(action_container)
-        action_layout.setContentsMargins(4, 4, 4, 4)
-
-        original_path_btn = ListActionButton(
-            parent=self, tips=self.tr("打开源文件目录"))
-        original_path_btn.setIcon(FIF.FOLDER)
-        original_path_btn.clicked.connect(
-            lambda checked, p=model.original_path: self._open_origin_path(p))
-
-        delete_btn = ListActionButton(parent=self, tips=self.tr("删除文件"))
-        delete_btn.setIcon(FIF.DELETE)
-        delete_btn.setEnabled(self.isEnable)
-        delete_btn.clicked.connect(
-            lambda checked, r=row: self._delete_model(r))
-
-        info_btn = ListActionButton(self, tips=self.tr("查看元信息"))
-        info_btn.setIcon(FIF.INFO)
-        info_btn.clicked.connect(
-            lambda checked, r=row: self._info_model(r))
-
-        eidt_btn = ListActionButton(self, tips=self.tr("编辑元信息"))
-        eidt_btn.setIcon(FIF.EDIT)
-        eidt_btn.clicked.connect(
-            lambda checked, r=row: self._edit_info_model(r))
-
-        action_layout.addStretch()
-        action_layout.addWidget(original_path_btn)
-        action_layout.addWidget(delete_btn)
-        action_layout.addWidget(info_btn)
-        action_layout.addWidget(eidt_btn)
-        action_layout.addStretch()
-        self.picture_table.setCellWidget(row, 1, action_container)
-
-        # 状态
-        status_item = QTableWidgetItem(
-            self.tr(f"{model.status.value}"))
-        if model.status == ImageHandleStatus.FINISHED:
-            status_item.setForeground(QColor("#52CD9F"))
-        elif model.status == ImageHandleStatus.ERROR:
-            status_item.setForeground(QColor("#F14A5B"))
-            status_item.setToolTip(model.errorInfo)
-        status_item.setTextAlignment(Qt.AlignCenter)
-        self.picture_table.setItem(row, 2, status_item)
+    def _on_picture_action(self, row: int, action: PictureAction):
+        if action == PictureAction.OPEN_FOLDER:
+            self._open_origin_path(self.picture_model.item(row).original_path)
+        elif action == PictureAction.DELETE:
+            self._delete_model(row)
+        elif action == PictureAction.INFO:
+            self._info_model(row)
+        elif action == PictureAction.EDIT:
+            self._edit_info_model(row)
 
     def _open_origin_path(self, path):
         """打开原始路径对应的文件夹"""
@@ -404,12 +386,12 @@ class HomeInterface(QWidget):
 
     def _delete_model(self, row):
         """删除模型"""
-        self.picture_models.pop(row)
-        self._populate_model_table()
+        self.picture_model.remove_row(row)
 
     def _info_model(self, row):
-        item: PictureItem = self.picture_models[row]
-        exif = get_exif(item.original_path)
+        item: PictureItem = self.picture_model.item(row)
+        # 查看完整元信息时使用 exiftool, 包含 MakerNotes 等全部字段
+        exif = get_exif(item.original_path, native=False)
         content = json.dumps(exif, ensure_ascii=False, indent=4)
         w = CustomScrollableMessageBox(self.window(), content)
         if w.exec():
@@ -422,59 +404,47 @@ class HomeInterface(QWidget):
             )
 
     def _edit_info_model(self, row):
-        item: PictureItem = self.picture_models[row]
+        item: PictureItem = self.picture_model.item(row)
         w = ExifEditMessageBox(self.window(), item.original_path, row)
         w.path_changed.connect(self._on_path_changed)
         if w.exec():
             pass
     
     def _on_path_changed(self, row: int, path: Path):
-        self.picture_models[row].original_path = path
-        self.picture_models[row].name = os.path.basename(path)
-        self._populate_model_table()
+        self.picture_model.set_path(row, path)
 
     def dragEnterEvent(self, event):
         event.accept() if event.mimeData().hasUrls() else event.ignore()
 
     def dropEvent(self, event):
-        if not self.isEnable:
+        if not self.isEnable or self.is_scanning():
             return
         files = [u.toLocalFile() for u in event.mimeData().urls()]
+        folders = [file_path for file_path in files if os.path.isdir(file_path)]
+        file_paths = []
+        has_failed = False
         for file_path in files:
             if not os.path.isfile(file_path):
                 continue
 
-            file_ext = os.path.splitext(file_path)[1][1:].lower()
-
             # 检查文件格式是否支持
-            supported_formats = {fmt.value for fmt in SupportedImageFormats}
-
-            is_supported = file_ext in supported_formats
-            has_failed = False
-
-            if is_supported:
-                is_exist = any(
-                    model.original_path == file_path for model in self.picture_models)
-                if is_exist:
-                    continue
-                else:
-                    self.picture_models.append(PictureItem(
-                        name=os.path.basename(file_path),
-                        original_path=file_path,
-                        target_path=self.target_path,
-                        status=ImageHandleStatus.WAITING
-                    ))
-                    self._populate_model_table()
+            if is_supported_image(file_path):
+                file_paths.append(file_path)
             else:
                 has_failed = True
+                file_ext = os.path.splitext(file_path)[1][1:].lower()
                 InfoBar.error(
                     self.tr(f"格式错误") + file_ext,
                     self.tr("不支持该文件格式"),
                     duration=3000,
                     parent=self,
                 )
+        self.picture_model.add_paths(file_paths, self.target_path)
 
-        if not has_failed:
+        # 拖入的文件夹在后台递归导入
+        if folders:
+            self._start_folder_scan(folders)
+        elif not has_failed:
             InfoBar.success(
                 self.tr("导入成功"),
                 self.tr("导入图片文件成功"),
@@ -482,16 +452,17 @@ class HomeInterface(QWidget):
                 parent=self,
             )
 
+    def _apply_progress(self, progress: HandleProgress):
+        """将有变化的task状态赋值到model上去"""
+        for update in progress.updates:
+            row = self.picture_model.row_of(update.image_path)
+            if row >= 0:
+                self.picture_model.update_status(row, update.status, update.errorInfo)
+
     def on_image_handle_finished(self, progress: HandleProgress):
-        for task in progress.tasks:
-            for model in self.picture_models:
-                if model.original_path == task.image_path:
-                    model.status = task.status
-                    model.errorInfo = task.errorInfo
-                    break
+        self._apply_progress(progress)
         self.progress_bar.setValue(progress.progress)
         self.status_label.setText("处理完成")
-        self._populate_model_table()
         self.open_folder(self.target_path)
         self.isEnable = True
         self.refreshButtons()
@@ -504,16 +475,9 @@ class HomeInterface(QWidget):
         )
 
     def on_image_handle_loading(self, progress: HandleProgress):
-        # 将task的状态赋值到model上去
-        for task in progress.tasks:
-            for model in self.picture_models:
-                if model.original_path == task.image_path:
-                    model.status = task.status
-                    model.errorInfo = task.errorInfo
-                    break
+        self._apply_progress(progress)
         self.progress_bar.setValue(progress.progress)
         self.status_label.setText("处理中")
-        self._populate_model_table()
 
     def on_image_handle_error(self, error):
         self.isEnable = True
@@ -5,6 +5,7 @@ from pathlib import Path
 import json
 
 from PyQt5.QtCore import Qt, QStandardPaths
+from PyQt5.QtGui import QImage
 from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QWidget, QFileDialog
 from qfluentwidgets import (
     ImageLabel,
@@ -23,8 +24,8 @@ from qfluentwidgets import (
 
 from app.config import cfg, STYLE_PATH
 from app.components.common_card import ComboBoxSettingCard
-from app.config import ASSETS_PATH, CACHE_PATH
-from app.thread.image_handle_thread import ImageHandleTask, ImageHandleThread, HandleProgress, ImageHandleStatus
+from app.config import ASSETS_PATH
+from app.thread.preview_thread import PreviewScheduler
 from app.components.common_item import LoadingButton
 from app.entity.enums import MARK_MODE
 from app.layout.standard_layout import StandardLayout
@@ -62,6 +63,11 @@ class SettingInterface(QWidget):
         # 添加一个标志位来控制是否触发onSettingChanged
         self._loading_style = False
 
+        # 预览渲染调度, 连续的预览请求只渲染最后一次
+        self.previewScheduler = PreviewScheduler(self)
+        self.previewScheduler.finished.connect(self.onPreviewReady)
+        self.previewScheduler.error.connect(self.onPreviewError)
+
         # 设置初始值,加载样式
         self.__setValues()
 
@@ -349,54 +355,50 @@ class SettingInterface(QWidget):
             
 
     def updatePreview(self):
-        # 创建预览线程
+        # 请求渲染预览, 由调度器合并连续的请求
         self.renderButton.start_loading()
-        cache_preview = Path(f"{CACHE_PATH}/preview.png")
-        if not os.path.exists(CACHE_PATH):
-            os.makedirs(CACHE_PATH)
-
         preview_path = Path(cfg.previewPath.value)
         if not preview_path or not os.path.exists(preview_path):
             preview_path = Path(DEFAULT_BG["path"])
             cfg.set(cfg.previewPath, str(preview_path))
             self.previewPath.setContent(self.display_render_path(str(preview_path)))
 
-        self.preview_task = ImageHandleTask(
-            preview_path, cache_preview)
-        self.preview_thread = ImageHandleThread([self.preview_task])
-        self.preview_thread.finished.connect(self.onPreviewReady)
         self.refreshButtons(False)
-        self.preview_thread.start()
+        self.previewScheduler.schedule(preview_path, self.previewSize())
 
     def refreshButtons(self, isEnable):
         self.saveButton.setEnabled(isEnable)
         self.resetButton.setEnabled(isEnable)
         self.renderButton.setEnabled(isEnable)
 
-    def onPreviewReady(self, progress: HandleProgress):
+    def previewSize(self) -> int:
+        """预览缩略图的最大边长, 与预览区域的物理像素大小一致"""
+        size = max(self.previewTopWidget.width(), self.previewTopWidget.height())
+        return max(1, int(size * self.devicePixelRatioF()))
+
+    def onPreviewReady(self, image: QImage):
         """预览图片生成完成的回调"""
-        task = progress.tasks[0]
         self.refreshButtons(True)
-        if task and task.status == ImageHandleStatus.FINISHED:
-            self.renderButton.stop_loading()
-            self.previewImage.setImage(str(task.target_path))
-            self.updatePreviewImage()
-            InfoBar.success(
-                self.tr("渲染成功"),
-                self.tr("图片渲染成功"),
-                duration=3000,
-                parent=self,
-            )
-        else:
-            info = task.errorInfo if len(
-                task.errorInfo) > 0 else self.tr("位置错误")
-            self.renderButton.stop_loading()
-            InfoBar.error(
-                self.tr("渲染错误"),
-                info,
-                duration=3000,
-                parent=self,
-            )
+        self.renderButton.stop_loading()
+        self.previewImage.setImage(image)
+        self.updatePreviewImage()
+        InfoBar.success(
+            self.tr("渲染成功"),
+            self.tr("图片渲染成功"),
+            duration=3000,
+            parent=self,
+        )
+
+    def onPreviewError(self, info: str):
+        """预览图片生成失败的回调"""
+        self.refreshButtons(True)
+        self.renderButton.stop_loading()
+        InfoBar.error(
+            self.tr("渲染错误"),
+            info if len(info) > 0 else self.tr("位置错误"),
+            duration=3000,
+            parent=self,
+        )
 
     def updatePreviewImage(self):
         """更新预览图片"""
@@ -1,18 +1,8 @@
 import sys
 import traceback
-from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QApplication
-from app.view.main_window import MainWindow
-from qfluentwidgets import FluentTranslator
-from PyQt5.QtCore import QLocale
+import multiprocessing
 from app.utils.logger import setup_logger
 
-print(""""
-本工具为开源工具，遵循 Apache 2.0 License 发布。如果您在使用过程中遇到问题，请联系作者：
-      GitHub: @qianchuan0124
-      邮箱: qianchuan0124@gmail.com
-""")
-
 
 def exception_hook(exctype, value, tb):
     logger = setup_logger("main")
@@ -20,14 +10,34 @@ def exception_hook(exctype, value, tb):
     sys.__excepthook__(exctype, value, tb)  # 调用默认的异常处理
 
 
-sys.excepthook = exception_hook
+if __name__ == '__main__':
+    # 渲染进程池使用 spawn 启动，打包后需要 freeze_support 才能正确启动子进程
+    multiprocessing.freeze_support()
+
+    # spawn 启动的渲染子进程会重新执行本文件的顶层代码, 界面相关的模块放在这里导入, 子进程不需要加载 Qt
+    from PyQt5.QtCore import Qt, QLocale
+    from PyQt5.QtWidgets import QApplication
+    from qfluentwidgets import FluentTranslator
+    from app.view.main_window import MainWindow
+    from app.manager.exiftool_manager import exiftool_manager
+
+    print(""""
+本工具为开源工具，遵循 Apache 2.0 License 发布。如果您在使用过程中遇到问题，请联系作者：
+      GitHub: @qianchuan0124
+      邮箱: qianchuan0124@gmail.com
+""")
+
+    sys.excepthook = exception_hook
+
+    app = QApplication(sys.argv)
+    app.setAttribute(Qt.AA_DontCreateNativeWidgetSiblings)  # type: ignore
 
-app = QApplication(sys.argv)
-app.setAttribute(Qt.AA_DontCreateNativeWidgetSiblings)  # type: ignore
+    translator = FluentTranslator(QLocale(QLocale.Chinese, QLocale.China))
+    app.installTranslator(translator)
 
-translator = FluentTranslator(QLocale(QLocale.Chinese, QLocale.China))
-app.installTranslator(translator)
+    # 退出时关闭常驻的 exiftool 进程
+    app.aboutToQuit.connect(exiftool_manager.shutdown)
 
-w = MainWindow()
-w.show()
-sys.exit(app.exec_())
+    w = MainWindow()
+    w.show()
+    sys.exit(app.exec_())
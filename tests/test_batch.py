@@ -0,0 +1,208 @@
+import pytest
+from app.core import batch
+from app.core.batch import BatchRenderer, ImageHandleStatus, ImageHandleTask, TaskQueue
+from app.core.render_config import RenderConfig
+from concurrent.futures.process import BrokenProcessPool
+from app.core.renderer import RenderResult
+
+
+class FakeClock:
+    """
+    每次读取前进固定时间的时钟, 进度通知的时机与机器速度无关
+    """
+
+    def __init__(self, step: float):
+        self.now = 1000.0
+        self.step = step
+
+    def monotonic(self) -> float:
+        self.now += self.step
+        return self.now
+
+
+@pytest.fixture
+def serial(monkeypatch):
+    """
+    在当前线程渲染, 渲染结果由任务路径决定: 文件名以 bad 开头的任务失败
+    """
+    def render_task(index, image_path, target_path, config, exif, max_size, renderer):
+        if str(image_path).startswith("bad"):
+            return RenderResult(index, False, "渲染出错")
+        return RenderResult(index, True, elapsed=0.01)
+
+    monkeypatch.setattr(batch, "ImageRenderer", lambda: None)
+    monkeypatch.setattr(batch, "render_task", render_task)
+    monkeypatch.setattr(batch, "read_exif_batch", lambda paths: {path: ({}, "native") for path in paths})
+
+
+def make_tasks(count: int):
+    return [ImageHandleTask(f"{'bad' if i % 7 == 3 else 'ok'}_{i}.jpg", f"out_{i}.jpg") for i in range(count)]
+
+
+def run(tasks, monkeypatch, interval: float, step: float, workers: int = 1):
+    monkeypatch.setattr(batch, "time", FakeClock(step))
+    events = []
+    renderer = BatchRenderer(tasks, RenderConfig(), max_workers=workers, max_size=0,
+                             on_progress=events.append, progress_interval=interval)
+    renderer.run()
+    return renderer, events
+
+
+@pytest.mark.usefixtures("serial")
+def test_progress_deltas_are_coalesced(monkeypatch):
+    tasks = make_tasks(100)
+    renderer, events = run(tasks, monkeypatch, interval=0.05, step=0.01)
+
+    # 每张图片有 处理中、结束 两次状态变化, 合并后通知次数明显更少
+    assert 1 < len(events) < 200
+    for event in events:
+        indexes = [update.index for update in event.updates]
+        assert len(indexes) == len(set(indexes))
+
+    # 按顺序应用所有增量后得到每个任务的最终状态
+    latest = {}
+    for event in events:
+        for update in event.updates:
+            latest[update.index] = update
+    assert sorted(latest) == list(range(100))
+    for index, task in enumerate(tasks):
+        expected = ImageHandleStatus.ERROR if index % 7 == 3 else ImageHandleStatus.FINISHED
+        assert task.status == expected
+        assert latest[index].status == expected
+        assert latest[index].errorInfo == ("渲染出错" if index % 7 == 3 else "")
+
+    last = events[-1]
+    assert (last.done, last.total, last.progress) == (100, 100, 100)
+    assert renderer.done == 100
+    assert [event.done for event in events] == sorted(event.done for event in events)
+
+
+@pytest.mark.usefixtures("serial")
+def test_every_change_is_sent_without_interval(monkeypatch):
+    _, events = run(make_tasks(10), monkeypatch, interval=0, step=0.01)
+    assert len(events) == 20
+    assert all(len(event.updates) == 1 for event in events)
+
+
+@pytest.mark.usefixtures("serial")
+def test_streaming_source_reports_final_total(monkeypatch):
+    tasks = make_tasks(70)
+    task_queue = TaskQueue(maxsize=len(tasks) + 1)
+    for task in tasks:
+        task_queue.put(task)
+    task_queue.close()
+
+    renderer, events = run(task_queue, monkeypatch, interval=0.05, step=0.01)
+    assert renderer.tasks == tasks
+    assert all(event.total is None for event in events[:-1])
+    assert (events[-1].done, events[-1].total, events[-1].progress) == (70, 70, 100)
+
+
+@pytest.mark.usefixtures("serial")
+def test_empty_batch(monkeypatch):
+    renderer, events = run([], monkeypatch, interval=0.05, step=0.01)
+    assert events == [] and renderer.done == 0
+
+
+class FakeExecutor:
+    """
+    同步执行的进程池, 记录同时未取回结果的任务数
+    提交路径以 crash 开头的任务时模拟渲染进程异常退出: 未取回的任务都失败, 之后的提交抛出异常
+    """
+    created = 0
+    in_flight = 0
+    max_in_flight = 0
+
+    def __init__(self, **kwargs):
+        FakeExecutor.created += 1
+        self.broken = False
+        self.futures = []
+
+    def submit(self, fn, *args):
+        if self.broken:
+            raise BrokenProcessPool("进程池已损坏")
+        FakeExecutor.in_flight += 1
+        FakeExecutor.max_in_flight = max(FakeExecutor.max_in_flight, FakeExecutor.in_flight)
+        future = FakeFuture(fn(*args, None))
+        self.futures.append(future)
+        if str(args[1]).startswith("crash"):
+            self.broken = True
+            for pending in self.futures:
+                pending.broken = True
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class FakeFuture:
+    def __init__(self, result):
+        self._result = result
+        self.broken = False
+
+    def result(self, timeout=None):
+        FakeExecutor.in_flight -= 1
+        if self.broken:
+            raise BrokenProcessPool("渲染进程异常退出")
+        return self._result
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", FakeExecutor)
+    monkeypatch.setattr(FakeExecutor, "created", 0)
+    monkeypatch.setattr(FakeExecutor, "in_flight", 0)
+    monkeypatch.setattr(FakeExecutor, "max_in_flight", 0)
+
+
+@pytest.mark.usefixtures("serial", "executor")
+def test_parallel_keeps_two_tasks_per_worker(monkeypatch):
+    monkeypatch.setattr(batch, "time", FakeClock(0.01))
+    tasks = make_tasks(batch.CHUNK_SIZE * 3)
+    renderer = BatchRenderer(tasks, RenderConfig(), max_workers=2, max_size=0)
+    renderer.run()
+
+    assert renderer.done == len(tasks)
+    # 提交后立即检查, 最多比上限多出刚提交的一张
+    assert FakeExecutor.max_in_flight <= 2 * 2 + 1
+
+
+@pytest.mark.usefixtures("serial", "executor")
+def test_parallel_marks_processing_on_submit(monkeypatch):
+    tasks = make_tasks(20)
+    _, events = run(tasks, monkeypatch, interval=0, step=0.01, workers=2)
+    statuses = [update.status for event in events for update in event.updates]
+    # 第一张结束前, 池中的 2 * 2 张与刚提交的一张都已经显示为处理中
+    assert statuses[:5] == [ImageHandleStatus.PROCESSING] * 5
+
+
+@pytest.mark.usefixtures("serial", "executor")
+def test_parallel_recovers_from_broken_pool(monkeypatch):
+    tasks = make_tasks(40)
+    tasks[10].image_path = "crash_10.jpg"
+    tasks[30].image_path = "crash_30.jpg"
+    renderer, events = run(tasks, monkeypatch, interval=0.05, step=0.01, workers=2)
+
+    assert FakeExecutor.created == 3
+    assert renderer.done == 40
+    assert (events[-1].done, events[-1].total) == (40, 40)
+    assert all(task.status in (ImageHandleStatus.FINISHED, ImageHandleStatus.ERROR) for task in tasks)
+    assert tasks[10].status == ImageHandleStatus.ERROR
+    assert tasks[10].errorInfo == "渲染进程异常退出"
+    # 进程池重建后剩余的任务正常渲染
+    assert tasks[11].status == ImageHandleStatus.FINISHED
+    assert tasks[39].status == ImageHandleStatus.FINISHED
+
+
+@pytest.mark.usefixtures("executor")
+def test_unexpected_error_finishes_batch(monkeypatch):
+    def read_exif_batch(paths):
+        raise RuntimeError("exif 读取失败")
+
+    monkeypatch.setattr(batch, "read_exif_batch", read_exif_batch)
+    events = []
+    renderer = BatchRenderer(make_tasks(5), RenderConfig(), max_workers=2, max_size=0, on_progress=events.append)
+    with pytest.raises(RuntimeError):
+        renderer.run()
+    assert all(task.status == ImageHandleStatus.ERROR for task in renderer.tasks)
+    assert (events[-1].done, events[-1].total) == (5, 5)
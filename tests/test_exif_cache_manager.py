@@ -0,0 +1,79 @@
+import os
+from PIL import Image
+from app.manager.exif_cache_manager import ExifCacheManager
+from app.utils import image_handle
+from app.utils.exif_reader import EXIFTOOL_BACKEND, NATIVE_BACKEND
+
+EXIF = {"Make": "NIKON CORPORATION", "CameraModelName": "NIKON Z 7"}
+
+
+def test_hit_until_file_changes(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"0123456789")
+    cache = ExifCacheManager(tmp_path / "cache.sqlite3")
+    cache.put(str(path), EXIF, NATIVE_BACKEND)
+    assert cache.get(str(path)) == (EXIF, NATIVE_BACKEND)
+
+    # 只修改时间变化
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.get(str(path)) is None
+
+    # 修改时间相同, 只有大小变化
+    cache.put(str(path), EXIF, NATIVE_BACKEND)
+    stat = os.stat(path)
+    path.write_bytes(b"01234567890123")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert cache.get(str(path)) is None
+
+
+def test_native_entries_skipped_when_exiftool_required(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"0123456789")
+    cache = ExifCacheManager(tmp_path / "cache.sqlite3")
+    cache.put(str(path), EXIF, NATIVE_BACKEND)
+    assert cache.get(str(path), native=False) is None
+    cache.put(str(path), EXIF, EXIFTOOL_BACKEND)
+    assert cache.get(str(path), native=False) == (EXIF, EXIFTOOL_BACKEND)
+
+
+def test_invalidate(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"0123456789")
+    cache = ExifCacheManager(tmp_path / "cache.sqlite3")
+    cache.put(str(path), EXIF, NATIVE_BACKEND)
+    cache.invalidate(str(path))
+    assert cache.get(str(path)) is None
+
+
+def test_files_without_exif_are_cached(tmp_path, monkeypatch):
+    path = str(tmp_path / "screenshot.jpg")
+    Image.new("RGB", (16, 16)).save(path)
+    cache = ExifCacheManager(tmp_path / "cache.sqlite3")
+    calls = []
+
+    def execute(args):
+        calls.append(args)
+        return "[]", ""
+
+    monkeypatch.setattr(image_handle, "exif_cache_manager", cache)
+    monkeypatch.setattr(image_handle.exiftool_manager, "execute", execute)
+    assert image_handle.read_exif_batch([path]) == {path: ({}, EXIFTOOL_BACKEND)}
+    assert image_handle.read_exif_batch([path]) == {path: ({}, EXIFTOOL_BACKEND)}
+    assert image_handle.read_exif(path) == ({}, EXIFTOOL_BACKEND)
+    assert len(calls) == 1
+
+
+def test_failed_reads_are_not_cached(tmp_path, monkeypatch):
+    path = str(tmp_path / "a.jpg")
+    Image.new("RGB", (16, 16)).save(path)
+    cache = ExifCacheManager(tmp_path / "cache.sqlite3")
+
+    def execute(args):
+        raise RuntimeError("exiftool 已退出")
+
+    monkeypatch.setattr(image_handle, "exif_cache_manager", cache)
+    monkeypatch.setattr(image_handle.exiftool_manager, "execute", execute)
+    assert image_handle.read_exif_batch([path]) == {}
+    assert image_handle.read_exif(path) == ({}, EXIFTOOL_BACKEND)
+    assert cache.get(path) is None
@@ -0,0 +1,43 @@
+import sys
+import textwrap
+import pytest
+from app.manager import exiftool_manager
+from app.manager.exiftool_manager import ExifToolSession
+
+# 模拟 -stay_open 协议的 exiftool, 每条命令先写出大量警告, 再写出结果
+FAKE_EXIFTOOL = textwrap.dedent('''\
+    #!{python}
+    import sys
+    args = []
+    for line in sys.stdin:
+        line = line.rstrip("\\n")
+        if line == "False" and args[-1:] == ["-stay_open"]:
+            break
+        if line.startswith("-execute"):
+            ready = args[args.index("-echo4") + 1]
+            sys.stderr.write("Warning: bad maker notes\\n" * 12000)
+            sys.stderr.write(ready + "\\n")
+            sys.stderr.flush()
+            sys.stdout.write("File Name : " + args[0] + "\\n{{ready" + line[len("-execute"):] + "}}\\n")
+            sys.stdout.flush()
+            args = []
+        else:
+            args.append(line)
+''')
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="脚本形式的 exiftool 只能在类 Unix 系统上直接执行")
+def test_large_stderr_does_not_block(tmp_path, monkeypatch):
+    script = tmp_path / "exiftool"
+    script.write_text(FAKE_EXIFTOOL.format(python=sys.executable))
+    script.chmod(0o755)
+    monkeypatch.setattr(exiftool_manager, "exiftool_command", lambda: script)
+
+    session = ExifToolSession()
+    try:
+        for name in ("a.jpg", "b.jpg"):
+            stdout, stderr = session.execute([name])
+            assert stdout.strip() == f"File Name : {name}"
+            assert stderr.count("Warning") == 12000
+    finally:
+        session.close()
@@ -0,0 +1,70 @@
+import random
+import pytest
+from PIL import Image, ImageDraw
+from app.core.render_config import RenderConfig
+from app.utils.image_render import _shadow_tile, paste_rounded, raduis, shadow_layer
+
+
+def noise(size, seed) -> Image.Image:
+    rng = random.Random(seed)
+    return Image.frombytes("RGBA", size, rng.randbytes(size[0] * size[1] * 4))
+
+
+def paste_with_full_mask(canvas: Image.Image, img: Image.Image, position, config: RenderConfig):
+    """
+    使用整张圆角蒙版粘贴, 作为 paste_rounded 的参照
+    """
+    radius = min(img.width, img.height) // raduis(config)
+    mask = Image.new("L", img.size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle([(0, 0), img.size], radius=radius, fill=255)
+    canvas.paste(img, position, mask=mask)
+
+
+@pytest.mark.parametrize("radius_info", [0, 20, 60, 90, 99])
+@pytest.mark.parametrize("size", [(1, 1), (7, 300), (120, 80), (301, 257)])
+def test_paste_rounded_matches_full_mask(radius_info, size):
+    config = RenderConfig(radiusInfo=radius_info)
+    img = noise(size, hash((radius_info, size)))
+    position = (5, 9)
+    expected = noise((size[0] + 20, size[1] + 20), 1)
+    actual = expected.copy()
+
+    paste_with_full_mask(expected, img, position, config)
+    paste_rounded(actual, img, position, config)
+    assert actual.tobytes() == expected.tobytes()
+
+
+def test_paste_rounded_rgb_canvas():
+    config = RenderConfig(radiusInfo=80)
+    img = noise((200, 150), 2).convert("RGB")
+    expected = Image.new("RGB", (240, 190), "#336699")
+    actual = expected.copy()
+
+    paste_with_full_mask(expected, img, (20, 20), config)
+    paste_rounded(actual, img, (20, 20), config)
+    assert actual.tobytes() == expected.tobytes()
+
+
+SHADOW_CASES = [
+    ((60, 40), 3, 2, "#00000080"),
+    ((400, 120), 10, 20, "#00000000"),
+    ((150, 500), 25, 8, "#11223344"),
+    ((640, 427), 0, 20, "#000000ff"),
+    ((333, 333), 40, 35, "#80ff0040"),
+    ((900, 800), 40, 35, "#80ff0040"),
+]
+
+
+@pytest.mark.parametrize("size, corner_radius, shadow_blur, color", SHADOW_CASES)
+def test_shadow_layer_matches_full_frame_blur(size, corner_radius, shadow_blur, color):
+    expected = _shadow_tile(size, corner_radius, shadow_blur, color)
+    actual = shadow_layer(size, corner_radius, shadow_blur, color)
+    assert actual.size == expected.size
+    assert actual.tobytes() == expected.tobytes()
+
+
+def test_shadow_layer_returns_independent_copies():
+    first = shadow_layer((80, 60), 4, 3, "#00000080")
+    first.paste((255, 0, 0, 255), (0, 0, 80, 60))
+    second = shadow_layer((80, 60), 4, 3, "#00000080")
+    assert second.getpixel((40, 30)) != (255, 0, 0, 255)
@@ -0,0 +1,73 @@
+import random
+import pytest
+from PIL import Image
+from app.core.layout import StripLayout, image_block, rect_block
+from app.utils.image_handle import append_image_by_side
+
+
+class RecordingStrip:
+    """
+    记录 append_image_by_side 的粘贴位置, 作为 StripLayout 排版的参照
+    """
+
+    def __init__(self, size):
+        self.width, self.height = size
+        self.pastes = []
+
+    def paste(self, image, position):
+        self.pastes.append((position[0], image.width))
+
+
+def old_placement(size, block_sizes, padding, inner_padding, side):
+    strip = RecordingStrip(size)
+    images = [Image.new("RGBA", block_size) for block_size in block_sizes]
+    append_image_by_side(strip, images, side, padding, inner_padding, is_start=True)
+    return strip.pastes
+
+
+def new_placement(size, block_sizes, padding, inner_padding, side):
+    layout = StripLayout(size, (0, 0, 0, 0))
+    layout.append([rect_block("#000000", block_size) for block_size in block_sizes], padding, inner_padding, side)
+    return [(round(x), round(w)) for _, (x, _, w, _) in layout.rects]
+
+
+@pytest.mark.parametrize("side", ["left", "right"])
+@pytest.mark.parametrize("seed", range(20))
+def test_placement_matches_append_image_by_side(side, seed):
+    rng = random.Random(seed)
+    size = (rng.randint(2000, 6000), rng.choice([200, 250, 300, 333]))
+    block_sizes = [(rng.randint(1, 1500), rng.randint(1, 900)) for _ in range(rng.randint(1, 4))]
+    padding, inner_padding = rng.randint(0, 300), rng.randint(0, 300)
+    expected = old_placement(size, block_sizes, padding, inner_padding, side)
+    assert new_placement(size, block_sizes, padding, inner_padding, side) == expected
+
+
+def test_empty_blocks_are_skipped():
+    layout = StripLayout((1000, 100), (0, 0, 0, 0))
+    layout.append([None, rect_block("#000000", (50, 100)), None], 10, 20)
+    assert layout.rects == [("#000000", (10, 0.0, 50.0, 100.0))]
+
+
+def test_rasterize_at_layout_size():
+    logo = Image.new("RGBA", (40, 20), "#ff0000")
+    layout = StripLayout((300, 100), "#ffffff")
+    layout.append([image_block(lambda size: logo.resize(size), (40, 20), 5), rect_block("#0000ff", (2, 100))],
+                  10, 10)
+    strip = layout.rasterize(300)
+    assert strip.size == (300, 100)
+    # logo 区块高 30, 缩放到 100 后宽 133, 上下各留白 17
+    assert strip.getpixel((10, 50)) == (255, 0, 0, 255)
+    assert strip.getpixel((10 + 132, 50)) == (255, 0, 0, 255)
+    assert strip.getpixel((10, 5)) == (255, 255, 255, 255)
+    assert strip.getpixel((10 + 133 + 10, 50)) == (0, 0, 255, 255)
+    assert strip.getpixel((10 + 133 + 10 + 2, 50)) == (255, 255, 255, 255)
+
+
+def test_rasterize_scales_to_output_width():
+    layout = StripLayout((1000, 100), "#ffffff")
+    layout.append([rect_block("#000000", (100, 100))], 200, 0, side="right")
+    strip = layout.rasterize(250)
+    assert strip.size == (250, 25)
+    assert strip.getbbox() is not None
+    black = [x for x in range(250) if strip.getpixel((x, 12)) == (0, 0, 0, 255)]
+    assert (black[0], black[-1]) == (175, 199)
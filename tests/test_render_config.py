@@ -0,0 +1,23 @@
+from dataclasses import fields
+from qfluentwidgets import ConfigItem
+from app.config import Config
+from app.core.render_config import RenderConfig
+
+
+def config_items() -> dict:
+    return {name: item for name, item in vars(Config).items() if isinstance(item, ConfigItem)}
+
+
+def test_every_field_has_config_item():
+    items = config_items()
+    for field in fields(RenderConfig):
+        assert field.name in items, f"Config 中缺少配置项 {field.name}"
+        # from_dict 按配置名匹配字段, 只忽略首字母大小写
+        assert items[field.name].name.lower() == field.name.lower()
+
+
+def test_defaults_match_config():
+    defaults = {}
+    for item in config_items().values():
+        defaults.setdefault(item.group, {})[item.name] = item.defaultValue
+    assert RenderConfig.from_dict(defaults) == RenderConfig()
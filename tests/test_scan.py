@@ -0,0 +1,49 @@
+import os
+from pathlib import Path
+from app.core.scan import path_key, scan_images, unique_name
+
+
+def touch(root: Path, *names):
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+
+
+def relative(paths, root: Path):
+    return [Path(path).relative_to(root).as_posix() for path in paths]
+
+
+def test_order_files_before_subdirectories(tmp_path):
+    touch(tmp_path, "b.jpg", "a.JPG", "notes.txt", "z/1.png", "a/2.jpg", "a/c/3.jpeg", "a/b/4.jpg")
+    result = relative(scan_images([tmp_path]), tmp_path)
+    assert result == ["a.JPG", "b.jpg", "a/2.jpg", "a/b/4.jpg", "a/c/3.jpeg", "z/1.png"]
+
+
+def test_not_recursive(tmp_path):
+    touch(tmp_path, "a.jpg", "sub/b.jpg")
+    assert relative(scan_images([tmp_path], recursive=False), tmp_path) == ["a.jpg"]
+
+
+def test_duplicates_are_skipped(tmp_path):
+    touch(tmp_path, "a.jpg", "sub/b.jpg", "sub/c.jpg")
+    seen = {path_key(tmp_path / "sub" / "c.jpg")}
+    roots = [tmp_path / "sub" / "b.jpg", tmp_path, str(tmp_path / "sub" / ".." / "a.jpg"), tmp_path / "sub"]
+    result = relative(scan_images(roots, seen=seen), tmp_path)
+    assert result == ["sub/b.jpg", "a.jpg"]
+    # 交出的图片加入 seen, 再次扫描时全部跳过
+    assert list(scan_images([tmp_path], seen=seen)) == []
+
+
+def test_unsupported_files_given_directly(tmp_path):
+    touch(tmp_path, "a.txt", "b.jpg")
+    assert relative(scan_images([tmp_path / "a.txt", tmp_path / "b.jpg"]), tmp_path) == ["b.jpg"]
+
+
+def test_unique_name():
+    used = set()
+    assert unique_name("a.jpg", used) == "a.jpg"
+    assert unique_name("a.jpg", used) == "a_1.jpg"
+    assert unique_name("a.jpg", used) == "a_2.jpg"
+    assert unique_name(os.path.join("x", "a.jpg"), used) == os.path.join("x", "a.jpg")
+    assert unique_name("a_1.jpg", used) == "a_1_1.jpg"